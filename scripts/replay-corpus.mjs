@@ -0,0 +1,193 @@
+// Rejoue un corpus de pages capturées (pages annonce et /items/new) contre
+// l'extracteur et la séquence du filler, en parallèle sur plusieurs processus vitest.
+//
+//   npm run replay -- <dossier|fichier.html>... [--workers N] [--json report.json]
+//                     [--strict] [--draft draft.json] [--budget 60000]
+//
+// Pages annonce: extraction, comparée à <nom>.expected.json si présent.
+// Pages /items/new: fillNewItemForm avec <nom>.draft.json, --draft ou le brouillon
+// de tests/fixtures/alien-ring-item.expected.json; titre/description/prix doivent
+// être remplis (et les listes déroulantes aussi avec --strict).
+// Code de sortie 1 si une page échoue.
+import { spawn } from 'node:child_process';
+import fs from 'node:fs';
+import os from 'node:os';
+import path from 'node:path';
+
+const root = new URL('..', import.meta.url).pathname;
+const vitestBin = path.join(root, 'node_modules', 'vitest', 'vitest.mjs');
+
+function parseArgs(argv) {
+  const workers = Math.max(1, os.cpus().length - 1);
+  const opts = { inputs: [], workers, json: null, strict: false };
+  for (let i = 0; i < argv.length; i++) {
+    const a = argv[i];
+    if (a === '--workers') opts.workers = Math.max(1, Number(argv[++i]) || 1);
+    else if (a === '--json') opts.json = argv[++i];
+    else if (a === '--strict') opts.strict = true;
+    else if (a === '--draft') opts.draft = path.resolve(argv[++i]);
+    else if (a === '--budget') opts.budget = String(Number(argv[++i]));
+    else opts.inputs.push(a);
+  }
+  return opts;
+}
+
+function collectPages(inputs) {
+  const out = [];
+  const walk = (p) => {
+    const st = fs.statSync(p);
+    if (st.isDirectory()) {
+      for (const name of fs.readdirSync(p).sort()) walk(path.join(p, name));
+    } else if (/\.html?$/i.test(p)) {
+      out.push(path.resolve(p));
+    }
+  };
+  inputs.forEach(walk);
+  return [...new Set(out)];
+}
+
+function runShard(index, count, manifest, outFile, opts) {
+  const env = {
+    ...process.env,
+    VX_REPLAY_MANIFEST: manifest,
+    VX_REPLAY_SHARD: `${index}/${count}`,
+    VX_REPLAY_OUT: outFile,
+    VX_REPLAY_STRICT: opts.strict ? '1' : '0',
+  };
+  if (opts.draft) env.VX_REPLAY_DRAFT = opts.draft;
+  if (opts.budget) env.VX_REPLAY_BUDGET_MS = opts.budget;
+  const args = [vitestBin, 'run', '--config', 'vitest.replay.config.ts'];
+  return new Promise((resolve) => {
+    const child = spawn(process.execPath, args, {
+      cwd: root,
+      env,
+      stdio: ['ignore', 'ignore', 'pipe'],
+    });
+    let stderr = '';
+    child.stderr.on('data', (d) => {
+      stderr += d;
+    });
+    child.on('close', (code) => resolve({ index, code, stderr }));
+  });
+}
+
+function percentile(values, p) {
+  if (!values.length) return null;
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.max(0, Math.ceil((p / 100) * sorted.length) - 1))];
+}
+
+function summarizeFields(results) {
+  const fields = {};
+  for (const r of results) {
+    for (const [name, f] of Object.entries(r.fields || {})) {
+      const s = (fields[name] ??= { set: 0, unset: 0, absent: 0, ms: [] });
+      s[f.status] += 1;
+      if (typeof f.ms === 'number') s.ms.push(f.ms);
+    }
+  }
+  const out = {};
+  for (const [name, s] of Object.entries(fields)) {
+    out[name] = {
+      set: s.set,
+      unset: s.unset,
+      absent: s.absent,
+      p50_ms: percentile(s.ms, 50),
+      p95_ms: percentile(s.ms, 95),
+      max_ms: s.ms.length ? Math.max(...s.ms) : null,
+    };
+  }
+  return out;
+}
+
+function describeFailure(r) {
+  if (r.error) return r.error;
+  if (r.extract?.diff) return `extraction differs: ${r.extract.diff.join(', ')}`;
+  const unset = Object.entries(r.fields || {})
+    .filter(([, f]) => f.status === 'unset')
+    .map(([name]) => name);
+  return unset.length ? `unset: ${unset.join(', ')}` : '';
+}
+
+async function main() {
+  const opts = parseArgs(process.argv.slice(2));
+  if (!opts.inputs.length) {
+    console.error('usage: npm run replay -- <dir|page.html>... [--workers N] [--json out]');
+    process.exit(2);
+  }
+  if (!fs.existsSync(vitestBin)) {
+    console.error('vitest is missing. Run: npm install');
+    process.exit(2);
+  }
+  const pages = collectPages(opts.inputs);
+  if (!pages.length) {
+    console.error('no .html pages found');
+    process.exit(2);
+  }
+  const tmp = fs.mkdtempSync(path.join(os.tmpdir(), 'vx-replay-'));
+  const manifest = path.join(tmp, 'manifest.json');
+  fs.writeFileSync(manifest, JSON.stringify(pages));
+  const count = Math.min(opts.workers, pages.length);
+  const t0 = Date.now();
+  const runs = await Promise.all(
+    Array.from({ length: count }, (_, i) =>
+      runShard(i, count, manifest, path.join(tmp, `shard-${i}.jsonl`), opts),
+    ),
+  );
+  const wallMs = Date.now() - t0;
+
+  const byPage = new Map();
+  for (let i = 0; i < count; i++) {
+    const file = path.join(tmp, `shard-${i}.jsonl`);
+    if (!fs.existsSync(file)) continue;
+    for (const line of fs.readFileSync(file, 'utf8').split('\n')) {
+      if (!line.trim()) continue;
+      const r = JSON.parse(line);
+      byPage.set(r.page, r);
+    }
+  }
+  const results = pages.map(
+    (page) => byPage.get(page) ?? { page, kind: 'unknown', ok: false, ms: 0, error: 'no result' },
+  );
+  for (const run of runs) {
+    if (run.code !== 0) {
+      console.error(`shard ${run.index} exited with ${run.code}:\n${run.stderr.slice(-2000)}`);
+    }
+  }
+
+  for (const r of results) {
+    const rel = path.relative(process.cwd(), r.page);
+    const detail = r.ok ? '' : `  ${describeFailure(r)}`;
+    const ms = String(Math.round(r.ms)).padStart(6);
+    console.log(`${r.ok ? 'PASS' : 'FAIL'}  ${r.kind.padEnd(7)} ${ms}ms  ${rel}${detail}`);
+  }
+  const fields = summarizeFields(results);
+  if (Object.keys(fields).length) {
+    console.log('\nfield        set  unset absent   p50ms   p95ms   maxms');
+    const ms = (v) => (v == null ? '-' : v.toFixed(1)).padStart(7);
+    const n = (v, w) => String(v).padStart(w);
+    for (const [name, f] of Object.entries(fields)) {
+      console.log(
+        `${name.padEnd(11)} ${n(f.set, 4)} ${n(f.unset, 6)} ${n(f.absent, 6)} ` +
+          `${ms(f.p50_ms)} ${ms(f.p95_ms)} ${ms(f.max_ms)}`,
+      );
+    }
+  }
+  const extractMs = results.filter((r) => r.extract).map((r) => r.extract.ms);
+  if (extractMs.length) {
+    const p50 = percentile(extractMs, 50).toFixed(2);
+    const p95 = percentile(extractMs, 95).toFixed(2);
+    console.log(`\nextraction p50 ${p50}ms p95 ${p95}ms`);
+  }
+  const failed = results.filter((r) => !r.ok).length;
+  const passed = results.length - failed;
+  console.log(`\n${passed}/${results.length} pages passed in ${wallMs}ms (${count} workers)`);
+  if (opts.json) {
+    const report = { generatedAt: new Date().toISOString(), wallMs, workers: count, fields };
+    fs.writeFileSync(opts.json, JSON.stringify({ ...report, pages: results }, null, 2));
+  }
+  fs.rmSync(tmp, { recursive: true, force: true });
+  process.exit(failed ? 1 : 0);
+}
+
+main();
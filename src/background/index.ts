@@ -1,11 +1,20 @@
 import browser from 'webextension-polyfill';
 
+import { imageCache } from '../lib/image-cache';
+import type { Downloaded } from '../lib/image-prefetch';
+import { createPrefetcher, dedupeDownloads } from '../lib/image-prefetch';
+import { grantRelayUrls } from '../lib/image-relay';
+import { sniffImageType } from '../lib/images';
 import { onMessage } from '../lib/messaging';
+import type { ImageTransfer } from '../types/messages';
 import {
   ContentReady,
   ImageFetch,
   ImageFetchResult,
+  ImageRelayAllow,
+  ImageTransferProbe,
   Ping,
+  PROBE_BYTES,
   RepublishCreate,
   RepublishInjected,
 } from '../types/messages';
@@ -26,7 +35,8 @@ onMessage(async (msg) => {
   if (RepublishCreate.safeParse(msg).success) {
     const { payload } = RepublishCreate.parse(msg);
     // Ouvrir le formulaire de création d’annonce de Vinted
-    await browser.tabs.create({ url: payload.targetUrl, active: true });
+    const tab = await browser.tabs.create({ url: payload.targetUrl, active: true });
+    if (payload.images?.length) void prefetcher.start(payload.images, tab.id);
   }
   if (RepublishInjected.safeParse(msg).success) {
     const { payload } = RepublishInjected.parse(msg);
@@ -45,40 +55,41 @@ onMessage(async (msg) => {
       return out;
     }
   }
+  if (ImageRelayAllow.safeParse(msg).success) {
+    const { urls } = ImageRelayAllow.parse(msg);
+    try {
+      return { ok: true, token: await grantRelayUrls(browser.storage.session, urls) } as const;
+    } catch {
+      return { ok: false } as const;
+    }
+  }
+  if (ImageTransferProbe.safeParse(msg).success) {
+    return { ok: true, bytes: new Uint8Array(PROBE_BYTES).fill(1).buffer } as const;
+  }
   // Full download for image, returned as ArrayBuffer (binary)
   if ('type' in msg && msg.type === 'image:download') {
-    const url = (msg as { url: string }).url;
+    const { url, transfer = 'binary' } = msg as { url: string; transfer?: ImageTransfer };
     try {
-      // logs désactivés
-      const res = await fetch(url, {
-        method: 'GET',
-        // éviter des réponses vides liées au cache intermédiaire
-        cache: 'no-store',
-        // Référent/Origin explicites pour contourner certaines règles CDN
-        // Note: referrerPolicy "no-referrer-when-downgrade" est le défaut; on force une valeur sûre
-        referrer: 'https://www.vinted.fr/',
-        referrerPolicy: 'strict-origin-when-cross-origin',
-        headers: {
-          Accept: 'image/avif,image/webp,image/*,*/*;q=0.8',
-        },
-      });
-      if (!res.ok) return { ok: false, url } as const;
-      const contentType = res.headers.get('content-type') || undefined;
-      const buf = await res.arrayBuffer();
-      const name = new URL(url).pathname.split('/').pop() || 'image';
+      const got = await downloadImage(url);
+      if (!got) return { ok: false, url } as const;
+      const { contentType, name, buf, cached, status, transform } = got;
       // logs désactivés
       if (!buf || buf.byteLength === 0) {
         // logs désactivés
-        return { ok: false, url, contentType, name } as const;
+        return { ok: false, url, contentType, name, status } as const;
       }
-      // Provide a base64 fallback in case ArrayBuffer transfer is dropped by the messaging layer
-      let bytesB64: string | undefined;
-      try {
-        bytesB64 = toBase64(buf);
-      } catch {
-        bytesB64 = undefined;
+      if (transfer === 'binary') {
+        return { ok: true, url, contentType, name, bytes: buf, cached } as const;
       }
-      return { ok: true, url, contentType, name, bytes: buf, bytesB64 } as const;
+      // the page reads the bytes from the cache through the relay iframe (image-relay.ts)
+      if (transfer === 'cache' && transform) {
+        return { ok: true, url, contentType, name, cached, transform } as const;
+      }
+      // base64 only when the bytes can neither cross messaging nor stay in the cache
+      const t0 = performance.now();
+      const bytesB64 = toBase64(buf);
+      const encodeMs = Math.round((performance.now() - t0) * 10) / 10;
+      return { ok: true, url, contentType, name, bytesB64, encodeMs, cached } as const;
     } catch (e) {
       // logs désactivés
       return { ok: false, url } as const;
@@ -112,6 +123,58 @@ onMessage(async (msg) => {
   return undefined;
 });
 
+// Téléchargements en cours par URL: l'upload rejoint celui lancé par le préchargement
+const downloadImage = dedupeDownloads(fetchImage);
+
+// Photo téléchargée, servie par le cache (image-cache.ts) quand il l'a déjà: 'jpeg'
+// si le préchargement l'a transcodée, sinon 'raw'. Un « Réessayer » ou une
+// republication du même article ne repasse pas par le CDN.
+async function fetchImage(url: string, signal?: AbortSignal): Promise<Downloaded | null> {
+  const cache = imageCache();
+  const jpeg = await cache?.get(url, 'jpeg');
+  const hit = jpeg ?? (await cache?.get(url, 'raw'));
+  if (hit) {
+    const buf = await hit.arrayBuffer();
+    const transform = jpeg ? 'jpeg' : 'raw';
+    return { contentType: hit.type || undefined, name: hit.name, buf, cached: true, transform };
+  }
+  // logs désactivés
+  const res = await fetch(url, {
+    method: 'GET',
+    // éviter des réponses vides liées au cache intermédiaire
+    cache: 'no-store',
+    // Référent/Origin explicites pour contourner certaines règles CDN
+    // Note: referrerPolicy "no-referrer-when-downgrade" est le défaut; on force une valeur sûre
+    referrer: 'https://www.vinted.fr/',
+    referrerPolicy: 'strict-origin-when-cross-origin',
+    headers: {
+      Accept: 'image/avif,image/webp,image/*,*/*;q=0.8',
+    },
+    signal,
+  });
+  const name = new URL(url).pathname.split('/').pop() || 'image';
+  if (!res.ok) return { name, buf: new ArrayBuffer(0), cached: false, status: res.status };
+  const contentType = res.headers.get('content-type') || undefined;
+  const buf = await res.arrayBuffer();
+  if (buf.byteLength > 0 && cache) {
+    // attendu: le transfert 'cache' relit cette entrée depuis la page dès la réponse
+    await cache.put(url, 'raw', new Blob([buf], { type: contentType ?? '' }), name);
+    return { contentType, name, buf, cached: false, transform: 'raw' };
+  }
+  return { contentType, name, buf, cached: false };
+}
+
+const prefetcher = createPrefetcher({
+  download: downloadImage,
+  convertToJpeg,
+  sniffImageType,
+  cache: imageCache,
+});
+
+browser.tabs.onRemoved.addListener((tabId) => prefetcher.onTabRemoved(tabId));
+
+browser.tabs.onUpdated.addListener((tabId, info) => prefetcher.onTabUpdated(tabId, info.url));
+
 async function convertToJpeg(
   src: Blob,
   baseName: string,
@@ -200,11 +263,15 @@ function ensureExt(name: string, ext: string): string {
 
 function toBase64(buf: ArrayBuffer): string {
   try {
-    // Convert ArrayBuffer -> binary string -> base64
-    let binary = '';
+    // Convert ArrayBuffer -> binary string -> base64, by chunks (one call per 32 KiB
+    // instead of one string concat per byte)
+    const parts: string[] = [];
     const bytes = new Uint8Array(buf);
-    const len = bytes.byteLength;
-    for (let i = 0; i < len; i++) binary += String.fromCharCode(bytes[i] as number);
+    const CHUNK = 0x8000;
+    for (let i = 0; i < bytes.byteLength; i += CHUNK) {
+      parts.push(String.fromCharCode(...bytes.subarray(i, i + CHUNK)));
+    }
+    const binary = parts.join('');
     // btoa available in SW
     // eslint-disable-next-line no-undef
     return btoa(binary);
@@ -4,10 +4,13 @@
 
 import browser from 'webextension-polyfill';
 
+import { waitForElement } from '../lib/dom-utils';
+import { lastScheduleReport } from '../lib/fill-scheduler';
 import { fillNewItemForm } from '../lib/filler';
-import { log } from '../lib/metrics';
+import { log, perf, takeWaitRecords } from '../lib/metrics';
 import type { RepublishDraft } from '../types/draft';
 import { KEY_REPUBLISH_SOURCE } from '../types/draft';
+import { MAX_UPLOAD_IMAGES } from '../types/messages';
 export {};
 
 // Lightweight helper: show a temporary info box
@@ -133,7 +136,7 @@ function injectUploadButton(imageUrls: string[] | undefined) {
     btn.textContent = 'Upload en cours...';
     try {
       const mod = await import('../lib/image-uploader');
-      await mod.uploadImages(imageUrls.slice(0, 10));
+      await mod.uploadImages(imageUrls.slice(0, MAX_UPLOAD_IMAGES));
       btn.textContent = 'Upload terminé';
       setTimeout(() => btn.remove(), 1200);
       log('info', 'upload-button:success', { count: imageUrls.length });
@@ -185,9 +188,7 @@ function injectUploadButton(imageUrls: string[] | undefined) {
         }
 
         // Try to wait briefly for minimal form readiness; bail out if not present
-        const ready = () => !!document.querySelector('input[name="title"]');
-        const start = Date.now();
-        while (!ready() && Date.now() - start < 5000) await new Promise((r) => setTimeout(r, 200));
+        await waitForElement('input[name="title"]', { timeoutMs: 5000 });
 
         await fillNewItemForm(draft as RepublishDraft);
         showInfo('Formulaire rempli');
@@ -232,6 +233,9 @@ function injectUploadButton(imageUrls: string[] | undefined) {
 declare global {
   interface Window {
     __vx_invokeFill?: (d: Partial<RepublishDraft>) => Promise<void>;
+    __vx_invokeUpload?: (urls: string[]) => Promise<void>;
+    __vx_takeWaitRecords?: typeof takeWaitRecords;
+    __vx_fillSchedule?: typeof lastScheduleReport;
   }
 }
 
@@ -244,10 +248,29 @@ async function __vx_fillDraft(d: Partial<RepublishDraft>) {
   }
 }
 
+// Same path as the upload button, without the click (benchmarks time it as perf:upload)
+async function __vx_uploadDraftImages(urls: string[]) {
+  perf('upload', 'start');
+  try {
+    const mod = await import('../lib/image-uploader');
+    await mod.uploadImages(urls.slice(0, MAX_UPLOAD_IMAGES));
+  } catch (err) {
+    log('warn', 'upload:e2e:error', { message: (err as Error)?.message ?? String(err) });
+  } finally {
+    perf('upload', 'end');
+  }
+}
+
 try {
   // attach if possible
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
   (window as any).__vx_invokeFill = __vx_fillDraft;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  (window as any).__vx_invokeUpload = __vx_uploadDraftImages;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  (window as any).__vx_takeWaitRecords = takeWaitRecords;
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  (window as any).__vx_fillSchedule = lastScheduleReport;
 } catch {
   /* ignore */
 }
@@ -5,7 +5,12 @@ import { sendMessage } from '../lib/messaging';
 import { setTyped } from '../lib/storage';
 import type { RepublishDraft } from '../types/draft';
 import { KEY_REPUBLISH_DRAFT, KEY_REPUBLISH_SOURCE, RepublishDraftSchema } from '../types/draft';
-import { ContentReady, RepublishCreate, RepublishInjected } from '../types/messages';
+import {
+  ContentReady,
+  MAX_UPLOAD_IMAGES,
+  RepublishCreate,
+  RepublishInjected,
+} from '../types/messages';
 
 function debug(...args: unknown[]) {
   // logs désactivés
@@ -329,7 +334,21 @@ async function onRepublishClick() {
   } catch {
     /* ignore marker write failures */
   }
-  await sendMessage(RepublishCreate, { type: 'republish:create', payload: { targetUrl } });
+  // photos à précharger côté background (une URL invalide ferait rejeter tout le message);
+  // seulement celles que l'upload prendra (MAX_UPLOAD_IMAGES)
+  const images = draft.images
+    .filter((u) => {
+      try {
+        return /^https?:$/.test(new URL(u).protocol);
+      } catch {
+        return false;
+      }
+    })
+    .slice(0, MAX_UPLOAD_IMAGES);
+  await sendMessage(RepublishCreate, {
+    type: 'republish:create',
+    payload: { targetUrl, images },
+  });
   // Note: l’auto-remplissage sera géré par un content script sur la page /items/new
   try {
     await setTyped(KEY_REPUBLISH_DRAFT, draft, RepublishDraftSchema);
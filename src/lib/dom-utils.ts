@@ -1,3 +1,5 @@
+import { queryOnce, waitFor } from './wait-registry';
+
 let cachedInputEventCtor: typeof InputEvent | null = null;
 let hasCachedInputEventCtor = false;
 
@@ -249,43 +251,58 @@ export function blurInput(el: HTMLInputElement | HTMLTextAreaElement | null | un
   }
 }
 
+// Attend selector via le registre partagé (wait-registry): résolu sur la mutation
+// qui fait apparaître l'élément. intervalMs n'est plus utilisé (pas de polling),
+// il reste accepté pour les appelants existants.
 export async function waitForElement<T extends Element>(
   selector: string,
-  options?: { timeoutMs?: number; intervalMs?: number },
+  options?: { timeoutMs?: number; intervalMs?: number; signal?: AbortSignal },
 ): Promise<T | null> {
-  const { timeoutMs = 3000, intervalMs = 60 } = options ?? {};
-  const start = Date.now();
-  let el = document.querySelector<T>(selector);
+  const { timeoutMs = 3000, signal } = options ?? {};
+  const el = document.querySelector<T>(selector);
   if (el) return el;
-  while (Date.now() - start < timeoutMs) {
-    await new Promise((r) => setTimeout(r, intervalMs));
-    el = document.querySelector<T>(selector);
-    if (el) return el;
-  }
-  return null;
+  const start = Date.now();
+  const found = await waitFor(() => queryOnce<T>(selector), { timeoutMs, signal });
+  if (!signal?.aborted) noteWait('element', start, timeoutMs, !!found, selector);
+  return found;
 }
 
 export function delay(ms: number) {
   return new Promise((r) => setTimeout(r, ms));
 }
 
+function isGone(selector: string): boolean {
+  const node = queryOnce<HTMLElement>(selector);
+  if (!node) return true;
+  const st = window.getComputedStyle(node);
+  return st.display === 'none' || st.visibility === 'hidden' || st.opacity === '0';
+}
+
 export async function waitForGone(selector: string, timeoutMs = 800): Promise<boolean> {
+  if (isGone(selector)) return true;
   const start = Date.now();
-  while (Date.now() - start < timeoutMs) {
-    const node = document.querySelector(selector) as HTMLElement | null;
-    if (!node) return true;
-    const st = node ? window.getComputedStyle(node) : null;
-    if (st && (st.display === 'none' || st.visibility === 'hidden' || st.opacity === '0')) {
-      return true;
-    }
-    await delay(40);
+  // pollMs: une transition d'opacité n'émet aucune mutation, seul le timer la voit finir
+  // (40 ms comme l'ancien polling)
+  const gone = !!(await waitFor(() => isGone(selector), { timeoutMs, pollMs: 40 }));
+  if (!gone) noteWait('gone', start, timeoutMs, gone, selector);
+  return gone;
+}
+
+// Durée/timeout des attentes, pour les runs sous throttling (metrics.recordWait)
+export function noteWait(
+  name: string,
+  start: number,
+  budgetMs: number,
+  ok: boolean,
+  target?: string,
+) {
+  const ms = Date.now() - start;
+  try {
+    // eslint-disable-next-line @typescript-eslint/no-floating-promises
+    import('./metrics').then((m) => m.recordWait(name, ms, budgetMs, ok, target));
+  } catch (e) {
+    /* ignore */
   }
-  const node = document.querySelector(selector) as HTMLElement | null;
-  if (!node) return true;
-  const st = node ? window.getComputedStyle(node) : null;
-  return (
-    !node || !!(st && (st.display === 'none' || st.visibility === 'hidden' || st.opacity === '0'))
-  );
 }
 
 export async function clickInTheVoid(): Promise<void> {
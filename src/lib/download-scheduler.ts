@@ -0,0 +1,190 @@
+// Ordonnanceur des téléchargements d'images: concurrence adaptative, limite par hôte,
+// reprises avec backoff + jitter, et priorité à l'ordre d'origine (la photo de
+// couverture d'abord, une reprise repasse devant les suivantes).
+//
+// Concurrence: +1 tant que le débit (octets/ms sur une « ronde » de `limit` images)
+// progresse de plus de 10 %, -1 s'il recule d'autant, divisée par deux sur erreur.
+
+export type DownloadAttempt = { attempt: number; final: boolean };
+
+export type DownloadResult<T> = {
+  url: string;
+  index: number;
+  ok: boolean;
+  value: T | null;
+  attempts: number;
+  // du premier démarrage à la fin, reprises comprises
+  ms: number;
+  // concurrence au moment du résultat
+  concurrency: number;
+  error?: string;
+};
+
+export type DownloadOptions<T> = {
+  initial?: number;
+  max?: number;
+  perHost?: number;
+  retries?: number;
+  baseDelayMs?: number;
+  maxDelayMs?: number;
+  sizeOf?: (value: T) => number;
+  onResult?: (result: DownloadResult<T>) => void;
+};
+
+type Job = {
+  url: string;
+  index: number;
+  host: string;
+  attempt: number;
+  notBefore: number;
+  firstStart: number;
+};
+
+function hostOf(url: string): string {
+  try {
+    return new URL(url).host;
+  } catch {
+    return '';
+  }
+}
+
+export function backoffDelay(attempt: number, baseMs: number, maxMs: number): number {
+  const exp = Math.min(maxMs, baseMs * 2 ** Math.max(0, attempt - 1));
+  // jitter « égal »: entre la moitié et la totalité du délai
+  return Math.round(exp / 2 + Math.random() * (exp / 2));
+}
+
+// task() lève une erreur pour un échec transitoire (repris tant que !final) et rend
+// null pour un échec définitif. Résultats dans l'ordre des URLs.
+export function runDownloads<T>(
+  urls: string[],
+  task: (url: string, attempt: DownloadAttempt) => Promise<T | null>,
+  options: DownloadOptions<T> = {},
+): Promise<DownloadResult<T>[]> {
+  const {
+    max = 6,
+    perHost = 4,
+    retries = 2,
+    baseDelayMs = 300,
+    maxDelayMs = 4000,
+    sizeOf,
+    onResult,
+  } = options;
+  const min = 1;
+  let limit = Math.max(min, Math.min(max, options.initial ?? 2));
+  const results: DownloadResult<T>[] = new Array(urls.length);
+  const pending: Job[] = urls.map((url, index) => ({
+    url,
+    index,
+    host: hostOf(url),
+    attempt: 0,
+    notBefore: 0,
+    firstStart: 0,
+  }));
+  const activeByHost = new Map<string, number>();
+  let active = 0;
+  let round = { bytes: 0, done: 0, start: Date.now() };
+  let lastRate: number | null = null;
+  let wakeTimer: ReturnType<typeof setTimeout> | null = null;
+
+  const adapt = (bytes: number) => {
+    round.bytes += bytes;
+    round.done++;
+    if (round.done < limit) return;
+    const rate = round.bytes / Math.max(1, Date.now() - round.start);
+    if (lastRate === null || rate > lastRate * 1.1) limit = Math.min(max, limit + 1);
+    else if (rate < lastRate * 0.9) limit = Math.max(min, limit - 1);
+    lastRate = rate;
+    round = { bytes: 0, done: 0, start: Date.now() };
+  };
+
+  const backOff = () => {
+    limit = Math.max(min, Math.floor(limit / 2));
+    lastRate = null;
+    round = { bytes: 0, done: 0, start: Date.now() };
+  };
+
+  // une reprise garde sa place: la file reste triée par index
+  const requeue = (job: Job) => {
+    const at = pending.findIndex((j) => j.index > job.index);
+    pending.splice(at === -1 ? pending.length : at, 0, job);
+  };
+
+  return new Promise((resolve) => {
+    const finish = (job: Job, ok: boolean, value: T | null, error?: string) => {
+      const result: DownloadResult<T> = {
+        url: job.url,
+        index: job.index,
+        ok,
+        value,
+        attempts: job.attempt,
+        ms: Date.now() - job.firstStart,
+        concurrency: limit,
+        error,
+      };
+      results[job.index] = result;
+      try {
+        onResult?.(result);
+      } catch {
+        /* ignore */
+      }
+    };
+
+    const run = async (job: Job) => {
+      job.attempt++;
+      if (!job.firstStart) job.firstStart = Date.now();
+      const final = job.attempt > retries;
+      try {
+        const value = await task(job.url, { attempt: job.attempt, final });
+        if (value !== null) adapt(sizeOf ? sizeOf(value) : 1);
+        finish(job, value !== null, value);
+      } catch (e) {
+        const error = (e as Error)?.message ?? String(e);
+        backOff();
+        if (final) {
+          finish(job, false, null, error);
+        } else {
+          job.notBefore = Date.now() + backoffDelay(job.attempt, baseDelayMs, maxDelayMs);
+          requeue(job);
+        }
+      } finally {
+        active--;
+        activeByHost.set(job.host, (activeByHost.get(job.host) ?? 1) - 1);
+        pump();
+      }
+    };
+
+    const pump = () => {
+      if (wakeTimer) clearTimeout(wakeTimer);
+      wakeTimer = null;
+      if (!pending.length && !active) {
+        resolve(results);
+        return;
+      }
+      const now = Date.now();
+      let wakeAt = Infinity;
+      const starting: Job[] = [];
+      for (let i = 0; i < pending.length && active < limit; ) {
+        const job = pending[i] as Job;
+        if (job.notBefore > now) {
+          wakeAt = Math.min(wakeAt, job.notBefore);
+          i++;
+          continue;
+        }
+        if ((activeByHost.get(job.host) ?? 0) >= perHost) {
+          i++;
+          continue;
+        }
+        pending.splice(i, 1);
+        active++;
+        activeByHost.set(job.host, (activeByHost.get(job.host) ?? 0) + 1);
+        starting.push(job);
+      }
+      if (wakeAt !== Infinity) wakeTimer = setTimeout(pump, wakeAt - now);
+      // lancés après le parcours: une tâche qui échoue tout de suite rappelle pump()
+      for (const job of starting) void run(job);
+    };
+
+    pump();
+  });
+}
@@ -4,6 +4,7 @@ import {
   click,
   delay,
   normalize,
+  noteWait,
   robustClick,
   setInputValue,
   waitForElement,
@@ -209,9 +210,13 @@ export async function waitForTitlesChange(
   while (Date.now() - start < timeoutMs) {
     const titles = queryDropdownTitleNodes(root);
     const sig = titles.map((t) => normalize(t.textContent ?? '')).join('|');
-    if (sig && sig !== prevSig) return true;
+    if (sig && sig !== prevSig) {
+      noteWait('dropdown.titlesChange', start, timeoutMs, true);
+      return true;
+    }
     await delay(40);
   }
+  noteWait('dropdown.titlesChange', start, timeoutMs, false);
   return false;
 }
 
@@ -0,0 +1,130 @@
+// Ordonnanceur du remplissage: un petit graphe de tâches avec dépendances déclarées.
+// Une tâche démarre dès que toutes ses dépendances sont terminées (même en échec:
+// un champ raté ne bloque pas les suivants, comme l'ancienne séquence). Les tâches
+// qui partagent un verrou (lock) s'exécutent une à une, dans l'ordre de déclaration:
+// deux listes déroulantes ouvertes en même temps se referment l'une l'autre.
+
+import { invariant } from './dom-utils';
+import { log, perf } from './metrics';
+
+export type FillTask = {
+  id: string;
+  deps?: string[];
+  lock?: string;
+  run: () => Promise<void>;
+};
+
+export type TaskTiming = {
+  id: string;
+  // ms depuis le début du remplissage
+  start: number;
+  end: number;
+  ms: number;
+  // attente du verrou une fois les dépendances satisfaites
+  lockWaitMs: number;
+  ok: boolean;
+  // tâche dont la fin a débloqué celle-ci (dépendance ou détenteur du verrou)
+  after?: string;
+};
+
+export type ScheduleReport = {
+  totalMs: number;
+  tasks: TaskTiming[];
+  criticalPath: string[];
+};
+
+let lastReport: ScheduleReport | null = null;
+
+// Dernier rapport (e2e, diagnostic)
+export function lastScheduleReport(): ScheduleReport | null {
+  return lastReport;
+}
+
+export function criticalPath(tasks: TaskTiming[]): string[] {
+  const byId = new Map(tasks.map((t) => [t.id, t]));
+  let cur: TaskTiming | undefined;
+  for (const t of tasks) if (!cur || t.end > cur.end) cur = t;
+  const path: string[] = [];
+  while (cur) {
+    path.unshift(cur.id);
+    cur = cur.after ? byId.get(cur.after) : undefined;
+  }
+  return path;
+}
+
+export async function runFillTasks(tasks: FillTask[]): Promise<ScheduleReport> {
+  const ids = new Set(tasks.map((t) => t.id));
+  invariant(ids.size === tasks.length, 'fill tasks: duplicate id');
+  for (const t of tasks) {
+    for (const d of t.deps ?? []) invariant(ids.has(d), `fill task ${t.id}: unknown dep ${d}`);
+  }
+
+  const t0 = Date.now();
+  const timings = new Map<string, TaskTiming>();
+  const done = new Set<string>();
+  const started = new Set<string>();
+  const held = new Map<string, string>(); // verrou -> tâche qui le détient
+  const lastHolder = new Map<string, string>(); // verrou -> dernière tâche l'ayant rendu
+  const readyAt = new Map<string, number>();
+  const running: Promise<void>[] = [];
+
+  let wake: () => void = () => {};
+  const depsDone = (t: FillTask) => (t.deps ?? []).every((d) => done.has(d));
+
+  const launch = (t: FillTask) => {
+    started.add(t.id);
+    if (t.lock) held.set(t.lock, t.id);
+    const start = Date.now() - t0;
+    const ready = readyAt.get(t.id) ?? start;
+    // ce qui a débloqué la tâche: la dernière dépendance finie, ou le verrou si plus tard
+    let after: string | undefined;
+    let afterEnd = -1;
+    for (const d of t.deps ?? []) {
+      const end = timings.get(d)?.end ?? 0;
+      if (end > afterEnd) [after, afterEnd] = [d, end];
+    }
+    const holder = t.lock ? lastHolder.get(t.lock) : undefined;
+    if (holder && start > ready && (timings.get(holder)?.end ?? 0) >= afterEnd) after = holder;
+
+    const run = async () => {
+      log('debug', `dep:${t.id}:start`);
+      perf(t.id, 'start');
+      let ok = true;
+      try {
+        await t.run();
+      } catch (e) {
+        ok = false;
+        log('warn', `dep:${t.id}:error`, { message: (e as Error)?.message });
+      }
+      perf(t.id, 'end');
+      log('debug', `dep:${t.id}:end`);
+      const end = Date.now() - t0;
+      const lockWaitMs = start - ready;
+      timings.set(t.id, { id: t.id, start, end, ms: end - start, lockWaitMs, ok, after });
+      done.add(t.id);
+      if (t.lock) {
+        held.delete(t.lock);
+        lastHolder.set(t.lock, t.id);
+      }
+      wake();
+    };
+    running.push(run());
+  };
+
+  while (done.size < tasks.length) {
+    const woken = new Promise<void>((r) => (wake = r));
+    for (const t of tasks) {
+      if (started.has(t.id) || !depsDone(t)) continue;
+      if (!readyAt.has(t.id)) readyAt.set(t.id, Date.now() - t0);
+      if (t.lock && held.has(t.lock)) continue;
+      launch(t);
+    }
+    invariant(started.size > done.size, 'fill tasks: dependency cycle');
+    await woken;
+  }
+  await Promise.all(running);
+
+  const ordered = tasks.map((t) => timings.get(t.id) as TaskTiming);
+  lastReport = { totalMs: Date.now() - t0, tasks: ordered, criticalPath: criticalPath(ordered) };
+  return lastReport;
+}
@@ -2,6 +2,8 @@ import type { RepublishDraft } from '../types/draft';
 import { fillCategory } from './category-simple';
 import { click, setInputValue, typeInputLikeUser, waitForElement } from './dom-utils';
 import { closeAnyDropdowns } from './dropdown';
+import type { FillTask } from './fill-scheduler';
+import { runFillTasks } from './fill-scheduler';
 import { fillBrand } from './fillers/brand';
 import { fillColor } from './fillers/color';
 import { fillCondition } from './fillers/condition';
@@ -78,220 +80,240 @@ export async function fillNewItemForm(draft: RepublishDraft) {
     runId,
   });
   try {
-    // Attendre et remplir la catégorie si fournie
-    const categorySelector =
-      '[data-testid="catalog-select-dropdown-input"], [data-testid="catalog-select-input"]';
-
-    if (draft.categoryPath && draft.categoryPath.length) {
-      perf('category', 'start');
-      const path = sanitizeCategoryPath(draft.categoryPath ?? []);
-      if (path.length) {
-        // Attendre la présence du champ catégorie (page lente)
-        const catInput = await waitForElement<HTMLInputElement>(categorySelector, {
-          timeoutMs: 8000,
-        });
-        if (!catInput) {
-          log('warn', 'category:input:not-found-after-wait');
-        }
+    const hasCategory = !!draft.categoryPath?.length;
+    const afterCategory = hasCategory ? ['category'] : [];
+    // Les champs texte ne dépendent pas de la catégorie: remplis pendant qu'elle se résout.
+    // Listes déroulantes (et la case unisex, dont le clic referme un menu ouvert):
+    // verrou commun, dans l'ordre historique, après le commit de la catégorie.
+    const tasks: FillTask[] = [
+      { id: 'title', run: () => fillTitle(draft) },
+      { id: 'description', run: () => fillDescription(draft) },
+      { id: 'price', run: () => fillPrice(draft) },
+    ];
+    if (hasCategory) {
+      tasks.push(
+        { id: 'category', lock: 'dropdown', run: () => fillCategoryStep(draft) },
+        { id: 'unisex', deps: afterCategory, lock: 'dropdown', run: () => fillUnisex(draft) },
+      );
+    }
+    const dependents: [keyof RepublishDraft, (d: RepublishDraft) => Promise<void>][] = [
+      ['brand', fillBrand],
+      ['size', fillSize],
+      ['condition', fillCondition],
+      ['color', fillColor],
+      ['material', fillMaterial],
+      ['patterns', fillPatterns],
+    ];
+    for (const [id, fill] of dependents) {
+      tasks.push({ id, deps: afterCategory, lock: 'dropdown', run: () => fill(draft) });
+    }
 
-        const success = await fillCategory(path);
-        if (!success) {
-          log('warn', 'category:failed', { path });
-        }
+    const schedule = await runFillTasks(tasks);
+    log('info', 'fill:schedule', {
+      totalMs: schedule.totalMs,
+      criticalPath: schedule.criticalPath.join(' > '),
+      tasks: schedule.tasks.map((t) => `${t.id}:${t.start}+${t.ms}ms${t.ok ? '' : ':error'}`),
+    });
 
-        // Unisex option (après commit catégorie)
-        // Unisex option (après commit catégorie)
-        try {
-          const descText = (draft.description ?? '') as string;
-          const looksUnisex =
-            !!draft.unisex ||
-            (typeof descText === 'string' && /\b(unisex|unisexe|unisexes?)\b/i.test(descText));
+    // Pas de pause inutile: laisser la page réagir naturellement
 
-          if (looksUnisex) {
-            const unisexSelector =
-              'input[type="checkbox"]#unisex, input[type="checkbox"][name*="unisex" i], input[type="checkbox"][aria-label*="unisex" i]';
-            const unisexInput = await waitForElement<HTMLInputElement>(unisexSelector, {
-              timeoutMs: 3000,
-            });
-            if (unisexInput) {
-              if (!unisexInput.checked) {
-                try {
-                  click(unisexInput);
-                } catch {
-                  // fallback: set property and dispatch events
-                  try {
-                    unisexInput.checked = true;
-                    unisexInput.dispatchEvent(new Event('input', { bubbles: true }));
-                    unisexInput.dispatchEvent(new Event('change', { bubbles: true }));
-                  } catch {
-                    /* ignore */
-                  }
-                }
-                log('info', 'fill:unisex:checked');
-              } else {
-                log('debug', 'fill:unisex:already-checked');
-              }
-            } else {
-              log('warn', 'fill:unisex:not-found');
-            }
-          }
-        } catch (e) {
-          log('warn', 'fill:unisex:error', { message: (e as Error)?.message ?? String(e) });
-        }
-      }
-      perf('category', 'end');
+    perf('total', 'end');
+    log('info', 'fill:end', { runId });
+    try {
+      await closeAnyDropdowns();
+    } catch {
+      /* ignore */
     }
+  } finally {
+    win.__vx_fillRunning = false;
+  }
+}
 
-    // Remplir les champs principaux (titre/description/prix)
-    const titleInput = await waitForElement<HTMLInputElement>(
-      'input[name="title"], input#title, [data-testid="title--input"], [data-testid="title-input"], [data-testid="title-field-input"]',
-    );
-    if (titleInput && draft.title) {
-      setInputValue(titleInput, draft.title);
-      log('debug', 'fill:title:set', titleInput.value);
-    }
+const CATEGORY_SELECTOR =
+  '[data-testid="catalog-select-dropdown-input"], [data-testid="catalog-select-input"]';
 
-    const descInput = await waitForElement<HTMLTextAreaElement>(
-      'textarea[name="description"], textarea#description, [data-testid="description--input"], [data-testid="description-input"], [data-testid="description-field-input"]',
-    );
-    if (descInput && draft.description) {
-      setInputValue(descInput, draft.description);
-      log('debug', 'fill:description:set');
-    }
+async function fillCategoryStep(draft: RepublishDraft) {
+  const path = sanitizeCategoryPath(draft.categoryPath ?? []);
+  if (!path.length) return;
+  // Attendre la présence du champ catégorie (page lente)
+  const catInput = await waitForElement<HTMLInputElement>(CATEGORY_SELECTOR, {
+    timeoutMs: 8000,
+  });
+  if (!catInput) {
+    log('warn', 'category:input:not-found-after-wait');
+  }
+
+  const success = await fillCategory(path);
+  if (!success) {
+    log('warn', 'category:failed', { path });
+  }
+}
 
-    const priceInputRoot = await waitForElement<HTMLInputElement | HTMLElement>(
-      'input[name="price"], input#price, [data-testid="price-input--input"], [data-testid="price-input"], [data-testid="price-field-input"]',
-    );
-    const priceInput =
-      priceInputRoot instanceof HTMLInputElement || priceInputRoot instanceof HTMLTextAreaElement
-        ? priceInputRoot
-        : (priceInputRoot?.querySelector('input, textarea') as
-            | HTMLInputElement
-            | HTMLTextAreaElement
-            | null);
-    if (priceInput) {
-      if (typeof draft.priceValue === 'number' && Number.isFinite(draft.priceValue)) {
-        const priceValue = draft.priceValue;
-        const primary = formatPriceForElement(priceInput, priceValue);
-        const attempted: string[] = [primary];
-        setInputValue(priceInput, primary);
-        log('debug', 'fill:price:set', {
-          mode: 'primary',
-          type: priceInput instanceof HTMLInputElement ? priceInput.type : null,
-          value: priceInput.value,
-          primary,
-        });
+// Unisex option (après commit catégorie)
+async function fillUnisex(draft: RepublishDraft) {
+  if (!sanitizeCategoryPath(draft.categoryPath ?? []).length) return;
+  try {
+    const descText = (draft.description ?? '') as string;
+    const looksUnisex =
+      !!draft.unisex ||
+      (typeof descText === 'string' && /\b(unisex|unisexe|unisexes?)\b/i.test(descText));
 
-        const fallbacks = collectPriceFallbacks(priceValue, primary);
-        fallbacks.forEach((candidate, index) => {
-          const delay = 70 * (index + 1);
-          attempted.push(candidate);
-          setTimeout(() => {
+    if (looksUnisex) {
+      const unisexSelector =
+        'input[type="checkbox"]#unisex, input[type="checkbox"][name*="unisex" i], input[type="checkbox"][aria-label*="unisex" i]';
+      const unisexInput = await waitForElement<HTMLInputElement>(unisexSelector, {
+        timeoutMs: 3000,
+      });
+      if (unisexInput) {
+        if (!unisexInput.checked) {
+          try {
+            click(unisexInput);
+          } catch {
+            // fallback: set property and dispatch events
             try {
-              if (isPriceValueInvalid(priceInput.value)) {
-                setInputValue(priceInput, candidate);
-                log('debug', 'fill:price:fallback:set', {
-                  candidate,
-                  delay,
-                  value: priceInput.value,
-                });
-              }
+              unisexInput.checked = true;
+              unisexInput.dispatchEvent(new Event('input', { bubbles: true }));
+              unisexInput.dispatchEvent(new Event('change', { bubbles: true }));
             } catch {
               /* ignore */
             }
-          }, delay);
-        });
+          }
+          log('info', 'fill:unisex:checked');
+        } else {
+          log('debug', 'fill:unisex:already-checked');
+        }
+      } else {
+        log('warn', 'fill:unisex:not-found');
+      }
+    }
+  } catch (e) {
+    log('warn', 'fill:unisex:error', { message: (e as Error)?.message ?? String(e) });
+  }
+}
+
+async function fillTitle(draft: RepublishDraft) {
+  const titleInput = await waitForElement<HTMLInputElement>(
+    'input[name="title"], input#title, [data-testid="title--input"], [data-testid="title-input"], [data-testid="title-field-input"]',
+  );
+  if (titleInput && draft.title) {
+    setInputValue(titleInput, draft.title);
+    log('debug', 'fill:title:set', titleInput.value);
+  }
+}
+
+async function fillDescription(draft: RepublishDraft) {
+  const descInput = await waitForElement<HTMLTextAreaElement>(
+    'textarea[name="description"], textarea#description, [data-testid="description--input"], [data-testid="description-input"], [data-testid="description-field-input"]',
+  );
+  if (descInput && draft.description) {
+    setInputValue(descInput, draft.description);
+    log('debug', 'fill:description:set');
+  }
+}
 
-        const typeDelay = 70 * (fallbacks.length + 2);
+async function fillPrice(draft: RepublishDraft) {
+  const priceInputRoot = await waitForElement<HTMLInputElement | HTMLElement>(
+    'input[name="price"], input#price, [data-testid="price-input--input"], [data-testid="price-input"], [data-testid="price-field-input"]',
+  );
+  const priceInput =
+    priceInputRoot instanceof HTMLInputElement || priceInputRoot instanceof HTMLTextAreaElement
+      ? priceInputRoot
+      : (priceInputRoot?.querySelector('input, textarea') as
+          | HTMLInputElement
+          | HTMLTextAreaElement
+          | null);
+  if (priceInput) {
+    if (typeof draft.priceValue === 'number' && Number.isFinite(draft.priceValue)) {
+      const priceValue = draft.priceValue;
+      const primary = formatPriceForElement(priceInput, priceValue);
+      const attempted: string[] = [primary];
+      setInputValue(priceInput, primary);
+      log('debug', 'fill:price:set', {
+        mode: 'primary',
+        type: priceInput instanceof HTMLInputElement ? priceInput.type : null,
+        value: priceInput.value,
+        primary,
+      });
+
+      const fallbacks = collectPriceFallbacks(priceValue, primary);
+      fallbacks.forEach((candidate, index) => {
+        const delay = 70 * (index + 1);
+        attempted.push(candidate);
         setTimeout(() => {
           try {
             if (isPriceValueInvalid(priceInput.value)) {
-              const typed = String(priceValue);
-              attempted.push(`[type:${typed}]`);
-              typeInputLikeUser(priceInput, typed);
-              log('debug', 'fill:price:fallback:type', {
-                typed,
+              setInputValue(priceInput, candidate);
+              log('debug', 'fill:price:fallback:set', {
+                candidate,
+                delay,
                 value: priceInput.value,
               });
             }
           } catch {
             /* ignore */
           }
-        }, typeDelay);
+        }, delay);
+      });
 
-        const cents = Math.round(priceValue * 100);
-        const hasDigitsFallback = Number.isFinite(cents);
-        const digitsDelay = typeDelay + 140;
-        if (hasDigitsFallback) {
-          const absDigits = String(Math.abs(cents));
-          const digitsInput = priceValue < 0 ? `-${absDigits}` : absDigits;
-          setTimeout(() => {
-            try {
-              if (isPriceValueInvalid(priceInput.value)) {
-                attempted.push(`[digits:${digitsInput}]`);
-                typeInputLikeUser(priceInput, digitsInput);
-                log('debug', 'fill:price:fallback:type-digits', {
-                  digits: digitsInput,
-                  value: priceInput.value,
-                });
-              }
-            } catch {
-              /* ignore */
-            }
-          }, digitsDelay);
+      const typeDelay = 70 * (fallbacks.length + 2);
+      setTimeout(() => {
+        try {
+          if (isPriceValueInvalid(priceInput.value)) {
+            const typed = String(priceValue);
+            attempted.push(`[type:${typed}]`);
+            typeInputLikeUser(priceInput, typed);
+            log('debug', 'fill:price:fallback:type', {
+              typed,
+              value: priceInput.value,
+            });
+          }
+        } catch {
+          /* ignore */
         }
+      }, typeDelay);
 
-        const finalCheckDelay = (hasDigitsFallback ? digitsDelay : typeDelay) + 220;
+      const cents = Math.round(priceValue * 100);
+      const hasDigitsFallback = Number.isFinite(cents);
+      const digitsDelay = typeDelay + 140;
+      if (hasDigitsFallback) {
+        const absDigits = String(Math.abs(cents));
+        const digitsInput = priceValue < 0 ? `-${absDigits}` : absDigits;
         setTimeout(() => {
           try {
             if (isPriceValueInvalid(priceInput.value)) {
-              log('warn', 'fill:price:still-invalid', {
+              attempted.push(`[digits:${digitsInput}]`);
+              typeInputLikeUser(priceInput, digitsInput);
+              log('debug', 'fill:price:fallback:type-digits', {
+                digits: digitsInput,
                 value: priceInput.value,
-                priceValue,
-                attempted,
-                type: priceInput instanceof HTMLInputElement ? priceInput.type : null,
               });
             }
           } catch {
             /* ignore */
           }
-        }, finalCheckDelay);
-      } else if (draft.priceValue != null) {
-        log('warn', 'fill:price:non-numeric', { priceValue: draft.priceValue });
-      } else {
-        log('debug', 'fill:price:skip:missing');
+        }, digitsDelay);
       }
-    }
-
-    // Champs dépendants: remplir dans l'ordre
-    const seq = async (label: keyof RepublishDraft, fn: () => Promise<void>) => {
-      log('debug', `dep:${label}:start`);
-      try {
-        await fn();
-      } catch (e) {
-        log('warn', `dep:${label}:error`, { message: (e as Error)?.message });
-      }
-      log('debug', `dep:${label}:end`);
-    };
 
-    await seq('brand', () => fillBrand(draft));
-    await seq('size', () => fillSize(draft));
-    await seq('condition', () => fillCondition(draft));
-    await seq('color', () => fillColor(draft));
-    await seq('material', () => fillMaterial(draft));
-    await seq('patterns', () => fillPatterns(draft));
-
-    // Pas de pause inutile: laisser la page réagir naturellement
-
-    perf('total', 'end');
-    log('info', 'fill:end', { runId });
-    try {
-      await closeAnyDropdowns();
-    } catch {
-      /* ignore */
+      const finalCheckDelay = (hasDigitsFallback ? digitsDelay : typeDelay) + 220;
+      setTimeout(() => {
+        try {
+          if (isPriceValueInvalid(priceInput.value)) {
+            log('warn', 'fill:price:still-invalid', {
+              value: priceInput.value,
+              priceValue,
+              attempted,
+              type: priceInput instanceof HTMLInputElement ? priceInput.type : null,
+            });
+          }
+        } catch {
+          /* ignore */
+        }
+      }, finalCheckDelay);
+    } else if (draft.priceValue != null) {
+      log('warn', 'fill:price:non-numeric', { priceValue: draft.priceValue });
+    } else {
+      log('debug', 'fill:price:skip:missing');
     }
-  } finally {
-    win.__vx_fillRunning = false;
   }
 }
 
@@ -10,6 +10,7 @@ import {
 } from '../dropdown';
 import { NO_BRAND_SYNONYMS } from '../i18n';
 import { log } from '../metrics';
+import { waitFor } from '../wait-registry';
 
 const BRAND_INPUT_SELECTOR = [
   'input[name="brand"]',
@@ -40,12 +41,10 @@ async function waitForInputValueEquals(
 ): Promise<boolean> {
   const norm = (s: string) => (s || '').trim();
   const target = norm(expected);
-  const start = Date.now();
-  while (Date.now() - start < timeoutMs) {
-    if (norm(input.value) === target) return true;
-    await new Promise((r) => setTimeout(r, 40));
-  }
-  return norm(input.value) === target;
+  // input.value posé par React n'est pas une mutation: événements input/change + pollMs,
+  // 40 ms comme l'ancien polling: sous le verrou des dropdowns, chaque attente compte
+  const committed = await waitFor(() => norm(input.value) === target, { timeoutMs, pollMs: 40 });
+  return !!committed;
 }
 
 async function selectBrandEmptyById(): Promise<boolean> {
@@ -0,0 +1,272 @@
+// Cache des images, clé = URL source + transformation. Taille plafonnée, éviction
+// LRU, compteurs hit/miss.
+//
+// Deux instances:
+// - imageCache(): persistante (IndexedDB), dans le background seulement. IndexedDB
+//   est lié à l'origine: celle de l'extension pour le worker. Transformations 'raw'
+//   (octets téléchargés) et 'jpeg' (transcodage du préchargement).
+// - pageImageCache(): en mémoire, petite, dans le content script. Elle ne sert qu'aux
+//   reprises dans la même page ('upload', 'upload|rot:<angle>'). Jamais IndexedDB ici:
+//   ce serait celui de vinted.fr, lisible et effaçable par ses scripts, compté dans
+//   son quota, et en double des entrées du background.
+
+export type ImageCacheEntry = {
+  key: string;
+  url: string;
+  transform: string;
+  name: string;
+  type: string;
+  size: number;
+  lastUsed: number;
+  blob: Blob;
+};
+
+export type ImageCacheMeta = Pick<ImageCacheEntry, 'key' | 'size' | 'lastUsed'>;
+
+// Stockage sous-jacent: IndexedDB en production, mémoire sans IndexedDB (tests)
+export type ImageCacheStore = {
+  get(key: string): Promise<ImageCacheEntry | undefined>;
+  put(entry: ImageCacheEntry): Promise<void>;
+  delete(key: string): Promise<void>;
+  touch(key: string, lastUsed: number): Promise<void>;
+  index(): Promise<ImageCacheMeta[]>;
+  clear(): Promise<void>;
+};
+
+export type ImageCacheStats = {
+  hits: number;
+  misses: number;
+  puts: number;
+  evictions: number;
+  entries: number;
+  bytes: number;
+};
+
+export type ImageCache = {
+  get(url: string, transform: string): Promise<File | null>;
+  put(url: string, transform: string, file: Blob, name?: string): Promise<void>;
+  stats(): ImageCacheStats;
+  clear(): Promise<void>;
+};
+
+const DB_NAME = 'vx-image-cache';
+const DEFAULT_MAX_MB = 200;
+const PAGE_MAX_MB = 32;
+
+export function cacheKey(url: string, transform: string): string {
+  return `${transform} ${url}`;
+}
+
+export function memoryStore(): ImageCacheStore {
+  const entries = new Map<string, ImageCacheEntry>();
+  return {
+    get: async (key) => entries.get(key),
+    put: async (entry) => {
+      entries.set(entry.key, entry);
+    },
+    delete: async (key) => {
+      entries.delete(key);
+    },
+    touch: async (key, lastUsed) => {
+      const e = entries.get(key);
+      if (e) e.lastUsed = lastUsed;
+    },
+    index: async () =>
+      [...entries.values()].map(({ key, size, lastUsed }) => ({ key, size, lastUsed })),
+    clear: async () => {
+      entries.clear();
+    },
+  };
+}
+
+function request<T>(req: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+function done(tx: IDBTransaction): Promise<void> {
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve();
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+  });
+}
+
+// 'images' porte les blobs, 'lru' les métadonnées: un hit ne réécrit que la seconde
+export function idbStore(name = DB_NAME): ImageCacheStore {
+  let db: Promise<IDBDatabase> | null = null;
+  const open = () => {
+    db ??= new Promise((resolve, reject) => {
+      const req = indexedDB.open(name, 1);
+      req.onupgradeneeded = () => {
+        req.result.createObjectStore('images', { keyPath: 'key' });
+        req.result.createObjectStore('lru', { keyPath: 'key' });
+      };
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => reject(req.error);
+    });
+    return db;
+  };
+  const write = async (fn: (images: IDBObjectStore, lru: IDBObjectStore) => void) => {
+    const tx = (await open()).transaction(['images', 'lru'], 'readwrite');
+    fn(tx.objectStore('images'), tx.objectStore('lru'));
+    await done(tx);
+  };
+  return {
+    get: async (key) => {
+      const tx = (await open()).transaction('images', 'readonly');
+      return request<ImageCacheEntry | undefined>(tx.objectStore('images').get(key));
+    },
+    put: (entry) =>
+      write((images, lru) => {
+        images.put(entry);
+        lru.put({ key: entry.key, size: entry.size, lastUsed: entry.lastUsed });
+      }),
+    delete: (key) =>
+      write((images, lru) => {
+        images.delete(key);
+        lru.delete(key);
+      }),
+    touch: async (key, lastUsed) => {
+      const tx = (await open()).transaction('lru', 'readwrite');
+      const lru = tx.objectStore('lru');
+      const meta = await request<ImageCacheMeta | undefined>(lru.get(key));
+      if (meta) lru.put({ ...meta, lastUsed });
+      await done(tx);
+    },
+    index: async () => {
+      const tx = (await open()).transaction('lru', 'readonly');
+      return request<ImageCacheMeta[]>(tx.objectStore('lru').getAll());
+    },
+    clear: () =>
+      write((images, lru) => {
+        images.clear();
+        lru.clear();
+      }),
+  };
+}
+
+export function createImageCache(store: ImageCacheStore, maxBytes: number): ImageCache {
+  const counters = { hits: 0, misses: 0, puts: 0, evictions: 0 };
+  // index LRU en mémoire, chargé une fois depuis le store
+  let index: Promise<Map<string, ImageCacheMeta>> | null = null;
+  let loaded = new Map<string, ImageCacheMeta>();
+  const loadIndex = () => {
+    index ??= store
+      .index()
+      .catch(() => [])
+      .then((metas) => (loaded = new Map(metas.map((m) => [m.key, m]))));
+    return index;
+  };
+  // Date.now() peut rendre la même ms pour deux accès: l'ordre LRU doit rester strict
+  let clock = 0;
+  const tick = () => (clock = Math.max(clock + 1, Date.now()));
+
+  const evict = async (metas: Map<string, ImageCacheMeta>) => {
+    let bytes = 0;
+    for (const m of metas.values()) bytes += m.size;
+    if (bytes <= maxBytes) return;
+    const oldest = [...metas.values()].sort((a, b) => a.lastUsed - b.lastUsed);
+    for (const m of oldest) {
+      if (bytes <= maxBytes) break;
+      metas.delete(m.key);
+      bytes -= m.size;
+      counters.evictions++;
+      await store.delete(m.key).catch(() => {});
+    }
+  };
+
+  return {
+    async get(url, transform) {
+      const key = cacheKey(url, transform);
+      try {
+        const metas = await loadIndex();
+        const entry = metas.has(key) ? await store.get(key) : undefined;
+        if (!entry || !entry.blob?.size) {
+          if (metas.delete(key)) void store.delete(key).catch(() => {});
+          counters.misses++;
+          return null;
+        }
+        const lastUsed = tick();
+        metas.set(key, { key, size: entry.size, lastUsed });
+        void store.touch(key, lastUsed).catch(() => {});
+        counters.hits++;
+        return new File([entry.blob], entry.name, { type: entry.type });
+      } catch {
+        counters.misses++;
+        return null;
+      }
+    },
+    async put(url, transform, file, name) {
+      if (!file.size || file.size > maxBytes) return;
+      const key = cacheKey(url, transform);
+      const entry: ImageCacheEntry = {
+        key,
+        url,
+        transform,
+        name: name ?? (file instanceof File ? file.name : 'image'),
+        type: file.type,
+        size: file.size,
+        lastUsed: tick(),
+        blob: file,
+      };
+      try {
+        const metas = await loadIndex();
+        await store.put(entry);
+        metas.set(key, { key, size: entry.size, lastUsed: entry.lastUsed });
+        counters.puts++;
+        await evict(metas);
+      } catch {
+        /* cache best-effort: quota, navigation privée... */
+      }
+    },
+    stats() {
+      let entries = 0;
+      let bytes = 0;
+      // index vide tant qu'aucun get/put ne l'a chargé
+      for (const m of loaded.values()) {
+        entries++;
+        bytes += m.size;
+      }
+      return { ...counters, entries, bytes };
+    },
+    async clear() {
+      (await loadIndex()).clear();
+      await store.clear().catch(() => {});
+    },
+  };
+}
+
+function readSetting(key: string): string | null {
+  try {
+    // absent dans le service worker: réglages par défaut
+    return typeof localStorage !== 'undefined' ? localStorage.getItem(key) : null;
+  } catch {
+    return null;
+  }
+}
+
+let shared: ImageCache | null = null;
+let page: ImageCache | null = null;
+
+// Instance persistante de l'origine de l'extension: à n'appeler que depuis le
+// background. vx:img:cacheMb fixe le plafond (200 Mo par défaut).
+export function imageCache(): ImageCache | null {
+  if (readSetting('vx:img:cache') === '0') return null;
+  if (!shared) {
+    const maxMb = Number(readSetting('vx:img:cacheMb')) || DEFAULT_MAX_MB;
+    const store = typeof indexedDB !== 'undefined' ? idbStore() : memoryStore();
+    shared = createImageCache(store, maxMb * 1024 * 1024);
+  }
+  return shared;
+}
+
+// Instance du content script: mémoire seule, PAGE_MAX_MB, perdue au rechargement.
+// localStorage vx:img:cache = '0' la désactive.
+export function pageImageCache(): ImageCache | null {
+  if (readSetting('vx:img:cache') === '0') return null;
+  page ??= createImageCache(memoryStore(), PAGE_MAX_MB * 1024 * 1024);
+  return page;
+}
@@ -0,0 +1,122 @@
+// Téléchargements d'images du background: déduplication des téléchargements en cours
+// et préchargement spéculatif des photos du brouillon dès le clic « Republier ».
+// Pendant que /items/new charge et que l'utilisateur choisit la rotation, le
+// background télécharge (et transcode en JPEG ce qui ne l'est pas) vers le cache.
+// Le préchargement est annulé si l'onglet est fermé ou quitte /items/new, si une
+// autre republication commence, ou au bout de PREFETCH_TTL_MS.
+
+import type { ImageCache } from './image-cache';
+
+export type Downloaded = {
+  contentType?: string;
+  name: string;
+  buf: ArrayBuffer;
+  cached: boolean;
+  // statut HTTP d'un échec (buf vide): la page décide de réessayer
+  status?: number;
+  // entrée du cache (url + transform) qui porte ces octets: transfert 'cache'
+  transform?: string;
+};
+
+export type FetchImage = (url: string, signal?: AbortSignal) => Promise<Downloaded | null>;
+
+export type JpegOutput = { name: string; blob: Blob };
+
+export type PrefetchDeps = {
+  download: FetchImage;
+  convertToJpeg: (src: Blob, name: string) => Promise<JpegOutput | null>;
+  sniffImageType: (blob: Blob) => Promise<string | null>;
+  cache: () => ImageCache | null;
+  concurrency?: number;
+  ttlMs?: number;
+};
+
+export type Prefetcher = {
+  start(urls: string[], tabId?: number): Promise<void>;
+  cancel(): void;
+  onTabRemoved(tabId: number): void;
+  onTabUpdated(tabId: number, url?: string): void;
+  // onglet du préchargement en cours (tests, diagnostic)
+  current(): { tabId?: number } | null;
+};
+
+export const PREFETCH_CONCURRENCY = 3;
+export const PREFETCH_TTL_MS = 3 * 60_000;
+
+// Un appel par URL à la fois: l'upload rejoint le téléchargement lancé par le préchargement
+export function dedupeDownloads(fetchImage: FetchImage): FetchImage {
+  const inflight = new Map<string, Promise<Downloaded | null>>();
+  const download: FetchImage = (url, signal) => {
+    const pending = inflight.get(url);
+    // un préchargement annulé entre-temps ne doit pas faire échouer l'upload
+    if (pending) return signal ? pending : pending.catch(() => download(url));
+    const p = fetchImage(url, signal).finally(() => inflight.delete(url));
+    inflight.set(url, p);
+    return p;
+  };
+  return download;
+}
+
+export function createPrefetcher(deps: PrefetchDeps): Prefetcher {
+  const concurrency = deps.concurrency ?? PREFETCH_CONCURRENCY;
+  const ttlMs = deps.ttlMs ?? PREFETCH_TTL_MS;
+  let session: { tabId?: number; ctrl: AbortController } | null = null;
+
+  const prefetchOne = async (url: string, signal: AbortSignal) => {
+    const cache = deps.cache();
+    const got = await deps.download(url, signal);
+    if (!got || !got.buf.byteLength || signal.aborted) return;
+    if (/image\/(jpeg|jpg|png)/i.test(got.contentType ?? '')) return;
+    if (await cache?.get(url, 'jpeg')) return;
+    const src = new Blob([got.buf], { type: got.contentType || 'application/octet-stream' });
+    const out = await deps.convertToJpeg(src, got.name);
+    // convertToJpeg peut rendre les octets d'origine renommés: ne garder qu'un vrai JPEG
+    if (out && (await deps.sniffImageType(out.blob)) === 'image/jpeg') {
+      await cache?.put(url, 'jpeg', out.blob, out.name);
+    }
+  };
+
+  const run = async (urls: string[], signal: AbortSignal) => {
+    // file dans l'ordre du brouillon: la photo de couverture part en premier
+    const queue = urls.slice();
+    const worker = async () => {
+      while (queue.length && !signal.aborted) {
+        const url = queue.shift();
+        if (!url) break;
+        try {
+          await prefetchOne(url, signal);
+        } catch {
+          /* annulé ou échec: l'upload retentera lui-même */
+        }
+      }
+    };
+    const workers = Math.min(concurrency, queue.length);
+    await Promise.all(Array.from({ length: workers }, worker));
+  };
+
+  const cancel = () => {
+    session?.ctrl.abort();
+    session = null;
+  };
+
+  return {
+    start(urls, tabId) {
+      cancel();
+      const own = { tabId, ctrl: new AbortController() };
+      session = own;
+      const timer = setTimeout(() => own.ctrl.abort(), ttlMs);
+      return run(urls, own.ctrl.signal).finally(() => {
+        clearTimeout(timer);
+        if (session === own) session = null;
+      });
+    },
+    cancel,
+    onTabRemoved(tabId) {
+      if (session && session.tabId === tabId) cancel();
+    },
+    onTabUpdated(tabId, url) {
+      if (session && session.tabId === tabId && url && !/\/items\/new/i.test(url)) cancel();
+    },
+    current: () => (session ? { tabId: session.tabId } : null),
+  };
+}
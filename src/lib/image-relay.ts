@@ -0,0 +1,198 @@
+// Relais binaire des images pour Chrome. Sa messagerie runtime sérialise en JSON: un
+// ArrayBuffer n'y passe qu'en base64. La page src/relay (web_accessible_resources),
+// insérée en iframe invisible par le content script, a l'origine de l'extension donc la
+// base IndexedDB du background (image-cache.ts). Le background y laisse les octets
+// téléchargés et ne répond que par la clé; le content script les lit par un
+// MessagePort, en ArrayBuffer transféré (clone structuré: ni copie ni encodage).
+//
+// Tout script de vinted.fr peut aussi encadrer la page du relais. Elle ne sert donc que
+// le premier port reçu, et seulement les URLs d'un accord (grant): le content script
+// les déclare au background (image:relay-allow), qui les range sous un jeton aléatoire
+// dans storage.session, lisible par les pages de l'extension et pas par la page web.
+
+import type { ImageCacheStore } from './image-cache';
+import { cacheKey } from './image-cache';
+
+export type RelayRequest =
+  | { id: number; url: string; transform: string }
+  // accord de l'upload en cours: remplace le précédent
+  | { id: number; grant: string };
+export type RelayReply = { id: number; ok: boolean; bytes?: ArrayBuffer };
+
+export type RelayClient = {
+  // octets de l'entrée url + transform, null si absente, hors accord ou sans réponse
+  read(url: string, transform: string): Promise<ArrayBuffer | null>;
+  allow(grant: string): Promise<boolean>;
+  // faux après un délai dépassé: le relais ne répond plus (iframe retirée, rechargée...)
+  alive(): boolean;
+  close(): void;
+};
+
+// storage.session (ou équivalent): accords rangés par jeton
+export type GrantArea = {
+  get(keys: null | string): Promise<Record<string, unknown>>;
+  set(items: Record<string, unknown>): Promise<void>;
+  remove(keys: string | string[]): Promise<void>;
+};
+
+export const RELAY_PAGE = 'src/relay/index.html';
+// message de la page qui confie son port à l'iframe
+export const RELAY_HELLO = 'vx:relay';
+const RELAY_TIMEOUT_MS = 5000;
+// réponse sans requête: le relais écoute sur le port
+const READY_ID = 0;
+const GRANT_PREFIX = 'vx:relay:';
+export const RELAY_GRANT_TTL_MS = 30 * 60_000;
+
+type Grant = { urls: string[]; at: number };
+
+const fresh = (grant: Grant | undefined, now: number): grant is Grant =>
+  typeof grant?.at === 'number' && grant.at > now - RELAY_GRANT_TTL_MS;
+
+// Côté background: enregistre les URLs d'un upload, purge les accords expirés
+export async function grantRelayUrls(
+  area: GrantArea,
+  urls: string[],
+  now = Date.now(),
+): Promise<string> {
+  const all = await area.get(null);
+  const stale = Object.entries(all)
+    .filter(([k, v]) => k.startsWith(GRANT_PREFIX) && !fresh(v as Grant | undefined, now))
+    .map(([k]) => k);
+  if (stale.length) await area.remove(stale);
+  const token = crypto.randomUUID();
+  await area.set({ [GRANT_PREFIX + token]: { urls, at: now } satisfies Grant });
+  return token;
+}
+
+// Côté relais: URLs d'un accord valide, vide sinon
+export async function relayGrantUrls(
+  area: GrantArea,
+  token: string,
+  now = Date.now(),
+): Promise<string[]> {
+  const key = GRANT_PREFIX + token;
+  const grant = (await area.get(key))[key] as Grant | undefined;
+  return fresh(grant, now) && Array.isArray(grant.urls) ? grant.urls : [];
+}
+
+// Côté extension: sert les lectures du cache autorisées sur le port confié par la page
+export function serveRelay(
+  port: MessagePort,
+  store: ImageCacheStore,
+  grantUrls: (token: string) => Promise<string[]>,
+): void {
+  let allowed = new Set<string>();
+  port.onmessage = async (e: MessageEvent<RelayRequest>) => {
+    const req = e.data;
+    if (!req || typeof req.id !== 'number') return;
+    const { id } = req;
+    try {
+      if ('grant' in req) {
+        allowed = new Set(typeof req.grant === 'string' ? await grantUrls(req.grant) : []);
+        port.postMessage({ id, ok: allowed.size > 0 } satisfies RelayReply);
+        return;
+      }
+      const { url, transform } = req;
+      if (typeof url !== 'string' || typeof transform !== 'string' || !allowed.has(url)) {
+        port.postMessage({ id, ok: false } satisfies RelayReply);
+        return;
+      }
+      const entry = await store.get(cacheKey(url, transform));
+      if (!entry?.blob?.size) {
+        port.postMessage({ id, ok: false } satisfies RelayReply);
+        return;
+      }
+      const bytes = await entry.blob.arrayBuffer();
+      port.postMessage({ id, ok: true, bytes } satisfies RelayReply, [bytes]);
+    } catch {
+      port.postMessage({ id, ok: false } satisfies RelayReply);
+    }
+  };
+  port.postMessage({ id: READY_ID, ok: true } satisfies RelayReply);
+}
+
+// Côté page: une requête numérotée, la réponse la retrouve par son id. Un délai
+// dépassé ferme le client: les requêtes en cours et suivantes rendent null aussitôt.
+export function createRelayClient(port: MessagePort, timeoutMs = RELAY_TIMEOUT_MS): RelayClient {
+  let seq = 0;
+  let open = true;
+  const pending = new Map<number, (reply: RelayReply | null) => void>();
+  port.onmessage = (e: MessageEvent<RelayReply>) => pending.get(e.data?.id)?.(e.data);
+
+  const close = () => {
+    open = false;
+    for (const finish of [...pending.values()]) finish(null);
+    port.close();
+  };
+
+  const request = (msg: RelayRequest) =>
+    new Promise<RelayReply | null>((resolve) => {
+      if (!open) {
+        resolve(null);
+        return;
+      }
+      const finish = (reply: RelayReply | null) => {
+        clearTimeout(timer);
+        pending.delete(msg.id);
+        resolve(reply);
+      };
+      const timer = setTimeout(() => {
+        finish(null);
+        close();
+      }, timeoutMs);
+      pending.set(msg.id, finish);
+      port.postMessage(msg);
+    });
+
+  return {
+    async read(url, transform) {
+      const reply = await request({ id: ++seq, url, transform });
+      return reply?.ok && reply.bytes?.byteLength ? reply.bytes : null;
+    },
+    async allow(grant) {
+      return !!(await request({ id: ++seq, grant }))?.ok;
+    },
+    alive: () => open,
+    close,
+  };
+}
+
+// Insère l'iframe du relais et lui confie un port. null si le relais ne répond pas
+// (CSP frame-src de la page, extension rechargée...): l'appelant repasse en base64.
+// src est l'URL fixe de la ressource (pas use_dynamic_url): son origine est celle de
+// l'extension, celle du document chargé et de l'IndexedDB du background.
+export function openRelay(src: string, timeoutMs = RELAY_TIMEOUT_MS): Promise<RelayClient | null> {
+  return new Promise((resolve) => {
+    const frame = document.createElement('iframe');
+    frame.src = src;
+    frame.hidden = true;
+    frame.setAttribute('aria-hidden', 'true');
+    const channel = new MessageChannel();
+    const fail = () => {
+      clearTimeout(timer);
+      channel.port1.close();
+      frame.remove();
+      resolve(null);
+    };
+    // une page d'erreur déclenche aussi load: seul l'accusé du relais compte
+    const timer = setTimeout(fail, timeoutMs);
+    channel.port1.onmessage = (e: MessageEvent<RelayReply>) => {
+      if (e.data?.id !== READY_ID) return;
+      clearTimeout(timer);
+      resolve(createRelayClient(channel.port1, timeoutMs));
+    };
+    frame.addEventListener(
+      'load',
+      () => {
+        try {
+          frame.contentWindow?.postMessage(RELAY_HELLO, new URL(src).origin, [channel.port2]);
+        } catch {
+          fail();
+        }
+      },
+      { once: true },
+    );
+    (document.body ?? document.documentElement).appendChild(frame);
+  });
+}
@@ -6,7 +6,21 @@
 //
 // ===================================================================
 
-import { ImageConvertJpeg, ImageDownload } from '../types/messages';
+import browser from 'webextension-polyfill';
+
+import type { ImageTransfer } from '../types/messages';
+import {
+  ImageConvertJpeg,
+  ImageDownload,
+  ImageRelayAllow,
+  ImageTransferProbe,
+  MAX_UPLOAD_IMAGES,
+  PROBE_BYTES,
+} from '../types/messages';
+import { runDownloads } from './download-scheduler';
+import { pageImageCache } from './image-cache';
+import type { RelayClient } from './image-relay';
+import { openRelay, RELAY_PAGE } from './image-relay';
 import { ensureExtension, ensureUploadableImage, inferNameFromUrl, prepareFile } from './images';
 import { sendMessage } from './messaging';
 import { promptRotationAngle, rotateImageFile } from './rotation';
@@ -55,6 +69,83 @@ function imgLog(level: 'info' | 'warn' | 'debug', ...args: unknown[]) {
   /* eslint-enable no-console */
 }
 
+// La messagerie de Chrome sérialise en JSON (un ArrayBuffer y devient {}), celle de
+// Firefox clone les objets. Une sonde par page décide du mode: octets bruts quand ils
+// passent (Firefox), sinon lecture du cache du background par l'iframe relais
+// (image-relay.ts, Chrome), base64 seulement si le relais ne répond pas.
+let transferMode: Promise<ImageTransfer> | null = null;
+let relay: RelayClient | null = null;
+
+type DownloadReply = {
+  ok: boolean;
+  url: string;
+  contentType?: string;
+  name?: string;
+  bytes?: ArrayBuffer;
+  bytesB64?: string;
+  encodeMs?: number;
+  status?: number;
+  transform?: string;
+};
+
+function isArrayBuffer(v: unknown): v is ArrayBuffer {
+  // instanceof échoue entre compartiments (Xray de Firefox)
+  return v instanceof ArrayBuffer || Object.prototype.toString.call(v) === '[object ArrayBuffer]';
+}
+
+function probeTransfer(): Promise<ImageTransfer> {
+  transferMode ??= (async () => {
+    let mode: ImageTransfer = 'base64';
+    try {
+      const res = (await sendMessage(ImageTransferProbe, { type: 'image:probe' })) as
+        | { bytes?: unknown }
+        | undefined;
+      const bytes = res?.bytes;
+      if (isArrayBuffer(bytes) && bytes.byteLength === PROBE_BYTES) mode = 'binary';
+    } catch {
+      /* ignore */
+    }
+    if (mode === 'base64') {
+      try {
+        relay = await openRelay(browser.runtime.getURL(RELAY_PAGE));
+      } catch {
+        relay = null;
+      }
+      if (relay) mode = 'cache';
+    }
+    imgLog('info', 'transfer:mode', { mode });
+    return mode;
+  })();
+  return transferMode;
+}
+
+// Relais muet (délai dépassé): base64 pour le reste de la page, sans attendre à
+// chaque image ni fausser le débit vu par l'ordonnanceur
+function dropRelay() {
+  relay?.close();
+  relay = null;
+  transferMode = Promise.resolve('base64');
+  imgLog('warn', 'transfer:relay-lost');
+}
+
+// Mode d'un upload: en 'cache', le background autorise le relais à lire ses URLs
+async function transferFor(urls: string[]): Promise<ImageTransfer> {
+  const mode = await probeTransfer();
+  if (mode !== 'cache') return mode;
+  try {
+    const res = (await sendMessage(ImageRelayAllow, {
+      type: 'image:relay-allow',
+      urls: urls.slice(0, MAX_UPLOAD_IMAGES),
+    })) as { ok: boolean; token?: string } | undefined;
+    if (relay && res?.ok && res.token && (await relay.allow(res.token))) return 'cache';
+  } catch {
+    /* ignore */
+  }
+  imgLog('warn', 'transfer:relay-grant-failed');
+  if (relay && !relay.alive()) dropRelay();
+  return 'base64';
+}
+
 function fromBase64(b64: string): Uint8Array {
   try {
     // eslint-disable-next-line no-undef
@@ -67,6 +158,17 @@ function fromBase64(b64: string): Uint8Array {
   }
 }
 
+// Échec qui mérite une nouvelle tentative via l'ordonnanceur
+class RetryableDownload extends Error {}
+
+function isTransientFailure(res: { ok: boolean; status?: number } | undefined): boolean {
+  if (!res) return true;
+  if (res.ok) return false;
+  // sans statut: erreur réseau dans le background
+  const { status } = res;
+  return status === undefined || status === 408 || status === 429 || status >= 500;
+}
+
 /**
  * Upload automatique des images avec rotation et conversion de format
  * @param urls - Liste des URLs d'images à télécharger et uploader
@@ -120,94 +222,159 @@ export async function uploadImages(urls: string[]): Promise<void> {
 
   // Télécharger en background pour contourner CORS
   const files: File[] = [];
-  const enableConcurrency = localStorage.getItem('vx:img:concurrency') === '1';
-  const maxConc = Number(localStorage.getItem('vx:img:max')) || 4;
+  // Cache (image-cache.ts): fichier prêt à l'upload par URL, et sa version tournée
+  const cache = pageImageCache();
+  const shouldRotate = !!rotationAngle && Math.abs(rotationAngle) > 0.0001;
+  const rotatedKey = `upload|rot:${rotationAngle}`;
+  const sourceOf = new Map<File, string>();
+  const alreadyRotated = new Set<File>();
+  // Ordonnanceur (download-scheduler.ts): concurrence adaptative plafonnée par
+  // vx:img:max (1 = une image à la fois), reprises des échecs transitoires.
+  const maxConc = Number(localStorage.getItem('vx:img:max')) || 6;
+  const t0 = Date.now();
+  // choisi à la première image à télécharger (rien à sonder si tout est en cache)
+  let uploadTransfer: Promise<ImageTransfer> | null = null;
+
+  imgLog('info', 'download:start', { total: urls.length, maxConcurrency: maxConc, urls });
+
+  const results = await runDownloads(urls, (url, { final }) => processOne(url, final), {
+    max: maxConc,
+    sizeOf: (f) => f.size,
+    onResult: (r) =>
+      imgLog(r.ok ? 'info' : 'warn', 'download:result', {
+        index: r.index,
+        url: r.url,
+        ok: r.ok,
+        attempts: r.attempts,
+        ms: r.ms,
+        size: r.value?.size,
+        concurrency: r.concurrency,
+        error: r.error,
+      }),
+  });
+  // ordre du brouillon conservé: la couverture reste la première photo
+  for (const r of results) if (r.value) files.push(r.value);
 
-  imgLog('info', 'download:start', {
+  imgLog('info', 'download:complete', {
     total: urls.length,
-    concurrency: enableConcurrency,
-    maxWorkers: maxConc,
-    urls,
+    prepared: files.length,
+    ms: Date.now() - t0,
   });
 
-  if (enableConcurrency) {
-    const queue = urls.slice();
-    const workers: Promise<void>[] = [];
-    for (let i = 0; i < Math.max(1, Math.min(maxConc, queue.length)); i++) {
-      workers.push(
-        (async () => {
-          while (queue.length) {
-            const url = queue.shift();
-            if (!url) break;
-            imgLog('info', 'worker:processing', { url, remaining: queue.length });
-            await processOne(url);
-          }
-        })(),
-      );
-    }
-    await Promise.allSettled(workers);
-  } else {
-    for (let i = 0; i < urls.length; i++) {
-      const url = urls[i];
-      if (!url) continue;
-      imgLog('info', 'sequential:processing', { url, index: i, total: urls.length });
-      await processOne(url);
-    }
+  function keep(file: File, url: string): File {
+    sourceOf.set(file, url);
+    return file;
   }
 
-  imgLog('info', 'download:complete', { total: urls.length, prepared: files.length });
+  async function fromCache(url: string): Promise<File | null> {
+    if (!cache) return null;
+    const done = shouldRotate ? await cache.get(url, rotatedKey) : null;
+    if (done) alreadyRotated.add(done);
+    const hit = done ?? (await cache.get(url, 'upload'));
+    if (!hit) return null;
+    imgLog('info', 'cache:hit', { url, rotated: !!done });
+    return keep(hit, url);
+  }
 
-  async function processOne(url: string) {
+  // Lève RetryableDownload sur un échec transitoire du background (pas de réponse,
+  // réseau, 408/429/5xx) tant que ce n'est pas la dernière tentative; sinon, replis
+  // dans la page comme avant. Rend null si rien n'a pu être préparé.
+  async function processOne(url: string, final: boolean): Promise<File | null> {
     try {
-      imgLog('info', 'step:bg-download:request', { url });
-      const res = (await sendMessage(ImageDownload, { type: 'image:download', url })) as
-        | {
-            ok: boolean;
-            url: string;
-            contentType?: string;
-            name?: string;
-            bytes?: ArrayBuffer;
-            bytesB64?: string;
-          }
-        | undefined;
+      const cached = await fromCache(url);
+      if (cached) return cached;
+      const request = async (mode: ImageTransfer) => {
+        imgLog('info', 'step:bg-download:request', { url, transfer: mode });
+        return (await sendMessage(ImageDownload, {
+          type: 'image:download',
+          url,
+          transfer: mode,
+        }).catch((e) => {
+          if (final) throw e;
+          throw new RetryableDownload((e as Error)?.message ?? 'bg-download: no response');
+        })) as DownloadReply | undefined;
+      };
+      let transfer = await (uploadTransfer ??= transferFor(urls));
+      let res = await request(transfer);
+      if (!final && isTransientFailure(res)) {
+        throw new RetryableDownload(`bg-download: ${res?.status ?? 'no response'}`);
+      }
 
       let prepared: File | null = null;
+      let bytes: ArrayBuffer | null = null;
+      if (res && res.ok && res.transform) {
+        const t0 = performance.now();
+        bytes = relay ? await relay.read(url, res.transform) : null;
+        imgLog(bytes ? 'info' : 'warn', 'step:bg-download:relay', {
+          url,
+          transform: res.transform,
+          size: bytes?.byteLength ?? 0,
+          ms: Math.round((performance.now() - t0) * 10) / 10,
+        });
+        if (!bytes) {
+          // entrée évincée entre-temps: base64 pour cette image; relais muet: pour la suite
+          if (relay && !relay.alive()) {
+            dropRelay();
+            uploadTransfer = Promise.resolve('base64');
+          }
+          transfer = 'base64';
+          res = await request(transfer);
+        }
+      }
+      if (!bytes && res && res.ok && isArrayBuffer(res.bytes) && res.bytes.byteLength > 0) {
+        bytes = res.bytes;
+      } else if (!bytes && res && res.ok && res.bytesB64) {
+        // repli mesuré: coût de l'aller-retour base64 des deux côtés
+        const t0 = performance.now();
+        const raw = fromBase64(res.bytesB64);
+        if (raw.byteLength > 0) bytes = raw.buffer as ArrayBuffer;
+        imgLog('info', 'step:bg-download:b64', {
+          url,
+          size: raw.byteLength,
+          b64Chars: res.bytesB64.length,
+          encodeMs: res.encodeMs,
+          decodeMs: Math.round((performance.now() - t0) * 10) / 10,
+        });
+      }
 
-      if (res && res.ok && res.bytes && (res.bytes as ArrayBuffer).byteLength > 0) {
+      if (res && bytes) {
         imgLog('debug', 'image downloaded', {
           url: res.url,
           contentType: res.contentType,
           name: res.name,
-          bytes: (res.bytes as ArrayBuffer).byteLength,
+          bytes: bytes.byteLength,
         });
         const fetchedType = res.contentType || 'application/octet-stream';
         const fetchedName = res.name || inferNameFromUrl(url) || 'image';
-        const srcBlob = new Blob([new Uint8Array(res.bytes)], { type: fetchedType });
+        const srcBlob = new Blob([bytes], { type: fetchedType });
         imgLog('info', 'step:bg-download:response', {
           url: res.url,
           type: fetchedType,
           name: fetchedName,
-          size: (res.bytes as ArrayBuffer).byteLength,
+          size: bytes.byteLength,
+          transfer,
         });
 
-        if (!/image\/(jpeg|jpg|png)/i.test(fetchedType)) {
+        // la conversion en background renvoie les octets par la même messagerie:
+        // sans transfert binaire, autant convertir dans la page
+        if (transfer === 'binary' && !/image\/(jpeg|jpg|png)/i.test(fetchedType)) {
           try {
             imgLog('info', 'step:bg-convert:request', {
               name: fetchedName,
               type: fetchedType,
-              size: (res.bytes as ArrayBuffer).byteLength,
+              size: bytes.byteLength,
             });
             const conv = (await sendMessage(ImageConvertJpeg, {
               type: 'image:convert-jpeg',
               name: fetchedName,
               contentType: fetchedType,
-              bytes: res.bytes as ArrayBuffer,
+              bytes,
             })) as { ok: boolean; name?: string; type?: string; bytes?: ArrayBuffer } | undefined;
 
             if (
               conv &&
               conv.ok &&
-              conv.bytes &&
+              isArrayBuffer(conv.bytes) &&
               conv.type &&
               /image\/(jpeg|jpg|png)/i.test(conv.type)
             ) {
@@ -216,7 +383,7 @@ export async function uploadImages(urls: string[]): Promise<void> {
                 fetchedName,
                 outType === 'image/png' ? '.png' : '.jpg',
               );
-              prepared = new File([new Uint8Array(conv.bytes)], outName, { type: outType });
+              prepared = new File([conv.bytes], outName, { type: outType });
               imgLog('info', 'converted via background', {
                 name: outName,
                 type: outType,
@@ -242,88 +409,12 @@ export async function uploadImages(urls: string[]): Promise<void> {
           );
         }
       } else if (res && res.ok) {
-        if (res.bytesB64 && res.bytesB64.length > 0) {
-          try {
-            const raw = fromBase64(res.bytesB64);
-            const ab = raw.buffer as ArrayBuffer;
-            const fetchedType = res.contentType || 'application/octet-stream';
-            const fetchedName = res.name || inferNameFromUrl(url) || 'image';
-            const srcBlob = new Blob([new Uint8Array(ab)], { type: fetchedType });
-            imgLog('info', 'step:bg-download:response:b64', {
-              url: res.url,
-              type: fetchedType,
-              name: fetchedName,
-              size: ab.byteLength,
-            });
-
-            let preparedB64: File | null = null;
-            if (!/image\/(jpeg|jpg|png)/i.test(fetchedType)) {
-              try {
-                imgLog('info', 'step:bg-convert:request', {
-                  name: fetchedName,
-                  type: fetchedType,
-                  size: ab.byteLength,
-                });
-                const conv = (await sendMessage(ImageConvertJpeg, {
-                  type: 'image:convert-jpeg',
-                  name: fetchedName,
-                  contentType: fetchedType,
-                  bytes: ab,
-                })) as
-                  | { ok: boolean; name?: string; type?: string; bytes?: ArrayBuffer }
-                  | undefined;
-
-                if (
-                  conv &&
-                  conv.ok &&
-                  conv.bytes &&
-                  conv.type &&
-                  /image\/(jpeg|jpg|png)/i.test(conv.type)
-                ) {
-                  const outType = conv.type.toLowerCase().includes('png')
-                    ? 'image/png'
-                    : 'image/jpeg';
-                  const outName = ensureExtension(
-                    fetchedName,
-                    outType === 'image/png' ? '.png' : '.jpg',
-                  );
-                  preparedB64 = new File([new Uint8Array(conv.bytes)], outName, { type: outType });
-                  imgLog('info', 'converted via background', {
-                    name: outName,
-                    type: outType,
-                    size: preparedB64.size,
-                  });
-                }
-              } catch {
-                imgLog('info', 'step:bg-convert:error');
-              }
-            }
-
-            if (!preparedB64) {
-              imgLog('info', 'step:ensure:start:bg-b64');
-              preparedB64 = await ensureUploadableImage(srcBlob, fetchedName);
-              imgLog(
-                'info',
-                'step:ensure:end:bg-b64',
-                preparedB64
-                  ? { name: preparedB64.name, type: preparedB64.type, size: preparedB64.size }
-                  : { result: null },
-              );
-            }
-
-            if (preparedB64) {
-              files.push(preparedB64);
-              return;
-            }
-          } catch {
-            /* fall through */
-          }
-        }
         imgLog('warn', 'bg-download returned empty bytes, will try in-page fetch', {
           url: res.url,
           contentType: res.contentType,
           name: res.name,
-          bytes: res.bytes ? (res.bytes as ArrayBuffer).byteLength : 0,
+          transfer,
+          hasBytes: isArrayBuffer(res.bytes),
           hasB64: !!res.bytesB64,
         });
       }
@@ -448,13 +539,14 @@ export async function uploadImages(urls: string[]): Promise<void> {
       }
 
       if (prepared && prepared.size > 0) {
-        files.push(prepared);
+        void cache?.put(url, 'upload', prepared);
         imgLog('info', 'file prepared for upload', {
           name: prepared.name,
           type: prepared.type,
           size: prepared.size,
           url,
         });
+        return keep(prepared, url);
       } else {
         imgLog('warn', 'image download/convert produced empty file, will try page prepareFile()', {
           url,
@@ -464,13 +556,14 @@ export async function uploadImages(urls: string[]): Promise<void> {
         try {
           const alt = await prepareFile(url);
           if (alt && alt.size > 0) {
-            files.push(alt);
+            void cache?.put(url, 'upload', alt);
             imgLog('info', 'file prepared via prepareFile fallback', {
               name: alt.name,
               type: alt.type,
               size: alt.size,
               url,
             });
+            return keep(alt, url);
           } else {
             imgLog('warn', 'prepareFile fallback returned empty or null file', { url });
           }
@@ -483,12 +576,14 @@ export async function uploadImages(urls: string[]): Promise<void> {
         }
       }
     } catch (e) {
+      if (e instanceof RetryableDownload) throw e;
       imgLog('warn', 'processOne FULL FAILURE for image', {
         url,
         err: (e as Error)?.message,
         stack: (e as Error)?.stack,
       });
     }
+    return null;
   }
 
   if (!files.length) {
@@ -501,19 +596,26 @@ export async function uploadImages(urls: string[]): Promise<void> {
   }
 
   // Appliquer la rotation
-  if (rotationAngle && Math.abs(rotationAngle) > 0.0001) {
-    const rotated: File[] = [];
+  if (rotationAngle && shouldRotate) {
+    const out: File[] = [];
     for (const f of files) {
+      if (alreadyRotated.has(f)) {
+        out.push(f);
+        continue;
+      }
       try {
         const r = await rotateImageFile(f, rotationAngle);
-        rotated.push(r);
+        out.push(r);
+        const url = sourceOf.get(f);
+        if (url) void cache?.put(url, rotatedKey, r);
       } catch {
-        rotated.push(f);
+        out.push(f);
       }
     }
     files.length = 0;
-    for (const rf of rotated) files.push(rf);
+    for (const rf of out) files.push(rf);
   }
+  if (cache) imgLog('info', 'cache:stats', cache.stats());
 
   imgLog('info', 'ready to upload files', { count: files.length, rotated: rotationAngle });
 
@@ -93,3 +93,37 @@ export function perf(key: string, action: 'start' | 'end') {
     /* ignore */
   }
 }
+
+// Résultat des attentes (waitForElement & co) pour les runs de throttling:
+// durée, budget et timeout. Lu puis vidé via takeWaitRecords().
+export type WaitRecord = {
+  name: string;
+  target?: string;
+  ms: number;
+  budgetMs: number;
+  timedOut: boolean;
+};
+
+const WAIT_RECORDS: WaitRecord[] = [];
+const WAIT_RECORDS_MAX = 1000;
+
+export function recordWait(
+  name: string,
+  ms: number,
+  budgetMs: number,
+  ok: boolean,
+  target?: string,
+) {
+  try {
+    if (!(localStorage.getItem('vx:perf') === '1' || isEnabled())) return;
+    if (WAIT_RECORDS.length >= WAIT_RECORDS_MAX) WAIT_RECORDS.shift();
+    WAIT_RECORDS.push({ name, target, ms: Math.round(ms), budgetMs, timedOut: !ok });
+    if (!ok) log('warn', `wait:timeout:${name}`, { target, budgetMs });
+  } catch {
+    /* ignore */
+  }
+}
+
+export function takeWaitRecords(): WaitRecord[] {
+  return WAIT_RECORDS.splice(0, WAIT_RECORDS.length);
+}
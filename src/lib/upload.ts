@@ -1,5 +1,8 @@
 // Mutualise l'upload via DnD et input[file] et la détection de feedback UI
 
+import { delay, noteWait } from './dom-utils';
+import { waitFor } from './wait-registry';
+
 type FeedbackTargets = {
   grid: HTMLElement | null;
   live: HTMLElement | null;
@@ -14,14 +17,12 @@ export function resolveDropHost(): HTMLElement | null {
 }
 
 export async function waitForDropHost(timeoutMs = 8000): Promise<HTMLElement | null> {
-  let dropHost = resolveDropHost();
+  const dropHost = resolveDropHost();
   if (dropHost) return dropHost;
-  const deadline = Date.now() + timeoutMs;
-  while (!dropHost && Date.now() < deadline) {
-    await new Promise((r) => setTimeout(r, 120));
-    dropHost = resolveDropHost();
-  }
-  return dropHost;
+  const start = Date.now();
+  const found = await waitFor(resolveDropHost, { timeoutMs });
+  noteWait('dropHost', start, timeoutMs, !!found);
+  return found;
 }
 
 export function getFeedbackTargets(dropHost: HTMLElement | null): FeedbackTargets {
@@ -41,48 +42,54 @@ export async function waitForMediaFeedback(
   timeoutMs = 3000,
 ): Promise<boolean> {
   const start = Date.now();
+  let liveText = beforeLiveText;
 
-  while (Date.now() - start < timeoutMs) {
-    if (grid) {
-      const currentCount = grid.childElementCount;
+  const gridHasNewImage = () => {
+    // Vérifier que le count a augmenté
+    if (!grid || grid.childElementCount <= beforeCount) return false;
+    // NOUVEAU: Attendre que l'élément contienne réellement une image
+    const newElements = Array.from(grid.children).slice(beforeCount);
+    return newElements.some((el) => {
+      // Vérifier qu'il y a une vraie image (img, ou background-image, ou preview)
+      const hasImg = el.querySelector('img');
+      const hasCanvas = el.querySelector('canvas');
+      const hasBgImage =
+        el instanceof HTMLElement &&
+        (el.style.backgroundImage || window.getComputedStyle(el).backgroundImage !== 'none');
+      return hasImg || hasCanvas || hasBgImage;
+    });
+  };
+  const liveChanged = () => {
+    const cur = live?.textContent ?? '';
+    return !!cur && cur !== liveText;
+  };
 
-      // Vérifier que le count a augmenté
-      if (currentCount > beforeCount) {
-        // NOUVEAU: Attendre que l'élément contienne réellement une image
-        const newElements = Array.from(grid.children).slice(beforeCount);
-        const hasRealImage = newElements.some((el) => {
-          // Vérifier qu'il y a une vraie image (img, ou background-image, ou preview)
-          const hasImg = el.querySelector('img');
-          const hasCanvas = el.querySelector('canvas');
-          const hasBgImage =
-            el instanceof HTMLElement &&
-            (el.style.backgroundImage || window.getComputedStyle(el).backgroundImage !== 'none');
-          return hasImg || hasCanvas || hasBgImage;
-        });
+  while (Date.now() - start < timeoutMs) {
+    // pollMs: un background-image posé par feuille de style n'émet aucune mutation
+    const hit = await waitFor(() => (gridHasNewImage() && 'grid') || (liveChanged() && 'live'), {
+      timeoutMs: start + timeoutMs - Date.now(),
+      pollMs: 250,
+    });
+    if (!hit) break;
 
-        if (hasRealImage) {
-          // Attendre un peu plus pour stabiliser
-          await new Promise((r) => setTimeout(r, 200));
-          return true;
-        }
-      }
+    if (hit === 'grid') {
+      // Attendre un peu plus pour stabiliser
+      await delay(200);
+      noteWait('media.feedback', start, timeoutMs, true);
+      return true;
     }
 
-    if (live) {
-      const cur = live.textContent ?? '';
-      if (cur && cur !== beforeLiveText) {
-        // Attendre encore un peu que l'image soit vraiment dans le DOM
-        await new Promise((r) => setTimeout(r, 300));
+    // Attendre encore un peu que l'image soit vraiment dans le DOM
+    liveText = live?.textContent ?? '';
+    await delay(300);
 
-        // Vérifier que le grid a bien augmenté
-        if (grid && grid.childElementCount > beforeCount) {
-          return true;
-        }
-      }
+    // Vérifier que le grid a bien augmenté
+    if (grid && grid.childElementCount > beforeCount) {
+      noteWait('media.feedback', start, timeoutMs, true);
+      return true;
     }
-
-    await new Promise((r) => setTimeout(r, 100));
   }
+  noteWait('media.feedback', start, timeoutMs, false);
   return false;
 }
 
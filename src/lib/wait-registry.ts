@@ -0,0 +1,152 @@
+// Registre d'attentes partagé: un seul MutationObserver sur le document pour
+// toutes les attentes en cours (waitForElement, waitForGone, upload, brand...).
+// Chaque lot de mutations réévalue les attentes une fois; une attente se résout
+// sur la mutation qui la satisfait au lieu du prochain tick de son propre polling.
+//
+// Ce que le DOM ne signale pas (input.value posé par React, style calculé en
+// transition) passe par les événements input/change et, si l'attente le demande
+// (pollMs), par un timer de secours commun à tout le registre.
+
+export type WaitOptions = {
+  timeoutMs: number;
+  signal?: AbortSignal;
+  // re-vérification périodique pour les états hors DOM (valeur d'input, style calculé)
+  pollMs?: number;
+};
+
+type Waiter = {
+  check: () => unknown;
+  settle: (value: unknown) => void;
+  pollMs?: number;
+};
+
+// sans MutationObserver (environnement minimal), on retombe sur le polling
+const FALLBACK_POLL_MS = 60;
+
+const waiters = new Set<Waiter>();
+let observer: MutationObserver | null = null;
+let pollTimer: ReturnType<typeof setTimeout> | null = null;
+let flushQueued = false;
+// requêtes mutualisées le temps d'un passage: N attentes sur un même sélecteur = 1 requête
+let queryCache: Map<string, Element | null> | null = null;
+
+function flush() {
+  flushQueued = false;
+  queryCache = new Map();
+  try {
+    for (const w of [...waiters]) {
+      let value: unknown = null;
+      try {
+        value = w.check();
+      } catch {
+        /* un prédicat qui jette compte comme non satisfait */
+      }
+      if (value) w.settle(value);
+    }
+  } finally {
+    queryCache = null;
+  }
+}
+
+function scheduleFlush() {
+  if (flushQueued) return;
+  flushQueued = true;
+  queueMicrotask(flush);
+}
+
+function armPoll() {
+  if (pollTimer) clearTimeout(pollTimer);
+  pollTimer = null;
+  let every = Infinity;
+  for (const w of waiters) if (w.pollMs && w.pollMs < every) every = w.pollMs;
+  if (every === Infinity) return;
+  pollTimer = setTimeout(() => {
+    pollTimer = null;
+    flush();
+    armPoll();
+  }, every);
+}
+
+function connect() {
+  if (observer || typeof MutationObserver === 'undefined') return;
+  observer = new MutationObserver(flush);
+  // sur document (et non documentElement) pour survivre à un remplacement de la racine
+  observer.observe(document, {
+    childList: true,
+    subtree: true,
+    attributes: true,
+    characterData: true,
+  });
+  document.addEventListener('input', scheduleFlush, true);
+  document.addEventListener('change', scheduleFlush, true);
+}
+
+function disconnect() {
+  if (!observer) return;
+  observer.disconnect();
+  observer = null;
+  document.removeEventListener('input', scheduleFlush, true);
+  document.removeEventListener('change', scheduleFlush, true);
+}
+
+// document.querySelector mutualisé entre les attentes d'un même passage
+export function queryOnce<T extends Element>(selector: string): T | null {
+  if (!queryCache) return document.querySelector<T>(selector);
+  if (!queryCache.has(selector)) queryCache.set(selector, document.querySelector(selector));
+  return (queryCache.get(selector) as T | null) ?? null;
+}
+
+// Résout avec la première valeur vraie de check(), ou null au timeout / à l'abandon.
+// check() est appelé tout de suite, puis après chaque lot de mutations.
+export function waitFor<T>(
+  check: () => T | null | undefined | false,
+  options: WaitOptions,
+): Promise<T | null> {
+  const { timeoutMs, signal } = options;
+  const first = check();
+  if (first) return Promise.resolve(first);
+  if (signal?.aborted || timeoutMs <= 0) return Promise.resolve(null);
+
+  return new Promise<T | null>((resolve) => {
+    const start = Date.now();
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    const onAbort = () => waiter.settle(null);
+    const waiter: Waiter = {
+      check,
+      pollMs: typeof MutationObserver === 'undefined' ? FALLBACK_POLL_MS : options.pollMs,
+      settle: (value) => {
+        if (!waiters.delete(waiter)) return;
+        if (timer) clearTimeout(timer);
+        signal?.removeEventListener('abort', onAbort);
+        if (!waiters.size) disconnect();
+        armPoll();
+        resolve((value as T) || null);
+      },
+    };
+    const expire = () => {
+      // un timer peut tomber une poignée de ms trop tôt: le budget reste entier
+      const left = start + timeoutMs - Date.now();
+      if (left > 0) {
+        timer = setTimeout(expire, left);
+        return;
+      }
+      let value: unknown = null;
+      try {
+        value = check();
+      } catch {
+        /* ignore */
+      }
+      waiter.settle(value);
+    };
+    waiters.add(waiter);
+    connect();
+    if (waiter.pollMs) armPoll();
+    signal?.addEventListener('abort', onAbort, { once: true });
+    timer = setTimeout(expire, timeoutMs);
+  });
+}
+
+// Nombre d'attentes en cours (diagnostic et tests)
+export function pendingWaits(): number {
+  return waiters.size;
+}
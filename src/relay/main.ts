@@ -0,0 +1,22 @@
+// Page invisible insérée par le content script (image-relay.ts): lit le cache
+// d'images du background et transfère les octets à la page par MessagePort.
+import browser from 'webextension-polyfill';
+
+import { idbStore } from '../lib/image-cache';
+import { RELAY_HELLO, relayGrantUrls, serveRelay } from '../lib/image-relay';
+
+// pages Vinted seulement, comme les matches de web_accessible_resources
+const VINTED_ORIGIN = /^https:\/\/([a-z0-9-]+\.)?vinted\.(fr|com)$/i;
+
+const store = idbStore();
+let served = false;
+
+window.addEventListener('message', (e) => {
+  const port = e.ports[0];
+  if (e.data !== RELAY_HELLO || !port || e.source !== window.parent) return;
+  if (!VINTED_ORIGIN.test(e.origin)) return;
+  // un seul port: celui confié à la création par le content script
+  if (served) return;
+  served = true;
+  serveRelay(port, store, (token) => relayGrantUrls(browser.storage.session, token));
+});
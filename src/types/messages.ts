@@ -16,9 +16,17 @@ export const RepublishDraft = z.object({
 });
 export type RepublishDraft = z.infer<typeof RepublishDraft>;
 
+// Photos uploaded per republish (new-listing.ts). The background prefetch takes the
+// same first ones: downloading the others would cost bandwidth for nothing.
+export const MAX_UPLOAD_IMAGES = 10;
+
 export const RepublishCreate = z.object({
   type: z.literal('republish:create'),
-  payload: z.object({ targetUrl: z.string().url() }),
+  // images: photos du brouillon, préchargées par le background pendant que l'onglet s'ouvre
+  payload: z.object({
+    targetUrl: z.string().url(),
+    images: z.array(z.string().url()).max(MAX_UPLOAD_IMAGES).optional(),
+  }),
 });
 export type RepublishCreate = z.infer<typeof RepublishCreate>;
 
@@ -42,7 +50,17 @@ export const ImageFetchResult = z.object({ ok: z.boolean(), contentType: z.strin
 export type ImageFetchResult = z.infer<typeof ImageFetchResult>;
 
 // Full image download (blob as bytes)
-export const ImageDownload = z.object({ type: z.literal('image:download'), url: z.string().url() });
+// transfer: 'binary' returns the ArrayBuffer as is, where the messaging layer carries it
+// (see ImageTransferProbe); 'cache' leaves the bytes in the background image cache and
+// returns its transform, read by the page through the relay iframe (image-relay.ts);
+// 'base64' only when neither works
+export const ImageTransfer = z.enum(['binary', 'cache', 'base64']);
+export type ImageTransfer = z.infer<typeof ImageTransfer>;
+export const ImageDownload = z.object({
+  type: z.literal('image:download'),
+  url: z.string().url(),
+  transfer: ImageTransfer.optional(),
+});
 export type ImageDownload = z.infer<typeof ImageDownload>;
 export const ImageDownloadResult = z.object({
   ok: z.boolean(),
@@ -52,9 +70,31 @@ export const ImageDownloadResult = z.object({
   bytes: z.instanceof(ArrayBuffer).optional(),
   // fallback when ArrayBuffer cannot be transferred across MV3 messaging
   bytesB64: z.string().optional(),
+  // time spent encoding bytesB64 in the background
+  encodeMs: z.number().optional(),
+  // served from the background image cache
+  cached: z.boolean().optional(),
+  // transfer 'cache': image cache entry (url + transform) holding the bytes
+  transform: z.string().optional(),
+  // HTTP status of a failed download (retry decision on the page side)
+  status: z.number().optional(),
 });
 export type ImageDownloadResult = z.infer<typeof ImageDownloadResult>;
 
+// Does an ArrayBuffer survive the messaging layer? (JSON-serialized in Chrome,
+// structured clone in Firefox). The reply carries PROBE_BYTES as bytes.
+export const ImageTransferProbe = z.object({ type: z.literal('image:probe') });
+export type ImageTransferProbe = z.infer<typeof ImageTransferProbe>;
+export const PROBE_BYTES = 4;
+
+// URLs the relay iframe may read for the current upload (transfer 'cache'); the reply
+// carries the grant token handed to the relay over its MessagePort
+export const ImageRelayAllow = z.object({
+  type: z.literal('image:relay-allow'),
+  urls: z.array(z.string().url()).max(MAX_UPLOAD_IMAGES),
+});
+export type ImageRelayAllow = z.infer<typeof ImageRelayAllow>;
+
 // Image conversion to JPEG (done in background)
 export const ImageConvertJpeg = z.object({
   type: z.literal('image:convert-jpeg'),
@@ -80,6 +120,8 @@ export const AnyMessageExtended = z.union([
   RepublishInjected,
   ImageFetch,
   ImageDownload,
+  ImageTransferProbe,
+  ImageRelayAllow,
   ImageConvertJpeg,
 ]);
 export type AnyMessageExtended = z.infer<typeof AnyMessageExtended>;
@@ -2,11 +2,13 @@ import { describe, expect, it, vi } from 'vitest';
 
 import * as categoryModule from '../src/lib/category-simple';
 import { waitForElement } from '../src/lib/dom-utils';
+import type { ScheduleReport, TaskTiming } from '../src/lib/fill-scheduler';
+import { lastScheduleReport } from '../src/lib/fill-scheduler';
 import { fillNewItemForm } from '../src/lib/filler';
 import { log } from '../src/lib/metrics';
 
-describe('fillNewItemForm waits for category before filling others', () => {
-  it('does not fill title/description/price before category commit', async () => {
+describe('fillNewItemForm fills text fields while the category commits', () => {
+  it('fills title/description/price while category commits', async () => {
     // Setup DOM: create title/desc/price inputs and delayed category
     document.body.innerHTML = `
       <input id="title" name="title" />
@@ -18,8 +20,8 @@ describe('fillNewItemForm waits for category before filling others', () => {
     const spy = vi
       .spyOn(categoryModule, 'fillCategory')
       .mockImplementation(async (path: string[]) => {
-        // microtask yield (fast) to simulate async commit without hitting test timeouts
-        await Promise.resolve();
+        // commit lent: les champs texte doivent avancer pendant ce temps
+        await new Promise((r) => setTimeout(r, 50));
         // trace via central logger so it's gated by metrics
         log('debug', '[test] fillCategory mocked, path=', path.join(' > '));
         // Create category input after microtask to simulate late rendering/commit
@@ -53,6 +55,19 @@ describe('fillNewItemForm waits for category before filling others', () => {
     // Price may be formatted; ensure it's not empty and contains digits
     expect(price.value.replace(/\s+/g, '')).toMatch(/\d/);
 
+    // Ordonnancement réel: les champs texte démarrent avant la fin de la catégorie,
+    // les listes dépendantes seulement après
+    const report = lastScheduleReport() as ScheduleReport;
+    const timing = (id: string) => report.tasks.find((t) => t.id === id) as TaskTiming;
+    const category = timing('category');
+    for (const id of ['title', 'description', 'price']) {
+      expect(timing(id).start).toBeLessThan(category.end);
+    }
+    expect(timing('title').end).toBeLessThanOrEqual(category.end);
+    for (const id of ['unisex', 'brand', 'size']) {
+      expect(timing(id).start).toBeGreaterThanOrEqual(category.end);
+    }
+
     spy.mockRestore();
   }, 20000);
 });
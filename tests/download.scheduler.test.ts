@@ -0,0 +1,145 @@
+import { afterEach, describe, expect, it, vi } from 'vitest';
+
+import type { DownloadResult } from '../src/lib/download-scheduler';
+import { backoffDelay, runDownloads } from '../src/lib/download-scheduler';
+
+const sleep = (ms: number) => new Promise<void>((r) => setTimeout(r, ms));
+
+describe('download scheduler', () => {
+  it('returns results in URL order and starts the cover first', async () => {
+    const started: string[] = [];
+    const urls = ['https://a.test/0', 'https://a.test/1', 'https://a.test/2', 'https://a.test/3'];
+    const results = await runDownloads(
+      urls,
+      async (url) => {
+        started.push(url);
+        // les premières finissent en dernier
+        await sleep(20 - Number(url.slice(-1)) * 5);
+        return url.toUpperCase();
+      },
+      { initial: 2 },
+    );
+    expect(started[0]).toBe(urls[0]);
+    expect(results.map((r) => r.value)).toEqual(urls.map((u) => u.toUpperCase()));
+    expect(results.every((r) => r.ok && r.attempts === 1)).toBe(true);
+  });
+
+  it('retries transient failures with backoff, ahead of later images', async () => {
+    const calls: string[] = [];
+    let failures = 1;
+    const results = await runDownloads(
+      ['https://a.test/0', 'https://a.test/1', 'https://a.test/2'],
+      async (url, { attempt }) => {
+        calls.push(`${url.slice(-1)}#${attempt}`);
+        if (url.endsWith('/0') && failures-- > 0) throw new Error('503');
+        await sleep(5);
+        return url;
+      },
+      { initial: 1, baseDelayMs: 1, maxDelayMs: 2 },
+    );
+    // pendant le backoff la suivante avance, puis la reprise repasse devant la troisième
+    expect(calls).toEqual(['0#1', '1#1', '0#2', '2#1']);
+    expect(results[0]).toMatchObject({ ok: true, attempts: 2 });
+  });
+
+  it('reports a failure after the last retry and keeps going', async () => {
+    const seen: number[] = [];
+    const results = await runDownloads(
+      ['https://a.test/bad', 'https://a.test/good'],
+      async (url, { final }) => {
+        if (url.endsWith('bad')) {
+          if (final) return null;
+          throw new Error('timeout');
+        }
+        return url;
+      },
+      { retries: 2, baseDelayMs: 1, maxDelayMs: 2, onResult: (r) => seen.push(r.index) },
+    );
+    expect(results[0]).toMatchObject({ ok: false, value: null, attempts: 3 });
+    expect(results[1]).toMatchObject({ ok: true, value: 'https://a.test/good' });
+    expect(seen.sort()).toEqual([0, 1]);
+  });
+
+  it('caps concurrent downloads per host', async () => {
+    let active = 0;
+    let peak = 0;
+    const urls = Array.from({ length: 6 }, (_, i) => `https://cdn.test/${i}`);
+    await runDownloads(
+      urls,
+      async (url) => {
+        active++;
+        peak = Math.max(peak, active);
+        await sleep(5);
+        active--;
+        return url;
+      },
+      { initial: 6, max: 6, perHost: 2 },
+    );
+    expect(peak).toBe(2);
+  });
+
+  describe('adaptive concurrency', () => {
+    afterEach(() => {
+      vi.useRealTimers();
+    });
+
+    // latence et taille maîtrisées, horloge simulée: débit déterministe
+    const run = async (
+      count: number,
+      plan: (i: number) => { ms: number; bytes: number; fail?: boolean },
+    ) => {
+      vi.useFakeTimers();
+      const seen: DownloadResult<number>[] = [];
+      const urls = Array.from({ length: count }, (_, i) => `https://a.test/${i}`);
+      const done = runDownloads(
+        urls,
+        async (url) => {
+          const step = plan(Number(url.split('/').pop()));
+          await new Promise((r) => setTimeout(r, step.ms));
+          if (step.fail) throw new Error('503');
+          return step.bytes;
+        },
+        {
+          initial: 1,
+          max: 6,
+          perHost: 10,
+          retries: 0,
+          sizeOf: (n) => n,
+          onResult: (r) => seen.push(r),
+        },
+      );
+      await vi.runAllTimersAsync();
+      await done;
+      return seen;
+    };
+
+    it('grows while throughput improves, then shrinks when it drops', async () => {
+      const seen = await run(24, (i) =>
+        i < 12 ? { ms: 10, bytes: 100_000 } : { ms: 60, bytes: 1000 },
+      );
+      const levels = seen.map((r) => r.concurrency);
+      const peak = Math.max(...levels);
+      expect(peak).toBeGreaterThanOrEqual(4);
+      // la montée se fait pendant la phase rapide
+      expect(levels.indexOf(peak)).toBeLessThan(14);
+      expect(levels[levels.length - 1]).toBeLessThan(peak);
+    });
+
+    it('halves the concurrency on an error', async () => {
+      const seen = await run(16, (i) => ({ ms: 10, bytes: 100_000, fail: i === 10 }));
+      const at = seen.findIndex((r) => !r.ok);
+      const before = (seen[at - 1] as DownloadResult<number>).concurrency;
+      expect(before).toBeGreaterThanOrEqual(2);
+      expect((seen[at] as DownloadResult<number>).concurrency).toBe(Math.floor(before / 2));
+    });
+  });
+
+  it('bounds the jittered backoff', () => {
+    for (let attempt = 1; attempt <= 6; attempt++) {
+      const cap = Math.min(1000, 100 * 2 ** (attempt - 1));
+      const d = backoffDelay(attempt, 100, 1000);
+      expect(d).toBeGreaterThanOrEqual(cap / 2);
+      expect(d).toBeLessThanOrEqual(cap);
+    }
+  });
+});
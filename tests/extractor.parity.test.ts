@@ -0,0 +1,28 @@
+import { readdirSync, readFileSync } from 'node:fs';
+import { join } from 'node:path';
+
+import { describe, expect, it } from 'vitest';
+
+import { extractDraftFromDocument } from '../src/lib/extractor';
+
+// Même fichiers <nom>.expected.json que `python -m tools.python.offline_extractor --check`:
+// les deux extracteurs (TS et Python) doivent produire exactement ce brouillon.
+const fixturesDir = join(__dirname, 'fixtures');
+const cases = readdirSync(fixturesDir)
+  .filter((file) => file.endsWith('.expected.json'))
+  .map((file) => file.slice(0, -'.expected.json'.length));
+
+describe('extractor parity (TS vs tools/python/offline_extractor.py)', () => {
+  it('trouve au moins une fixture attendue', () => {
+    expect(cases.length).toBeGreaterThan(0);
+  });
+
+  it.each(cases)('%s.html correspond au brouillon attendu', (name) => {
+    const html = readFileSync(join(fixturesDir, `${name}.html`), 'utf-8');
+    const doc = new DOMParser().parseFromString(html, 'text/html');
+    const expected = JSON.parse(readFileSync(join(fixturesDir, `${name}.expected.json`), 'utf-8'));
+    // JSON round-trip: les champs undefined disparaissent comme dans le JSONL Python
+    const draft = JSON.parse(JSON.stringify(extractDraftFromDocument(doc)));
+    expect(draft).toEqual(expected);
+  });
+});
@@ -0,0 +1,84 @@
+import { describe, expect, it } from 'vitest';
+
+import { runFillTasks } from '../src/lib/fill-scheduler';
+
+const sleep = (ms: number) => new Promise<void>((r) => setTimeout(r, ms));
+
+describe('fill scheduler', () => {
+  it('runs independent tasks concurrently and dependents after their deps', async () => {
+    const events: string[] = [];
+    const task = (id: string, ms: number) => async () => {
+      events.push(`${id}:start`);
+      await sleep(ms);
+      events.push(`${id}:end`);
+    };
+    const report = await runFillTasks([
+      { id: 'title', run: task('title', 10) },
+      { id: 'category', lock: 'dropdown', run: task('category', 40) },
+      { id: 'brand', deps: ['category'], lock: 'dropdown', run: task('brand', 10) },
+    ]);
+    // le titre n'attend pas la catégorie
+    expect(events.indexOf('title:end')).toBeLessThan(events.indexOf('category:end'));
+    expect(events.indexOf('brand:start')).toBeGreaterThan(events.indexOf('category:end'));
+    expect(report.tasks.map((t) => t.id)).toEqual(['title', 'category', 'brand']);
+    expect(report.criticalPath).toEqual(['category', 'brand']);
+  });
+
+  it('serializes tasks sharing a lock in declaration order', async () => {
+    const events: string[] = [];
+    const task = (id: string) => async () => {
+      events.push(`${id}:start`);
+      await sleep(5);
+      events.push(`${id}:end`);
+    };
+    const report = await runFillTasks([
+      { id: 'brand', lock: 'dropdown', run: task('brand') },
+      { id: 'size', lock: 'dropdown', run: task('size') },
+      { id: 'color', lock: 'dropdown', run: task('color') },
+    ]);
+    expect(events).toEqual([
+      'brand:start',
+      'brand:end',
+      'size:start',
+      'size:end',
+      'color:start',
+      'color:end',
+    ]);
+    expect(report.criticalPath).toEqual(['brand', 'size', 'color']);
+    expect(report.tasks[2]?.lockWaitMs).toBeGreaterThan(0);
+  });
+
+  it('keeps going after a failed task and reports it', async () => {
+    let ran = false;
+    const report = await runFillTasks([
+      {
+        id: 'category',
+        run: async () => {
+          throw new Error('boom');
+        },
+      },
+      {
+        id: 'size',
+        deps: ['category'],
+        run: async () => {
+          ran = true;
+        },
+      },
+    ]);
+    expect(ran).toBe(true);
+    expect(report.tasks.map((t) => t.ok)).toEqual([false, true]);
+  });
+
+  it('rejects unknown deps and cycles', async () => {
+    const noop = async () => {};
+    await expect(runFillTasks([{ id: 'a', deps: ['missing'], run: noop }])).rejects.toThrow(
+      /unknown dep/,
+    );
+    await expect(
+      runFillTasks([
+        { id: 'a', deps: ['b'], run: noop },
+        { id: 'b', deps: ['a'], run: noop },
+      ]),
+    ).rejects.toThrow(/cycle/);
+  });
+});
@@ -0,0 +1,82 @@
+// @vitest-environment node
+// jsdom n'a ni IndexedDB ni Blob clonable: fake-indexeddb sur les Blob de node
+import 'fake-indexeddb/auto';
+
+import { describe, expect, it } from 'vitest';
+
+import type { ImageCache, ImageCacheEntry } from '../src/lib/image-cache';
+import { createImageCache, idbStore, pageImageCache } from '../src/lib/image-cache';
+
+let seq = 0;
+// une base par test: pas d'état partagé entre les cas
+const dbName = () => `vx-image-cache-test-${++seq}`;
+
+const entry = (key: string, size: number, lastUsed: number): ImageCacheEntry => ({
+  key,
+  url: key,
+  transform: 'raw',
+  name: `${key}.jpg`,
+  type: 'image/jpeg',
+  size,
+  lastUsed,
+  blob: new Blob([new Uint8Array(size)], { type: 'image/jpeg' }),
+});
+
+const file = (name: string) => new File([new Uint8Array(100)], name, { type: 'image/jpeg' });
+
+describe('idbStore', () => {
+  it('stores blobs and keeps the LRU index in step', async () => {
+    const store = idbStore(dbName());
+    await store.put(entry('a', 10, 1));
+    await store.put(entry('b', 20, 2));
+    const got = await store.get('a');
+    expect(got?.name).toBe('a.jpg');
+    expect(got?.blob.size).toBe(10);
+    expect(await store.get('missing')).toBeUndefined();
+
+    await store.touch('a', 5);
+    // une clé inconnue ne crée pas d'entrée
+    await store.touch('missing', 6);
+    const index = await store.index();
+    expect(index.sort((x, y) => x.key.localeCompare(y.key))).toEqual([
+      { key: 'a', size: 10, lastUsed: 5 },
+      { key: 'b', size: 20, lastUsed: 2 },
+    ]);
+
+    await store.delete('a');
+    expect(await store.get('a')).toBeUndefined();
+    expect((await store.index()).map((m) => m.key)).toEqual(['b']);
+
+    await store.clear();
+    expect(await store.index()).toEqual([]);
+    expect(await store.get('b')).toBeUndefined();
+  });
+
+  it('keeps entries and LRU order across cache instances', async () => {
+    const name = dbName();
+    const first = createImageCache(idbStore(name), 250);
+    await first.put('u1', 'raw', file('1.jpg'));
+    await first.put('u2', 'raw', file('2.jpg'));
+    expect(await first.get('u1', 'raw')).not.toBeNull();
+
+    // nouveau worker: l'index LRU est relu depuis la base
+    const second = createImageCache(idbStore(name), 250);
+    const hit = await second.get('u2', 'raw');
+    expect(hit?.name).toBe('2.jpg');
+    expect(hit?.size).toBe(100);
+    await second.put('u3', 'raw', file('3.jpg'));
+    expect(await second.get('u1', 'raw')).toBeNull();
+    expect(second.stats()).toMatchObject({ evictions: 1, entries: 2, bytes: 200 });
+  });
+});
+
+describe('pageImageCache', () => {
+  it('stays in memory even where IndexedDB exists', async () => {
+    const cache = pageImageCache() as ImageCache;
+    await cache.put('https://x.test/p.jpg', 'upload', new Blob([new Uint8Array(4)]), 'p.jpg');
+    expect((await cache.get('https://x.test/p.jpg', 'upload'))?.name).toBe('p.jpg');
+    expect(pageImageCache()).toBe(cache);
+    const dbs = await indexedDB.databases();
+    expect(dbs.map((d) => d.name)).not.toContain('vx-image-cache');
+  });
+});
@@ -0,0 +1,46 @@
+import { describe, expect, it } from 'vitest';
+
+import { createImageCache, memoryStore } from '../src/lib/image-cache';
+
+const file = (bytes: number, name = 'a.jpg') =>
+  new File([new Uint8Array(bytes)], name, { type: 'image/jpeg' });
+
+describe('image cache', () => {
+  it('keys entries by URL and transform and counts hits/misses', async () => {
+    const cache = createImageCache(memoryStore(), 1000);
+    await cache.put('https://x.test/1.jpg', 'upload', file(10, '1.jpg'));
+    expect(await cache.get('https://x.test/1.jpg', 'upload|rot:90')).toBeNull();
+    const hit = await cache.get('https://x.test/1.jpg', 'upload');
+    expect(hit?.name).toBe('1.jpg');
+    expect(hit?.type).toBe('image/jpeg');
+    expect(hit?.size).toBe(10);
+    expect(cache.stats()).toMatchObject({ hits: 1, misses: 1, puts: 1, entries: 1, bytes: 10 });
+  });
+
+  it('evicts the least recently used entries past the size cap', async () => {
+    const cache = createImageCache(memoryStore(), 250);
+    await cache.put('u1', 'raw', file(100));
+    await cache.put('u2', 'raw', file(100));
+    // u1 redevient le plus récent
+    expect(await cache.get('u1', 'raw')).not.toBeNull();
+    await cache.put('u3', 'raw', file(100));
+    expect(await cache.get('u2', 'raw')).toBeNull();
+    expect(await cache.get('u1', 'raw')).not.toBeNull();
+    expect(await cache.get('u3', 'raw')).not.toBeNull();
+    expect(cache.stats()).toMatchObject({ evictions: 1, entries: 2, bytes: 200 });
+  });
+
+  it('skips empty files and files larger than the cap', async () => {
+    const cache = createImageCache(memoryStore(), 50);
+    await cache.put('u1', 'raw', file(0));
+    await cache.put('u2', 'raw', file(60));
+    expect(cache.stats()).toMatchObject({ puts: 0, entries: 0 });
+  });
+
+  it('survives a new instance over the same store', async () => {
+    const store = memoryStore();
+    await createImageCache(store, 1000).put('u1', 'upload', file(10, 'one.jpg'));
+    const again = createImageCache(store, 1000);
+    expect((await again.get('u1', 'upload'))?.name).toBe('one.jpg');
+  });
+});
@@ -0,0 +1,119 @@
+import { describe, expect, it, vi } from 'vitest';
+
+import { createImageCache, memoryStore } from '../src/lib/image-cache';
+import type { Downloaded, FetchImage } from '../src/lib/image-prefetch';
+import { createPrefetcher, dedupeDownloads } from '../src/lib/image-prefetch';
+
+const bytes = (type: string, n = 8): Downloaded => ({
+  contentType: type,
+  name: 'photo',
+  buf: new Uint8Array(n).fill(7).buffer,
+  cached: false,
+});
+
+// téléchargement qui ne se termine qu'à l'annulation
+const hanging = (signals: AbortSignal[]): FetchImage =>
+  vi.fn(
+    (_url: string, signal?: AbortSignal) =>
+      new Promise<Downloaded | null>((_resolve, reject) => {
+        if (signal) signals.push(signal);
+        signal?.addEventListener('abort', () => reject(new Error('aborted')));
+      }),
+  );
+
+const setup = (download: FetchImage, sniffed = 'image/jpeg', ttlMs?: number) => {
+  const cache = createImageCache(memoryStore(), 10_000);
+  const convertToJpeg = vi.fn(async (_src: Blob, name: string) => ({
+    name: `${name}.jpg`,
+    blob: new Blob([new Uint8Array(4)], { type: 'image/jpeg' }),
+  }));
+  const prefetcher = createPrefetcher({
+    download,
+    convertToJpeg,
+    sniffImageType: async () => sniffed,
+    cache: () => cache,
+    ttlMs,
+  });
+  return { cache, convertToJpeg, prefetcher };
+};
+
+describe('image downloads dedupe', () => {
+  it('joins a download already in flight for the same URL', async () => {
+    let release: (d: Downloaded) => void = () => {};
+    const fetchImage = vi.fn(() => new Promise<Downloaded | null>((r) => (release = r)));
+    const download = dedupeDownloads(fetchImage);
+    const a = download('https://x.test/1.webp', new AbortController().signal);
+    const b = download('https://x.test/1.webp');
+    release(bytes('image/webp'));
+    expect(await a).toBe(await b);
+    expect(fetchImage).toHaveBeenCalledTimes(1);
+  });
+
+  it('falls back to a fresh download when the joined prefetch is aborted', async () => {
+    const ctrl = new AbortController();
+    const fetchImage = vi.fn((_url: string, signal?: AbortSignal) =>
+      signal
+        ? new Promise<Downloaded | null>((_r, reject) =>
+            signal.addEventListener('abort', () => reject(new Error('aborted'))),
+          )
+        : Promise.resolve(bytes('image/webp')),
+    );
+    const download = dedupeDownloads(fetchImage);
+    const prefetch = download('https://x.test/1.webp', ctrl.signal);
+    const upload = download('https://x.test/1.webp');
+    ctrl.abort();
+    await expect(prefetch).rejects.toThrow('aborted');
+    expect((await upload)?.buf.byteLength).toBe(8);
+    expect(fetchImage).toHaveBeenCalledTimes(2);
+  });
+});
+
+describe('image prefetch', () => {
+  it('caches only a sniffed JPEG for non-JPEG photos', async () => {
+    const download = vi.fn(async (url: string) =>
+      bytes(url.endsWith('.jpeg') ? 'image/jpeg' : 'image/webp'),
+    );
+    const { cache, convertToJpeg, prefetcher } = setup(download);
+    await prefetcher.start(['https://x.test/1.webp', 'https://x.test/2.jpeg']);
+    expect(convertToJpeg).toHaveBeenCalledTimes(1);
+    expect((await cache.get('https://x.test/1.webp', 'jpeg'))?.name).toBe('photo.jpg');
+    expect(await cache.get('https://x.test/2.jpeg', 'jpeg')).toBeNull();
+
+    // conversion impossible: convertToJpeg rend les octets d'origine renommés
+    const other = setup(download, 'image/webp');
+    await other.prefetcher.start(['https://x.test/1.webp']);
+    expect(await other.cache.get('https://x.test/1.webp', 'jpeg')).toBeNull();
+  });
+
+  it('cancels when the tab closes or leaves /items/new', async () => {
+    const signals: AbortSignal[] = [];
+    const { prefetcher } = setup(hanging(signals));
+
+    const closed = prefetcher.start(['https://x.test/1.webp'], 7);
+    prefetcher.onTabRemoved(8);
+    expect(prefetcher.current()).toEqual({ tabId: 7 });
+    prefetcher.onTabRemoved(7);
+    await closed;
+    expect(prefetcher.current()).toBeNull();
+
+    const left = prefetcher.start(['https://x.test/2.webp'], 9);
+    prefetcher.onTabUpdated(9, 'https://www.vinted.fr/items/new');
+    expect(prefetcher.current()).toEqual({ tabId: 9 });
+    prefetcher.onTabUpdated(9, 'https://www.vinted.fr/member/1');
+    await left;
+    expect(signals.map((s) => s.aborted)).toEqual([true, true]);
+  });
+
+  it('cancels the previous prefetch on a new republish, and after the TTL', async () => {
+    const signals: AbortSignal[] = [];
+    const { prefetcher } = setup(hanging(signals), 'image/jpeg', 30);
+    const first = prefetcher.start(['https://x.test/1.webp'], 1);
+    const second = prefetcher.start(['https://x.test/2.webp'], 2);
+    await first;
+    expect(signals[0]?.aborted).toBe(true);
+    expect(prefetcher.current()).toEqual({ tabId: 2 });
+    await second;
+    expect(signals[1]?.aborted).toBe(true);
+    expect(prefetcher.current()).toBeNull();
+  });
+});
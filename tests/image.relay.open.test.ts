@@ -0,0 +1,53 @@
+import { afterEach, describe, expect, it, vi } from 'vitest';
+
+import { memoryStore } from '../src/lib/image-cache';
+import { openRelay, RELAY_HELLO, serveRelay } from '../src/lib/image-relay';
+
+const SRC = 'chrome-extension://abcdefghijklmnop/src/relay/index.html';
+
+// jsdom ne charge pas la page de l'extension: on intercepte le message de l'iframe
+const frameOf = () => document.querySelector('iframe') as HTMLIFrameElement;
+
+describe('openRelay', () => {
+  afterEach(() => {
+    document.body.innerHTML = '';
+    vi.restoreAllMocks();
+  });
+
+  it('hands its port to the extension origin of the page and waits for the ack', async () => {
+    const opening = openRelay(SRC, 200);
+    const frame = frameOf();
+    expect(frame.src).toBe(SRC);
+    expect(frame.hidden).toBe(true);
+    const post = vi
+      .spyOn(frame.contentWindow as Window, 'postMessage')
+      .mockImplementation(() => undefined);
+    frame.dispatchEvent(new Event('load'));
+
+    expect(post).toHaveBeenCalledTimes(1);
+    const [message, origin, transfer] = post.mock.calls[0] as unknown as [
+      string,
+      string,
+      MessagePort[],
+    ];
+    expect(message).toBe(RELAY_HELLO);
+    // origine de la ressource fixe: celle du document encadré et du background
+    expect(origin).toBe('chrome-extension://abcdefghijklmnop');
+    const port = transfer[0] as MessagePort;
+    serveRelay(port, memoryStore(), async () => []);
+    const client = await opening;
+    expect(client?.alive()).toBe(true);
+    client?.close();
+    port.close();
+  });
+
+  it('gives up when the frame loads without a relay behind it', async () => {
+    const opening = openRelay(SRC, 30);
+    const frame = frameOf();
+    vi.spyOn(frame.contentWindow as Window, 'postMessage').mockImplementation(() => undefined);
+    // page d'erreur (CSP frame-src): load sans accusé
+    frame.dispatchEvent(new Event('load'));
+    expect(await opening).toBeNull();
+    expect(frameOf()).toBeNull();
+  });
+});
@@ -0,0 +1,155 @@
+// @vitest-environment node
+// MessageChannel de node: transfert d'ArrayBuffer par clone structuré, comme entre
+// le content script et l'iframe du relais
+import { afterEach, describe, expect, it } from 'vitest';
+
+import type { ImageCacheEntry } from '../src/lib/image-cache';
+import { cacheKey, memoryStore } from '../src/lib/image-cache';
+import type { GrantArea } from '../src/lib/image-relay';
+import {
+  createRelayClient,
+  grantRelayUrls,
+  RELAY_GRANT_TTL_MS,
+  relayGrantUrls,
+  serveRelay,
+} from '../src/lib/image-relay';
+
+const opened: MessagePort[] = [];
+
+const channel = () => {
+  const { port1, port2 } = new MessageChannel();
+  opened.push(port1, port2);
+  return { port1, port2 };
+};
+
+const entry = (url: string, bytes: number[]): ImageCacheEntry => ({
+  key: cacheKey(url, 'raw'),
+  url,
+  transform: 'raw',
+  name: url.split('/').pop() ?? 'image',
+  type: 'image/webp',
+  size: bytes.length,
+  lastUsed: 1,
+  blob: new Blob([new Uint8Array(bytes)], { type: 'image/webp' }),
+});
+
+const seeded = async () => {
+  const store = memoryStore();
+  await store.put(entry('https://x.test/1.webp', [1, 2, 3, 4, 5, 6]));
+  await store.put(entry('https://x.test/2.webp', [9, 9]));
+  return store;
+};
+
+const URLS = ['https://x.test/1.webp', 'https://x.test/2.webp'];
+
+// le relais sert les URLs de l'accord 'ok', aucune pour un autre jeton
+const grants = async (token: string) => (token === 'ok' ? URLS : []);
+
+const served = async () => {
+  const { port1, port2 } = channel();
+  serveRelay(port2, await seeded(), grants);
+  const client = createRelayClient(port1);
+  expect(await client.allow('ok')).toBe(true);
+  return client;
+};
+
+// storage.session en mémoire
+const memoryArea = () => {
+  const items: Record<string, unknown> = {};
+  const area: GrantArea = {
+    get: async (key) => (key === null ? { ...items } : key in items ? { [key]: items[key] } : {}),
+    set: async (more) => {
+      Object.assign(items, more);
+    },
+    remove: async (keys) => {
+      for (const key of [keys].flat()) delete items[key];
+    },
+  };
+  return { items, area };
+};
+
+describe('image relay', () => {
+  afterEach(() => {
+    for (const port of opened.splice(0)) port.close();
+  });
+
+  it('reads cache entries as ArrayBuffers over the port', async () => {
+    const client = await served();
+    const bytes = await client.read('https://x.test/1.webp', 'raw');
+    expect(Object.prototype.toString.call(bytes)).toBe('[object ArrayBuffer]');
+    expect([...new Uint8Array(bytes as ArrayBuffer)]).toEqual([1, 2, 3, 4, 5, 6]);
+    // autre transformation: entrée absente
+    expect(await client.read('https://x.test/1.webp', 'jpeg')).toBeNull();
+  });
+
+  it('matches concurrent replies to their requests', async () => {
+    const client = await served();
+    const [a, b] = await Promise.all([
+      client.read('https://x.test/2.webp', 'raw'),
+      client.read('https://x.test/1.webp', 'raw'),
+    ]);
+    expect(a?.byteLength).toBe(2);
+    expect(b?.byteLength).toBe(6);
+  });
+
+  it('answers only for the URLs granted on its port', async () => {
+    const { port1, port2 } = channel();
+    serveRelay(port2, await seeded(), grants);
+    const client = createRelayClient(port1);
+    // aucun accord: rien n'est servi, même présent dans le cache
+    expect(await client.read('https://x.test/1.webp', 'raw')).toBeNull();
+    expect(await client.allow('forged')).toBe(false);
+    expect(await client.read('https://x.test/1.webp', 'raw')).toBeNull();
+    expect(await client.allow('ok')).toBe(true);
+    expect((await client.read('https://x.test/1.webp', 'raw'))?.byteLength).toBe(6);
+    expect(client.alive()).toBe(true);
+  });
+
+  it('stops waiting once the relay goes silent mid-batch', async () => {
+    const { port1, port2 } = channel();
+    serveRelay(port2, await seeded(), grants);
+    const client = createRelayClient(port1, 30);
+    expect(await client.allow('ok')).toBe(true);
+    expect((await client.read('https://x.test/1.webp', 'raw'))?.byteLength).toBe(6);
+
+    // iframe retirée: plus aucune réponse
+    port2.onmessage = null;
+    port2.close();
+    const batch = await Promise.all(URLS.map((url) => client.read(url, 'raw')));
+    expect(batch).toEqual([null, null]);
+    expect(client.alive()).toBe(false);
+    // la suite du lot n'attend plus le délai
+    const t0 = Date.now();
+    expect(await client.read('https://x.test/2.webp', 'raw')).toBeNull();
+    expect(Date.now() - t0).toBeLessThan(30);
+  });
+
+  it('gives up on a silent relay and on close', async () => {
+    const { port1 } = channel();
+    const client = createRelayClient(port1, 20);
+    expect(await client.read('https://x.test/1.webp', 'raw')).toBeNull();
+
+    const other = createRelayClient(channel().port1);
+    const pending = other.read('https://x.test/1.webp', 'raw');
+    other.close();
+    expect(await pending).toBeNull();
+    expect(other.alive()).toBe(false);
+  });
+});
+
+describe('relay grants', () => {
+  it('hands out a token for the URLs and prunes expired grants', async () => {
+    const { items, area } = memoryArea();
+    items['unrelated'] = 1;
+    const old = await grantRelayUrls(area, ['https://x.test/old.webp'], 1000);
+    const now = 1000 + RELAY_GRANT_TTL_MS + 1;
+    const token = await grantRelayUrls(area, URLS, now);
+    expect(token).not.toBe(old);
+    expect(await relayGrantUrls(area, token, now)).toEqual(URLS);
+    expect(await relayGrantUrls(area, old, now)).toEqual([]);
+    expect(await relayGrantUrls(area, 'forged', now)).toEqual([]);
+    expect(Object.keys(items)).toEqual(['unrelated', `vx:relay:${token}`]);
+    // expiré à la lecture aussi
+    expect(await relayGrantUrls(area, token, now + RELAY_GRANT_TTL_MS)).toEqual([]);
+  });
+});
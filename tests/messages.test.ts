@@ -1,6 +1,13 @@
 import { describe, expect, it } from 'vitest';
 
-import { AnyMessage, ContentReady, Ping } from '../src/types/messages';
+import {
+  AnyMessage,
+  AnyMessageExtended,
+  ContentReady,
+  MAX_UPLOAD_IMAGES,
+  Ping,
+  RepublishCreate,
+} from '../src/types/messages';
 
 describe('messages schema', () => {
   it('validates ping', () => {
@@ -20,4 +27,39 @@ describe('messages schema', () => {
     const res = AnyMessage.safeParse({ type: 'unknown' });
     expect(res.success).toBe(false);
   });
+
+  it('accepts image downloads with a transfer mode and the transfer probe', () => {
+    const url = 'https://images1.vinted.net/t/1/f800/1.jpeg';
+    expect(AnyMessageExtended.safeParse({ type: 'image:download', url }).success).toBe(true);
+    expect(
+      AnyMessageExtended.safeParse({ type: 'image:download', url, transfer: 'base64' }).success,
+    ).toBe(true);
+    expect(
+      AnyMessageExtended.safeParse({ type: 'image:download', url, transfer: 'cache' }).success,
+    ).toBe(true);
+    expect(
+      AnyMessageExtended.safeParse({ type: 'image:download', url, transfer: 'json' }).success,
+    ).toBe(false);
+    expect(AnyMessageExtended.safeParse({ type: 'image:probe' }).success).toBe(true);
+  });
+
+  it('caps the URLs a relay grant covers', () => {
+    const urls = (n: number) =>
+      Array.from({ length: n }, (_, i) => `https://images1.vinted.net/t/${i}.jpeg`);
+    const allow = (n: number) =>
+      AnyMessageExtended.safeParse({ type: 'image:relay-allow', urls: urls(n) }).success;
+    expect(allow(MAX_UPLOAD_IMAGES)).toBe(true);
+    expect(allow(MAX_UPLOAD_IMAGES + 1)).toBe(false);
+  });
+
+  it('accepts republish:create with the draft images to prefetch', () => {
+    const targetUrl = 'https://www.vinted.fr/items/new';
+    const create = (payload: object) =>
+      RepublishCreate.safeParse({ type: 'republish:create', payload }).success;
+    expect(create({ targetUrl })).toBe(true);
+    expect(create({ targetUrl, images: ['https://images1.vinted.net/t/1/f800/1.jpeg'] })).toBe(
+      true,
+    );
+    expect(create({ targetUrl, images: ['/relative.jpg'] })).toBe(false);
+  });
 });
@@ -0,0 +1,229 @@
+import { appendFileSync, existsSync, readFileSync } from 'node:fs';
+import { basename, dirname, join } from 'node:path';
+
+import { afterAll, beforeAll, describe, it, vi } from 'vitest';
+
+import { extractDraftFromDocument } from '../../src/lib/extractor';
+import { fillNewItemForm } from '../../src/lib/filler';
+import { takeWaitRecords } from '../../src/lib/metrics';
+import type { RepublishDraft } from '../../src/types/draft';
+
+// Rejeu d'un corpus de pages capturées (pages annonce et /items/new), lancé par
+// `npm run replay -- <dossier>` (scripts/replay-corpus.mjs) qui répartit les pages
+// entre plusieurs processus vitest. Ce fichier traite la part VX_REPLAY_SHARD=i/n
+// de VX_REPLAY_MANIFEST (liste JSON de chemins) et écrit une ligne JSON par page
+// dans VX_REPLAY_OUT. Il n'est pas inclus dans `npm run test` (voir vitest.replay.config.ts).
+//
+// Les attentes (waitForElement, dropdowns...) tournent sur des timers simulés:
+// une page statique où un champ manque ne coûte pas ses 8 s de timeout réel.
+// Les durées par champ (marques perf:<clé> de metrics.ts) restent en temps réel,
+// waitedMs est le temps simulé passé à attendre.
+
+const manifestPath = process.env.VX_REPLAY_MANIFEST;
+const manifest: string[] = manifestPath ? JSON.parse(readFileSync(manifestPath, 'utf-8')) : [];
+const [shard = 0, shards = 1] = (process.env.VX_REPLAY_SHARD ?? '0/1').split('/').map(Number);
+const outPath = process.env.VX_REPLAY_OUT ?? '';
+const budgetMs = Number(process.env.VX_REPLAY_BUDGET_MS ?? 60000);
+const strict = process.env.VX_REPLAY_STRICT === '1';
+const pages = manifest.filter((_, i) => i % shards === shard);
+
+const TEXT_FIELDS = {
+  title:
+    'input[name="title"], input#title, [data-testid="title--input"], [data-testid="title-input"], [data-testid="title-field-input"]',
+  description:
+    'textarea[name="description"], textarea#description, [data-testid="description--input"], [data-testid="description-input"], [data-testid="description-field-input"]',
+  price:
+    'input[name="price"], input#price, [data-testid="price-input--input"] input, input[data-testid="price-input--input"], [data-testid="price-input"] input',
+} as const;
+const DROPDOWN_FIELDS = ['category', 'brand', 'size', 'condition', 'color', 'material'] as const;
+const ITEM_PAGE =
+  '[data-testid="item-title"], [data-testid="item-page-summary-plugin"], [itemprop="description"]';
+
+type FieldResult = { status: 'set' | 'unset' | 'absent'; ms?: number };
+type PageResult = {
+  page: string;
+  kind: 'item' | 'new' | 'unknown';
+  ok: boolean;
+  ms: number;
+  waitedMs?: number;
+  timedOutWaits?: number;
+  fields?: Record<string, FieldResult>;
+  extract?: { ms: number; expected: boolean; ok: boolean; diff?: string[] };
+  error?: string;
+};
+
+function mount(html: string) {
+  const parsed = new DOMParser().parseFromString(html, 'text/html');
+  // ni scripts ni ressources externes: seul le DOM capturé compte
+  parsed
+    .querySelectorAll('script, iframe, link[rel~="stylesheet"], link[rel~="preload"]')
+    .forEach((n) => n.remove());
+  const root = document.importNode(parsed.documentElement, true);
+  document.replaceChild(root, document.documentElement);
+}
+
+function defaultDraft(page: string): RepublishDraft {
+  const stem = page.replace(/\.html?$/i, '');
+  for (const candidate of [`${stem}.draft.json`, process.env.VX_REPLAY_DRAFT]) {
+    if (candidate && existsSync(candidate)) return JSON.parse(readFileSync(candidate, 'utf-8'));
+  }
+  return JSON.parse(
+    readFileSync(join(__dirname, '..', 'fixtures', 'alien-ring-item.expected.json'), 'utf-8'),
+  );
+}
+
+function diffKeys(a: Record<string, unknown>, b: Record<string, unknown>): string[] {
+  const keys = new Set([...Object.keys(a), ...Object.keys(b)]);
+  return [...keys].filter((k) => JSON.stringify(a[k]) !== JSON.stringify(b[k]));
+}
+
+function collectPerf(calls: unknown[][]): Record<string, number> {
+  const out: Record<string, number> = {};
+  for (const args of calls) {
+    if (args[0] !== '[VX]' || typeof args[1] !== 'string' || !args[1].startsWith('perf:')) continue;
+    const ms = Number.parseFloat(String(args[2]));
+    if (Number.isFinite(ms)) out[args[1].slice(5)] = ms;
+  }
+  return out;
+}
+
+function replayItemPage(page: string): PageResult {
+  const t0 = performance.now();
+  const draft = JSON.parse(JSON.stringify(extractDraftFromDocument(document)));
+  const ms = performance.now() - t0;
+  const expectedPath = page.replace(/\.html?$/i, '.expected.json');
+  if (existsSync(expectedPath)) {
+    const diff = diffKeys(draft, JSON.parse(readFileSync(expectedPath, 'utf-8')));
+    return {
+      page,
+      kind: 'item',
+      ok: diff.length === 0,
+      ms,
+      extract: { ms, expected: true, ok: diff.length === 0, diff: diff.length ? diff : undefined },
+    };
+  }
+  const ok = !!draft.title;
+  return { page, kind: 'item', ok, ms, extract: { ms, expected: false, ok } };
+}
+
+type LogSpy = { mock: { calls: unknown[][] }; mockClear: () => void };
+
+async function replayNewPage(page: string, logSpy: LogSpy): Promise<PageResult> {
+  const draft = defaultDraft(page);
+  const start = Date.now();
+  const t0 = performance.now();
+  let error: string | undefined;
+  let finished = false;
+  const run = fillNewItemForm(draft)
+    .catch((e) => {
+      error = (e as Error)?.message ?? String(e);
+    })
+    .finally(() => {
+      finished = true;
+    });
+  while (!finished && Date.now() - start < budgetMs) {
+    await vi.advanceTimersByTimeAsync(20);
+  }
+  if (!finished) error = `budget of ${budgetMs}ms (simulated) exceeded`;
+  else await run;
+  const waitedMs = Date.now() - start;
+  // laisser passer les reprises différées du prix (setTimeout après la saisie)
+  await vi.advanceTimersByTimeAsync(1000);
+  const ms = performance.now() - t0;
+  const waits = takeWaitRecords();
+  const perfMs = collectPerf(logSpy.mock.calls);
+
+  const fields: Record<string, FieldResult> = {};
+  let mainOk = true;
+  for (const [name, selector] of Object.entries(TEXT_FIELDS)) {
+    const el = document.querySelector<HTMLInputElement | HTMLTextAreaElement>(selector);
+    const status = !el ? 'absent' : el.value.trim() ? 'set' : 'unset';
+    fields[name] = { status, ms: perfMs[name] };
+    if (status === 'unset') mainOk = false;
+  }
+  let dropdownsOk = true;
+  for (const name of DROPDOWN_FIELDS) {
+    const prefix = name === 'category' ? 'catalog' : name;
+    const el = document.querySelector<HTMLInputElement>(
+      `input[name="${name}"], [data-testid^="${prefix}"][data-testid$="-input"]`,
+    );
+    const wanted =
+      name === 'category' ? draft.categoryPath?.length : draft[name as keyof RepublishDraft];
+    const status = !el ? 'absent' : el.value.trim() ? 'set' : 'unset';
+    fields[name] = { status, ms: perfMs[name] };
+    if (status === 'unset' && wanted) dropdownsOk = false;
+  }
+  return {
+    page,
+    kind: 'new',
+    ok: !error && mainOk && (!strict || dropdownsOk),
+    ms,
+    waitedMs,
+    timedOutWaits: waits.filter((w) => w.timedOut).length,
+    fields,
+    error,
+  };
+}
+
+describe(`replay shard ${shard}/${shards}`, () => {
+  const spies: { mockRestore: () => void }[] = [];
+  let logSpy: LogSpy;
+
+  beforeAll(() => {
+    // console.log porte les marques perf; debug/warn ne servent qu'au bruit
+    const log = vi.spyOn(console, 'log').mockImplementation(() => {});
+    logSpy = log as unknown as LogSpy;
+    spies.push(log);
+    for (const level of ['debug', 'warn', 'info'] as const) {
+      spies.push(vi.spyOn(console, level).mockImplementation(() => {}));
+    }
+  });
+
+  afterAll(() => {
+    spies.forEach((s) => s.mockRestore());
+  });
+
+  it.each(pages)('%s', async (page) => {
+    let result: PageResult;
+    logSpy.mockClear();
+    localStorage.clear();
+    localStorage.setItem('vx:debug', '1');
+    localStorage.setItem('vx:perf', '1');
+    (window as unknown as { __vx_fillRunning?: boolean }).__vx_fillRunning = false;
+    takeWaitRecords();
+    const t0 = performance.now();
+    try {
+      mount(readFileSync(page, 'utf-8'));
+      if (document.querySelector(ITEM_PAGE)) {
+        result = replayItemPage(page);
+      } else if (
+        document.querySelector(TEXT_FIELDS.title) ||
+        document.querySelector(TEXT_FIELDS.price)
+      ) {
+        vi.useFakeTimers({
+          toFake: ['setTimeout', 'clearTimeout', 'setInterval', 'clearInterval', 'Date'],
+        });
+        try {
+          result = await replayNewPage(page, logSpy);
+        } finally {
+          vi.useRealTimers();
+        }
+      } else {
+        result = {
+          page,
+          kind: 'unknown',
+          ok: false,
+          ms: 0,
+          error: 'neither an item page nor /items/new',
+        };
+      }
+    } catch (e) {
+      result = { page, kind: 'unknown', ok: false, ms: performance.now() - t0, error: String(e) };
+    }
+    result.ms = Math.round(result.ms * 10) / 10;
+    appendFileSync(
+      outPath,
+      JSON.stringify({ ...result, name: basename(page), dir: dirname(page) }) + '\n',
+    );
+  });
+});
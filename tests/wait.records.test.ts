@@ -0,0 +1,46 @@
+import { afterEach, describe, expect, it } from 'vitest';
+
+import { waitForElement } from '../src/lib/dom-utils';
+import { takeWaitRecords } from '../src/lib/metrics';
+
+// noteWait() goes through a dynamic import of metrics; let it settle
+const settle = () => new Promise((r) => setTimeout(r, 20));
+
+describe('wait records', () => {
+  afterEach(() => {
+    localStorage.removeItem('vx:perf');
+    takeWaitRecords();
+    document.body.innerHTML = '';
+  });
+
+  it('records a timed-out waitForElement with its selector and budget', async () => {
+    localStorage.setItem('vx:perf', '1');
+    const el = await waitForElement('#never', { timeoutMs: 50, intervalMs: 10 });
+    expect(el).toBeNull();
+    await settle();
+    const records = takeWaitRecords();
+    expect(records).toHaveLength(1);
+    expect(records[0]).toMatchObject({
+      name: 'element',
+      target: '#never',
+      budgetMs: 50,
+      timedOut: true,
+    });
+    expect(records[0].ms).toBeGreaterThanOrEqual(50);
+    expect(takeWaitRecords()).toHaveLength(0);
+  });
+
+  it('records a late element as a successful wait', async () => {
+    localStorage.setItem('vx:perf', '1');
+    setTimeout(() => {
+      const div = document.createElement('div');
+      div.id = 'late';
+      document.body.appendChild(div);
+    }, 20);
+    const el = await waitForElement('#late', { timeoutMs: 1000, intervalMs: 10 });
+    expect(el).not.toBeNull();
+    await settle();
+    const [rec] = takeWaitRecords();
+    expect(rec).toMatchObject({ name: 'element', target: '#late', timedOut: false });
+  });
+});
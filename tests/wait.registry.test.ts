@@ -0,0 +1,87 @@
+import { afterEach, describe, expect, it, vi } from 'vitest';
+
+import { waitForElement, waitForGone } from '../src/lib/dom-utils';
+import { pendingWaits, waitFor } from '../src/lib/wait-registry';
+
+describe('wait registry', () => {
+  afterEach(() => {
+    document.body.innerHTML = '';
+    vi.restoreAllMocks();
+  });
+
+  it('resolves on the mutation that adds the element, before any poll interval', async () => {
+    const pending = waitForElement('#late', { timeoutMs: 1000, intervalMs: 500 });
+    const start = Date.now();
+    queueMicrotask(() => {
+      const div = document.createElement('div');
+      div.id = 'late';
+      document.body.appendChild(div);
+    });
+    const el = await pending;
+    expect(el?.id).toBe('late');
+    expect(Date.now() - start).toBeLessThan(100);
+    expect(pendingWaits()).toBe(0);
+  });
+
+  it('multiplexes several waiters and resolves each on its own condition', async () => {
+    const a = waitForElement('.a', { timeoutMs: 1000 });
+    const a2 = waitForElement('.a', { timeoutMs: 1000 });
+    const b = waitForElement('[data-state="open"]', { timeoutMs: 1000 });
+    expect(pendingWaits()).toBe(3);
+    const div = document.createElement('div');
+    div.className = 'a';
+    document.body.appendChild(div);
+    expect(await a).toBe(div);
+    expect(await a2).toBe(div);
+    expect(pendingWaits()).toBe(1);
+    div.setAttribute('data-state', 'open');
+    expect(await b).toBe(div);
+    expect(pendingWaits()).toBe(0);
+  });
+
+  it('cancels a wait through its AbortSignal', async () => {
+    const ctrl = new AbortController();
+    const pending = waitForElement('#never', { timeoutMs: 5000, signal: ctrl.signal });
+    expect(pendingWaits()).toBe(1);
+    ctrl.abort();
+    expect(await pending).toBeNull();
+    expect(pendingWaits()).toBe(0);
+  });
+
+  it('sees input values set through input events', async () => {
+    document.body.innerHTML = '<input id="brand" />';
+    const input = document.querySelector('#brand') as HTMLInputElement;
+    const pending = waitFor(() => input.value === 'Zara', { timeoutMs: 1000 });
+    input.value = 'Zara';
+    input.dispatchEvent(new Event('input', { bubbles: true }));
+    expect(await pending).toBe(true);
+  });
+
+  it('waitForGone resolves when the node is hidden by a style change', async () => {
+    document.body.innerHTML = '<div id="menu"></div>';
+    const pending = waitForGone('#menu', 1000);
+    (document.querySelector('#menu') as HTMLElement).style.display = 'none';
+    expect(await pending).toBe(true);
+  });
+
+  it('waitForGone sees a fade-out that emits no mutation within one 40 ms poll', async () => {
+    document.body.innerHTML = '<div id="menu"></div>';
+    let opacity = '1';
+    vi.spyOn(window, 'getComputedStyle').mockImplementation(
+      () => ({ display: 'block', visibility: 'visible', opacity }) as CSSStyleDeclaration,
+    );
+    const start = Date.now();
+    const pending = waitForGone('#menu', 1000);
+    // fin de transition: seul le style calculé change
+    setTimeout(() => (opacity = '0'), 5);
+    expect(await pending).toBe(true);
+    expect(Date.now() - start).toBeLessThan(95);
+  });
+
+  it('times out with null after the full budget', async () => {
+    const start = Date.now();
+    expect(await waitFor(() => document.querySelector('#never'), { timeoutMs: 40 })).toBeNull();
+    expect(Date.now() - start).toBeGreaterThanOrEqual(40);
+    expect(pendingWaits()).toBe(0);
+  });
+});
@@ -0,0 +1,58 @@
+"""Single entry point for the tools: python -m tools.python <command> [args...]
+
+Only the module of the chosen command is imported, and browser dependencies
+(selenium, undetected_chromedriver) only once that command opens a driver, so
+listing the commands or running an offline one starts fast. Commands that
+open a browser take --attach HOST:PORT to reuse a Chrome started with
+`python -m tools.python chrome`.
+"""
+import importlib
+import sys
+
+# name: (module, function, summary); browser: commands that open a driver
+COMMANDS = {
+    'diag': ('diag_vinted', 'main', 'diagnose one page (undetected_chromedriver) [browser]'),
+    'sweep': ('diag_vinted', 'sweep_main', 'diagnose every URL of a file, N browsers in parallel [browser]'),
+    'plain-diag': ('diag_plain_selenium', 'main', 'diagnose one page with plain selenium [browser]'),
+    'login': ('login_vinted', 'main', 'warm up the profile and log in to Vinted [browser]'),
+    'snapshot': ('utils', 'main', 'show/compact/export the session snapshot, or save one from a running Chrome'),
+    'chrome': ('drivers', 'main', 'start a Chrome with remote debugging for --attach'),
+    'artifacts': ('artifact_store', 'main', 'query and prune the diagnostic artifact store'),
+    'extract': ('offline_extractor', 'main', 'extract RepublishDraft JSONL from saved item pages'),
+    'selectors': ('selector_report', 'main', 'selector hit rates over saved pages'),
+    'minimize': ('fixture_minimizer', 'main', 'minimize captured pages into small test fixtures'),
+    'standin': ('standin_server', 'main', 'serve the local Vinted stand-in'),
+    'bench': ('bench_fill', 'main', 'time-to-filled-form benchmark of dist/ [browser]'),
+    'throttle': ('throttle_report', 'main', 'fill and upload under CPU/network throttling [browser]'),
+    'heap': ('heap_report', 'main', 'heap growth over repeated upload cycles [browser]'),
+    'har': ('har_export', 'main', 'HAR export of a running Chrome with per-host summary'),
+}
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ['usage: python -m tools.python <command> [args...]', '', 'commands:']
+    lines += [f'  {name:<{width}}  {summary}' for name, (_, _, summary) in COMMANDS.items()]
+    lines += ['', 'python -m tools.python <command> --help shows the options of a command.']
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print(usage())
+        return 0
+    name, rest = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f'unknown command {name!r}\n', file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        return 2
+    module, func, _ = COMMANDS[name]
+    fn = getattr(importlib.import_module(f'{__package__ or "tools.python"}.{module}'), func)
+    # sub-parsers report their own name in usage/errors
+    sys.argv[0] = f'python -m tools.python {name}'
+    return fn(rest) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
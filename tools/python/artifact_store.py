@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Content-addressed store for diagnostic artifacts.
+
+Blobs are keyed by the sha256 of their content and stored once under
+tools/artifacts/blobs (gzip-compressed unless that does not pay off, e.g. PNG).
+Every capture appends a line to tools/artifacts/index.jsonl:
+
+  {"run": ..., "ts": ..., "url": ..., "step": ..., "artifacts": {"page.html": "<sha256>", ...}}
+
+Usage:
+  python3 tools/python/artifact_store.py list
+  python3 tools/python/artifact_store.py show <run>
+  python3 tools/python/artifact_store.py export <run> <dest_dir>
+  python3 tools/python/artifact_store.py evict [--max-runs N] [--max-age-days D] [--max-mb M] [--grace-seconds S]
+"""
+import argparse
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_ROOT = TOOLS_DIR / 'artifacts'
+
+# default retention, applied by evict() when no explicit limits are given
+DEFAULT_MAX_RUNS = 200
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+# unreferenced blobs younger than this are left alone by evict(): another store
+# instance or process may have put() them and not yet record()ed the entry
+BLOB_GRACE_SECONDS = 600
+
+
+def new_run_id(prefix='run'):
+    return f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+
+
+def _atomic_write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ArtifactStore:
+    def __init__(self, root=DEFAULT_ROOT, max_runs=DEFAULT_MAX_RUNS, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.blobs = self.root / 'blobs'
+        self.index_path = self.root / 'index.jsonl'
+        self.lock_path = self.root / 'index.lock'
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    # --- blobs ---
+
+    def _blob_paths(self, h):
+        d = self.blobs / h[:2]
+        return d / f'{h[2:]}.gz', d / f'{h[2:]}.bin'
+
+    def _blob_path(self, h):
+        for p in self._blob_paths(h):
+            if p.exists():
+                return p
+        return None
+
+    def put(self, data):
+        """Store data (bytes, str or JSON-serialisable object) and return its hash."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        elif not isinstance(data, (bytes, bytearray)):
+            data = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        h = hashlib.sha256(data).hexdigest()
+        existing = self._blob_path(h)
+        if existing is not None:
+            # dedupe: refresh mtime so recently used blobs survive eviction longest
+            try:
+                os.utime(existing)
+            except OSError:
+                pass
+            return h
+        gz_path, raw_path = self._blob_paths(h)
+        packed = gzip.compress(bytes(data), compresslevel=6, mtime=0)
+        if len(packed) < len(data) * 0.9:
+            _atomic_write(gz_path, packed)
+        else:
+            _atomic_write(raw_path, bytes(data))
+        return h
+
+    def get(self, h):
+        p = self._blob_path(h)
+        if p is None:
+            raise KeyError(h)
+        data = p.read_bytes()
+        return gzip.decompress(data) if p.suffix == '.gz' else data
+
+    # --- index ---
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """Serialise index writes across threads and processes (sweep workers, login)."""
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, 'a') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def record(self, run_id, step, artifacts, url=None, **meta):
+        """Append an index entry; artifacts maps names to hashes returned by put()."""
+        entry = {'run': run_id, 'ts': round(time.time(), 3), 'url': url, 'step': step, 'artifacts': artifacts}
+        entry.update(meta)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._index_lock():
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        return entry
+
+    def save(self, run_id, step, files, url=None, **meta):
+        """put() every {name: data} in files and record them as one entry."""
+        hashes = {name: self.put(data) for name, data in files.items() if data is not None}
+        return self.record(run_id, step, hashes, url=url, **meta)
+
+    def entries(self, run_id=None):
+        if not self.index_path.exists():
+            return []
+        out = []
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except Exception:
+                    continue
+                if run_id is None or e.get('run') == run_id:
+                    out.append(e)
+        return out
+
+    def runs(self):
+        """Summary per run, oldest first: run id, first/last ts, steps and artifact count."""
+        runs = {}
+        for e in self.entries():
+            r = runs.setdefault(e.get('run'), {
+                'run': e.get('run'), 'first_ts': e.get('ts'), 'last_ts': e.get('ts'), 'steps': 0, 'artifacts': 0,
+            })
+            r['last_ts'] = e.get('ts')
+            r['steps'] += 1
+            r['artifacts'] += len(e.get('artifacts') or {})
+        return list(runs.values())
+
+    def fetch(self, run_id, name=None, step=None):
+        """Return [(entry, name, bytes)] for a run, optionally filtered by artifact name/step."""
+        out = []
+        for e in self.entries(run_id):
+            if step is not None and e.get('step') != step:
+                continue
+            for n, h in (e.get('artifacts') or {}).items():
+                if name is not None and n != name:
+                    continue
+                try:
+                    out.append((e, n, self.get(h)))
+                except KeyError:
+                    continue
+        return out
+
+    def export(self, run_id, dest):
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        written = []
+        for i, (e, n, data) in enumerate(self.fetch(run_id)):
+            p = dest / f"{i:03d}_{e.get('step') or 'step'}_{n}".replace('/', '_')
+            p.write_bytes(data)
+            written.append(p)
+        return written
+
+    # --- retention ---
+
+    def _blob_size(self, h):
+        p = self._blob_path(h)
+        try:
+            return p.stat().st_size if p else 0
+        except OSError:
+            return 0
+
+    def evict(self, max_runs=None, max_age_days=None, max_bytes=None, grace_seconds=BLOB_GRACE_SECONDS):
+        """Drop the oldest runs beyond the limits, then delete unreferenced blobs.
+
+        Limits default to the store's max_runs/max_bytes. The index is read and rewritten
+        under the inter-process lock that record() also takes, so no entry appended by
+        another process is lost. Unreferenced blobs modified less than grace_seconds ago
+        are kept: put() and record() are separate steps. Returns (runs_removed, blobs_removed).
+        """
+        max_runs = self.max_runs if max_runs is None else max_runs
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._index_lock():
+            entries = self.entries()
+            order = []
+            for e in entries:
+                if e.get('run') not in order:
+                    order.append(e.get('run'))
+            by_run = {r: [e for e in entries if e.get('run') == r] for r in order}
+            keep = list(order)
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                keep = [r for r in keep if max(e.get('ts') or 0 for e in by_run[r]) >= cutoff]
+            if max_runs is not None and len(keep) > max_runs:
+                keep = keep[len(keep) - max_runs:]
+            if max_bytes is not None:
+                sizes = {}
+                total = 0
+                for r in keep:
+                    hashes = {h for e in by_run[r] for h in (e.get('artifacts') or {}).values()}
+                    sizes[r] = hashes
+                counted = set()
+                kept = []
+                # newest runs first so the most recent ones win the byte budget
+                for r in reversed(keep):
+                    new = sizes[r] - counted
+                    add = sum(self._blob_size(h) for h in new)
+                    if kept and total + add > max_bytes:
+                        break
+                    total += add
+                    counted |= new
+                    kept.append(r)
+                keep = list(reversed(kept))
+            removed_runs = len(order) - len(keep)
+            keep_set = set(keep)
+            live = {h for e in entries if e.get('run') in keep_set for h in (e.get('artifacts') or {}).values()}
+            if removed_runs:
+                lines = ''.join(
+                    json.dumps(e, ensure_ascii=False, separators=(',', ':')) + '\n' for e in entries if e.get('run') in keep_set
+                )
+                _atomic_write(self.index_path, lines.encode('utf-8'))
+        removed_blobs = 0
+        fresh_after = time.time() - grace_seconds
+        if self.blobs.exists():
+            for p in self.blobs.glob('*/*'):
+                if p.name.startswith('.tmp-'):
+                    continue
+                h = p.parent.name + p.name.split('.', 1)[0]
+                if h not in live:
+                    try:
+                        if p.stat().st_mtime >= fresh_after:
+                            continue
+                        p.unlink()
+                        removed_blobs += 1
+                    except OSError:
+                        pass
+        return removed_runs, removed_blobs
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Query and prune the diagnostic artifact store')
+    p.add_argument('--root', default=str(DEFAULT_ROOT))
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('list')
+    sp = sub.add_parser('show')
+    sp.add_argument('run')
+    sp = sub.add_parser('export')
+    sp.add_argument('run')
+    sp.add_argument('dest')
+    sp = sub.add_parser('evict')
+    sp.add_argument('--max-runs', type=int, default=None)
+    sp.add_argument('--max-age-days', type=float, default=None)
+    sp.add_argument('--max-mb', type=float, default=None)
+    sp.add_argument('--grace-seconds', type=float, default=BLOB_GRACE_SECONDS)
+    args = p.parse_args(argv)
+
+    store = ArtifactStore(args.root)
+    if args.cmd == 'list':
+        for r in store.runs():
+            print(json.dumps(r, ensure_ascii=False))
+    elif args.cmd == 'show':
+        for e in store.entries(args.run):
+            print(json.dumps(e, ensure_ascii=False))
+    elif args.cmd == 'export':
+        for path in store.export(args.run, args.dest):
+            print(path)
+    elif args.cmd == 'evict':
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        runs, blobs = store.evict(args.max_runs, args.max_age_days, max_bytes, args.grace_seconds)
+        print(json.dumps({'runs_removed': runs, 'blobs_removed': blobs}))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
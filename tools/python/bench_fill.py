@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Time-to-filled-form benchmark for the built extension.
+
+Loads the unpacked dist/ extension in headless Chrome, opens /items/new on the
+local stand-in (standin_server.py), triggers the fill through the content
+script's window.__vx_invokeFill hook (then __vx_invokeUpload for the draft
+images) and collects the "[VX] perf:<key> <ms>ms" logs of every iteration.
+
+Usage:
+  npm run build
+  python3 -m tools.python.bench_fill [-n 10] [--profile vinted] [--draft draft.json]
+      [--threshold 0.15] [--baseline-runs 5] [--no-upload]
+
+Each run appends one record (per-metric p50/p95 plus the raw samples) to
+tools/bench/fill_history.jsonl. The run fails (exit 1) when the p50 or p95 of
+a gated metric is more than --threshold above the median of the previous
+--baseline-runs runs with the same profile.
+
+The hooks live in the content script's isolated world, so they are called
+with Runtime.evaluate in the extension's execution context rather than with
+driver.execute_script (which only sees the page's main world).
+"""
+import argparse
+import json
+import math
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .cdp_utils import CDPError, attach_page_session, debugger_address
+from .drivers import start_driver
+from .har_export import HarRecorder, format_summary
+from .standin_server import PROFILES, StandinServer
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+TOOLS_DIR = REPO_ROOT / 'tools'
+DIST_DIR = REPO_ROOT / 'dist'
+HISTORY_FILE = TOOLS_DIR / 'bench' / 'fill_history.jsonl'
+DEFAULT_DRAFT = REPO_ROOT / 'tests' / 'fixtures' / 'alien-ring-item.expected.json'
+GATED_METRICS = ('total_ms', 'fill_ms')
+
+
+def build_driver(extension_dir, extra_args=(), headless=True):
+    args = [f'--load-extension={extension_dir}', f'--disable-extensions-except={extension_dir}',
+            '--no-first-run', '--no-default-browser-check', '--window-size=1366,768']
+    return start_driver('selenium', args=args + list(extra_args), headless=headless)
+
+
+class ExtensionPage:
+    """CDP view of one tab: the extension's isolated context and its [VX] logs."""
+
+    def __init__(self, driver):
+        self.session = attach_page_session(driver)
+        self._lock = threading.Lock()
+        self._contexts = {}
+        self.perf = {}
+        self.session.on('Runtime.executionContextCreated', self._on_context)
+        self.session.on('Runtime.executionContextDestroyed', self._on_context_gone)
+        self.session.on('Runtime.executionContextsCleared', lambda _p: self._clear_contexts())
+        self.session.on('Runtime.consoleAPICalled', self._on_console)
+        self.session.send('Runtime.enable', {})
+
+    def _on_context(self, params):
+        ctx = params.get('context') or {}
+        aux = ctx.get('auxData') or {}
+        if aux.get('type') == 'isolated' and str(ctx.get('origin', '')).startswith('chrome-extension://'):
+            with self._lock:
+                self._contexts[ctx.get('id')] = ctx
+
+    def _on_context_gone(self, params):
+        with self._lock:
+            self._contexts.pop(params.get('executionContextId'), None)
+
+    def _clear_contexts(self):
+        with self._lock:
+            self._contexts.clear()
+
+    def _on_console(self, params):
+        args = [a.get('value') for a in params.get('args') or []]
+        # metrics.ts: log('info', `perf:${key}`, `${dur.toFixed(1)}ms`)
+        if len(args) >= 3 and args[0] == '[VX]' and str(args[1]).startswith('perf:'):
+            try:
+                ms = float(str(args[2]).rstrip('ms'))
+            except ValueError:
+                return
+            with self._lock:
+                self.perf[str(args[1])[5:]] = ms
+
+    def reset(self):
+        with self._lock:
+            self.perf = {}
+
+    def evaluate(self, expression, context_id, timeout=60):
+        res = self.session.send('Runtime.evaluate', {
+            'expression': expression,
+            'contextId': context_id,
+            'awaitPromise': True,
+            'returnByValue': True,
+        }, timeout=timeout)
+        if res.get('exceptionDetails'):
+            raise CDPError(str(res['exceptionDetails'].get('text') or res['exceptionDetails']))
+        return (res.get('result') or {}).get('value')
+
+    def wait_for_hook(self, name, timeout=15):
+        """Return the id of the extension context that defines window.<name>."""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            with self._lock:
+                ids = list(self._contexts)
+            for cid in ids:
+                try:
+                    if self.evaluate(f"typeof window.{name} === 'function'", cid, timeout=5):
+                        return cid
+                except Exception:
+                    pass
+            time.sleep(0.05)
+        raise TimeoutError(f'window.{name} not found in any extension context after {timeout}s')
+
+    def close(self):
+        self.session.close()
+
+
+def run_iteration(driver, page, url, draft, upload=True, timeout=120):
+    page.reset()
+    t0 = time.monotonic()
+    driver.get(url)
+    load_ms = (time.monotonic() - t0) * 1000
+    cid = page.wait_for_hook('__vx_invokeFill')
+    t1 = time.monotonic()
+    page.evaluate(f'window.__vx_invokeFill({json.dumps(draft)})', cid, timeout=timeout)
+    t2 = time.monotonic()
+    upload_ms = None
+    if upload and draft.get('images'):
+        page.evaluate(f"window.__vx_invokeUpload({json.dumps(draft['images'])})", cid, timeout=timeout)
+        upload_ms = (time.monotonic() - t2) * 1000
+    total_ms = (time.monotonic() - t0) * 1000
+    sample = {
+        'load_ms': round(load_ms, 1),
+        'hook_ms': round((t1 - t0) * 1000 - load_ms, 1),
+        'fill_ms': round((t2 - t1) * 1000, 1),
+        'upload_ms': round(upload_ms, 1) if upload_ms is not None else None,
+        'total_ms': round(total_ms, 1),
+    }
+    sample.update({f'perf:{k}': v for k, v in page.perf.items()})
+    return sample
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100)."""
+    values = sorted(values)
+    if not values:
+        return None
+    k = max(0, min(len(values) - 1, math.ceil(q / 100.0 * len(values)) - 1))
+    return values[k]
+
+
+def summarize(samples):
+    keys = sorted({k for s in samples for k, v in s.items() if isinstance(v, (int, float))})
+    out = {}
+    for k in keys:
+        vals = [s[k] for s in samples if isinstance(s.get(k), (int, float))]
+        out[k] = {
+            'n': len(vals),
+            'p50': round(statistics.median(vals), 1),
+            'p95': round(percentile(vals, 95), 1),
+            'mean': round(statistics.fmean(vals), 1),
+        }
+    return out
+
+
+def load_history(path=HISTORY_FILE):
+    path = Path(path)
+    if not path.exists():
+        return []
+    out = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                out.append(json.loads(line))
+            except Exception:
+                continue
+    return out
+
+
+def check_regressions(stats, history, profile, threshold=0.15, baseline_runs=5, metrics=GATED_METRICS):
+    """Compare p50/p95 against the median of the last baseline_runs runs of the same profile."""
+    previous = [r for r in history if r.get('profile') == profile and r.get('stats')][-baseline_runs:]
+    regressions = []
+    if not previous:
+        return regressions
+    for m in metrics:
+        cur = stats.get(m)
+        if not cur:
+            continue
+        for q in ('p50', 'p95'):
+            base = [r['stats'][m][q] for r in previous if m in r['stats']]
+            if not base:
+                continue
+            ref = statistics.median(base)
+            if ref > 0 and cur[q] > ref * (1 + threshold):
+                regressions.append({'metric': m, 'quantile': q, 'value': cur[q], 'baseline': ref,
+                                    'ratio': round(cur[q] / ref, 3)})
+    return regressions
+
+
+def git_rev():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def append_history(record, path=HISTORY_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+def format_stats(stats):
+    width = max([len('metric')] + [len(k) for k in stats])
+    lines = [f"{'metric':<{width}}  {'n':>3}  {'p50':>9}  {'p95':>9}  {'mean':>9}"]
+    for k, s in stats.items():
+        lines.append(f"{k:<{width}}  {s['n']:>3}  {s['p50']:>9.1f}  {s['p95']:>9.1f}  {s['mean']:>9.1f}")
+    return '\n'.join(lines)
+
+
+def run_benchmark(iterations=10, profile='vinted', draft=None, extension_dir=DIST_DIR, upload=True,
+                  headless=True, warmup=1, port=0, har_path=None):
+    """Run warmup + iterations fills against a fresh stand-in; returns the samples.
+
+    With har_path, the network activity of the tab and of the extension worker
+    (image downloads) is exported as HAR plus a per-host summary.
+    """
+    if not (Path(extension_dir) / 'manifest.json').exists():
+        raise FileNotFoundError(f'no manifest.json in {extension_dir}; run `npm run build` first')
+    samples = []
+    with StandinServer(port=port, profile=profile) as server:
+        driver = build_driver(str(Path(extension_dir).resolve()), server.chrome_args(), headless=headless)
+        page = har = None
+        try:
+            page = ExtensionPage(driver)
+            if har_path:
+                har = HarRecorder(har_path)
+                har.add_session(attach_page_session(driver), 'page')
+                har.watch_workers(debugger_address(driver))
+            url = server.url('/items/new')
+            for i in range(warmup + iterations):
+                sample = run_iteration(driver, page, url, draft, upload=upload)
+                label = 'warmup' if i < warmup else f'{i - warmup + 1}/{iterations}'
+                print(f"bench: {label} total {sample['total_ms']:.0f}ms (fill {sample['fill_ms']:.0f}ms)", file=sys.stderr)
+                if i >= warmup:
+                    samples.append(sample)
+        finally:
+            if har is not None:
+                print(format_summary(har.close()), file=sys.stderr)
+            if page is not None:
+                page.close()
+            driver.quit()
+    return samples
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Benchmark time-to-filled-form of the built extension')
+    p.add_argument('-n', '--iterations', type=int, default=10)
+    p.add_argument('--warmup', type=int, default=1)
+    p.add_argument('--profile', choices=sorted(PROFILES), default='vinted', help='stand-in latency profile')
+    p.add_argument('--draft', default=str(DEFAULT_DRAFT), help='RepublishDraft JSON to fill')
+    p.add_argument('--extension', default=str(DIST_DIR), help='unpacked extension directory')
+    p.add_argument('--no-upload', action='store_true', help='skip __vx_invokeUpload')
+    p.add_argument('--headful', action='store_true')
+    p.add_argument('--history', default=str(HISTORY_FILE))
+    p.add_argument('--threshold', type=float, default=0.15, help='allowed p50/p95 increase over the baseline')
+    p.add_argument('--baseline-runs', type=int, default=5)
+    p.add_argument('--gate', nargs='*', default=list(GATED_METRICS), help='metrics checked against the baseline')
+    p.add_argument('--no-record', action='store_true', help='do not append this run to the history')
+    p.add_argument('--har', help='also export the network activity (tab + extension worker) as HAR')
+    args = p.parse_args(argv)
+
+    with open(args.draft, encoding='utf-8') as f:
+        draft = json.load(f)
+    samples = run_benchmark(args.iterations, args.profile, draft, args.extension,
+                            upload=not args.no_upload, headless=not args.headful, warmup=args.warmup,
+                            har_path=args.har)
+    stats = summarize(samples)
+    history = load_history(args.history)
+    regressions = check_regressions(stats, history, args.profile, args.threshold, args.baseline_runs, args.gate)
+    print(format_stats(stats))
+    if not args.no_record:
+        append_history({
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'rev': git_rev(),
+            'profile': args.profile,
+            'draft': Path(args.draft).name,
+            'iterations': len(samples),
+            'upload': not args.no_upload,
+            'stats': stats,
+            'regressions': regressions,
+            'samples': samples,
+        }, args.history)
+    for r in regressions:
+        print(f"REGRESSION {r['metric']} {r['quantile']}: {r['value']:.1f}ms vs baseline {r['baseline']:.1f}ms "
+              f"(x{r['ratio']})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,8 @@
+import json
+import threading
+import urllib.request
+from concurrent.futures import Future
+
 
 def set_accept_language(driver, lang_header='fr-FR,fr;q=0.9'):
     try:
@@ -21,3 +26,173 @@ def set_user_agent(driver, ua=None):
         driver.execute_cdp_cmd('Network.setUserAgentOverride', {'userAgent': ua})
     except Exception:
         pass
+
+
+class CDPError(RuntimeError):
+    pass
+
+
+class CDPSession:
+    """Websocket connection to one DevTools target.
+
+    A single reader thread decodes every message once: command replies resolve
+    the matching future, events are dispatched to listeners registered with on().
+    Listeners run on the reader thread and must not call send() themselves.
+    """
+
+    def __init__(self, ws_url, timeout=10):
+        import websocket
+
+        self.ws_url = ws_url
+        self._ws = websocket.create_connection(
+            ws_url, timeout=timeout, suppress_origin=True, enable_multithread=True
+        )
+        self._ws.settimeout(None)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending = {}
+        self._listeners = {}
+        self.closed = False
+        self._reader = threading.Thread(target=self._read_loop, name='cdp-reader', daemon=True)
+        self._reader.start()
+
+    def on(self, method, callback):
+        """Register callback(params) for an event method ('*' receives (method, params))."""
+        with self._lock:
+            self._listeners.setdefault(method, []).append(callback)
+
+    def off(self, method, callback):
+        with self._lock:
+            cbs = self._listeners.get(method) or []
+            if callback in cbs:
+                cbs.remove(callback)
+
+    def send_nowait(self, method, params=None, session_id=None):
+        """Send a command; session_id targets a child session attached with flatten."""
+        fut = Future()
+        with self._lock:
+            if self.closed:
+                fut.set_exception(CDPError('session closed'))
+                return fut
+            self._next_id += 1
+            msg_id = self._next_id
+            self._pending[msg_id] = fut
+        msg = {'id': msg_id, 'method': method, 'params': params or {}}
+        if session_id is not None:
+            msg['sessionId'] = session_id
+        try:
+            self._ws.send(json.dumps(msg))
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(msg_id, None)
+            fut.set_exception(CDPError(f'{method}: {e}'))
+        return fut
+
+    def send(self, method, params=None, timeout=10, session_id=None):
+        return self.send_nowait(method, params, session_id).result(timeout)
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+        self._fail_pending('session closed')
+
+    def _fail_pending(self, reason):
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for fut in pending:
+            if not fut.done():
+                fut.set_exception(CDPError(reason))
+
+    def _read_loop(self):
+        while not self.closed:
+            try:
+                raw = self._ws.recv()
+            except Exception:
+                break
+            if not raw:
+                continue
+            try:
+                msg = json.loads(raw)
+            except Exception:
+                continue
+            if 'id' in msg:
+                with self._lock:
+                    fut = self._pending.pop(msg['id'], None)
+                if fut is None or fut.done():
+                    continue
+                if 'error' in msg:
+                    fut.set_exception(CDPError(str(msg['error'].get('message') or msg['error'])))
+                else:
+                    fut.set_result(msg.get('result') or {})
+                continue
+            method = msg.get('method')
+            params = msg.get('params') or {}
+            with self._lock:
+                cbs = list(self._listeners.get(method) or [])
+                star = list(self._listeners.get('*') or [])
+            for cb in cbs:
+                try:
+                    cb(params)
+                except Exception as e:
+                    print('cdp listener error', method, e)
+            for cb in star:
+                try:
+                    cb(method, params)
+                except Exception as e:
+                    print('cdp listener error', method, e)
+        self.closed = True
+        self._fail_pending('connection lost')
+
+
+def debugger_address(driver):
+    """Return 'host:port' of the DevTools endpoint of a chromedriver-managed browser."""
+    caps = getattr(driver, 'capabilities', None) or {}
+    opts = caps.get('goog:chromeOptions') or {}
+    return opts.get('debuggerAddress')
+
+
+def list_targets(address, timeout=5):
+    with urllib.request.urlopen(f'http://{address}/json/list', timeout=timeout) as r:
+        return json.loads(r.read().decode('utf-8'))
+
+
+def browser_session(address, timeout=5):
+    """CDPSession on the browser target (Target.* auto-attach, all tabs and workers)."""
+    with urllib.request.urlopen(f'http://{address}/json/version', timeout=timeout) as r:
+        return CDPSession(json.loads(r.read().decode('utf-8'))['webSocketDebuggerUrl'])
+
+
+def extension_worker_targets(address):
+    """Service-worker targets of extensions; an MV3 worker gets a new target id after each restart."""
+    return [
+        t for t in list_targets(address)
+        if t.get('type') == 'service_worker' and str(t.get('url', '')).startswith('chrome-extension://')
+        and t.get('webSocketDebuggerUrl')
+    ]
+
+
+def attach_page_session(driver):
+    """Open a CDPSession on the tab the driver currently controls.
+
+    ChromeDriver window handles are DevTools target ids, so the current handle
+    picks the right tab; the first page target is used as a fallback.
+    """
+    address = debugger_address(driver)
+    if not address:
+        raise CDPError('no debuggerAddress in driver capabilities')
+    try:
+        handle = driver.current_window_handle
+    except Exception:
+        handle = None
+    pages = [t for t in list_targets(address) if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+    if not pages:
+        raise CDPError('no page target available')
+    target = next((t for t in pages if t.get('id') == handle), pages[0])
+    return CDPSession(target['webSocketDebuggerUrl'])
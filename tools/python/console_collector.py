@@ -0,0 +1,201 @@
+"""Live console collection from the page, content-script and service-worker targets.
+
+    collector = ConsoleCollector.attach(driver, 'tools/traces/console_run.jsonl')
+    collector.mark('submit')          # Python-side step, same clock as the events
+    ...
+    collector.close()
+
+Subscribes to Runtime.consoleAPICalled and Log.entryAdded over CDP while the
+run is in progress. Console calls made by the content script's isolated
+world are attributed to world "content", those of the page itself to
+"page", and those of the extension service worker to "worker". The
+extension's src/lib/metrics.ts output is parsed: log(level, msg, ...data)
+('[VX]' prefix, '[VX:img]' for image-uploader.ts) becomes kind "log" with msg
+and data, and perf() marks ("perf:<key>", "<ms>ms") become kind "perf" with
+key and ms. Anything else is kept as kind "console".
+
+Every event is written as one JSONL line as soon as it arrives. Each line has
+"t" (seconds since the collector started, monotonic), "ts_us" (the
+tracing.py clock, so lines up with spans) and "wall" (epoch seconds). Perf
+marks are also recorded as instant events in the trace.
+"""
+import collections
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+from .cdp_utils import CDPSession, attach_page_session, debugger_address, list_targets
+from .tracing import instant, now_us
+
+VX_PREFIXES = ('[VX]', '[VX:img]')
+
+
+def _arg_value(obj):
+    """Plain value of a Runtime.RemoteObject console argument."""
+    if 'value' in obj:
+        return obj['value']
+    if obj.get('unserializableValue'):
+        return obj['unserializableValue']
+    preview = obj.get('preview')
+    if preview and preview.get('properties') is not None:
+        props = preview['properties']
+        if preview.get('subtype') == 'array':
+            return [p.get('value') for p in props]
+        return {p.get('name'): p.get('value') for p in props}
+    return obj.get('description')
+
+
+def parse_console_args(args):
+    """Structured fields for a console call's argument values (metrics.ts conventions)."""
+    if not args or args[0] not in VX_PREFIXES:
+        return {'vx': False, 'kind': 'console', 'text': ' '.join(str(a) for a in args)}
+    rest = args[1:]
+    msg = str(rest[0]) if rest else ''
+    out = {'vx': True, 'prefix': args[0], 'kind': 'log', 'msg': msg, 'data': rest[1:]}
+    if msg.startswith('perf:') and len(rest) >= 2:
+        try:
+            ms = float(str(rest[1]).rstrip('ms'))
+        except ValueError:
+            return out
+        out = {'vx': True, 'prefix': args[0], 'kind': 'perf', 'key': msg[5:], 'ms': ms}
+    return out
+
+
+class ConsoleCollector:
+    """Streams console events of one tab (plus extension workers) to JSONL."""
+
+    def __init__(self, page_session, path=None, address=None, workers=True, keep=2000, trace_perf=True):
+        self._t0 = time.monotonic()
+        self.path = Path(path) if path else None
+        self.address = address
+        self.trace_perf = trace_perf
+        self._lock = threading.Lock()
+        self._recent = collections.deque(maxlen=keep)
+        self._contexts = {}
+        self._sessions = {'page': page_session}
+        self.counts = collections.Counter()
+        self._closed = threading.Event()
+        self._q = queue.Queue()
+        self._writer = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name='console-writer', daemon=True)
+            self._writer.start()
+        self._subscribe(page_session, 'page')
+        self._watcher = None
+        if workers and address:
+            self._attach_workers()
+            self._watcher = threading.Thread(target=self._watch_workers, name='console-workers', daemon=True)
+            self._watcher.start()
+
+    @classmethod
+    def attach(cls, driver, path=None, **kwargs):
+        return cls(attach_page_session(driver), path, address=debugger_address(driver), **kwargs)
+
+    def _subscribe(self, session, target):
+        if target == 'page':
+            session.on('Runtime.executionContextCreated', self._on_context)
+            session.on('Runtime.executionContextsCleared', lambda _p: self._contexts.clear())
+        session.on('Runtime.consoleAPICalled', lambda p: self._on_console(target, p))
+        session.on('Log.entryAdded', lambda p: self._on_log_entry(target, p))
+        session.send('Runtime.enable', {})
+        session.send('Log.enable', {})
+
+    def _attach_workers(self):
+        try:
+            targets = list_targets(self.address)
+        except Exception:
+            return
+        for t in targets:
+            if t.get('type') != 'service_worker' or not str(t.get('url', '')).startswith('chrome-extension://'):
+                continue
+            key = f"worker:{t['id']}"
+            sess = self._sessions.get(key)
+            if sess is not None and not sess.closed:
+                continue
+            try:
+                sess = CDPSession(t['webSocketDebuggerUrl'])
+                self._sessions[key] = sess
+                self._subscribe(sess, 'worker')
+            except Exception as e:
+                print('console: cannot attach to service worker:', e)
+
+    def _watch_workers(self, interval=2.0):
+        # MV3 workers stop when idle and come back as new targets
+        while not self._closed.wait(interval):
+            self._attach_workers()
+
+    def _on_context(self, params):
+        ctx = params.get('context') or {}
+        aux = ctx.get('auxData') or {}
+        world = 'page'
+        if aux.get('type') == 'isolated':
+            world = 'content' if str(ctx.get('origin', '')).startswith('chrome-extension://') else 'isolated'
+        self._contexts[ctx.get('id')] = world
+
+    def _on_console(self, target, params):
+        args = [_arg_value(a) for a in params.get('args') or []]
+        world = 'worker' if target == 'worker' else self._contexts.get(params.get('executionContextId'), 'page')
+        ev = {'source': 'console', 'target': target, 'world': world, 'level': params.get('type'),
+              'cdp_ts': params.get('timestamp')}
+        ev.update(parse_console_args(args))
+        self._emit(ev)
+
+    def _on_log_entry(self, target, params):
+        entry = params.get('entry') or {}
+        ev = {'source': 'log', 'target': target, 'world': target, 'level': entry.get('level'),
+              'cdp_ts': entry.get('timestamp'), 'vx': False, 'kind': entry.get('source') or 'log',
+              'text': entry.get('text'), 'url': entry.get('url')}
+        self._emit(ev)
+
+    def _emit(self, ev):
+        ev = dict({'t': round(time.monotonic() - self._t0, 4), 'ts_us': now_us(), 'wall': round(time.time(), 3)}, **ev)
+        with self._lock:
+            self._recent.append(ev)
+            self.counts[ev['kind']] += 1
+        if ev['kind'] == 'perf' and self.trace_perf:
+            instant(f"perf:{ev['key']}", ms=ev['ms'], world=ev['world'])
+        if self._writer is not None:
+            self._q.put(ev)
+        return ev
+
+    def mark(self, step, **fields):
+        """Record a Python-side step in the stream; returns the event (its "t" marks the step start)."""
+        return self._emit(dict({'source': 'tool', 'target': 'tool', 'world': 'tool', 'vx': False,
+                                'kind': 'step', 'step': step}, **fields))
+
+    def recent(self, vx_only=False):
+        with self._lock:
+            evs = list(self._recent)
+        return [e for e in evs if e.get('vx')] if vx_only else evs
+
+    def perf_marks(self):
+        return [e for e in self.recent() if e.get('kind') == 'perf']
+
+    def _write_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                ev = self._q.get()
+                if ev is None:
+                    return
+                f.write(json.dumps(ev, ensure_ascii=False, separators=(',', ':'), default=str) + '\n')
+                # flush when the queue drains so a crashed run keeps what it saw
+                if self._q.empty():
+                    f.flush()
+
+    def close(self, owns_page_session=True):
+        self._closed.set()
+        for key, sess in list(self._sessions.items()):
+            if key != 'page' or owns_page_session:
+                sess.close()
+        if self._writer is not None:
+            self._q.put(None)
+            self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -2,14 +2,21 @@
 """Diagnostic fallback using plain selenium + chromedriver executable.
 Usage:
   python3 tools/python/diag_plain_selenium.py --chromedriver /path/to/chromedriver --user-data-dir <path>
+  python3 -m tools.python plain-diag --attach 127.0.0.1:9222
 """
 import argparse
 import json
+import sys
 import time
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
+
+if __package__ in (None, ''):
+    # run as a script: make `tools.python` importable
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tools.python.drivers import start_driver
+from tools.python.readiness import navigate
+from tools.python.tracing import span, write_trace, print_summary
 
 ROOT = Path(__file__).resolve().parents[1]
 OUT = ROOT / 'tools'
@@ -87,69 +94,88 @@ JS_COLLECT = r"""
 """
 
 
-def run(chromedriver_path, user_data_dir, url):
+def run(chromedriver_path, user_data_dir, url, attach=None):
+    from selenium.webdriver.common.by import By
+
     ts = now()
-    s = Service(executable_path=chromedriver_path)
-    options = webdriver.ChromeOptions()
-    options.add_argument(f"--user-data-dir={user_data_dir}")
-    options.add_argument('--no-first-run')
-    options.add_argument('--no-default-browser-check')
-    options.add_argument('--window-size=1366,768')
-    driver = webdriver.Chrome(service=s, options=options)
+    with span('start_driver'):
+        driver = start_driver('selenium', args=['--no-first-run', '--no-default-browser-check', '--window-size=1366,768'],
+                              user_data_dir=user_data_dir, chromedriver=chromedriver_path, attach=attach)
     out = {'start_time': ts, 'url': url}
+    screenshot = OUT / f'plain_diag_{ts}.png'
     try:
-        driver.get(url)
-        time.sleep(4)
-        screenshot = OUT / f'plain_diag_{ts}.png'
-        driver.save_screenshot(str(screenshot))
-        out['screenshot'] = str(screenshot)
-        try:
-            iframe = driver.find_element(By.CSS_SELECTOR, 'iframe[src*=captcha-delivery], iframe[src*=datadome]')
-            out['iframe_found'] = True
-            out['iframe_src'] = iframe.get_attribute('src')
-        except Exception:
-            out['iframe_found'] = False
-        try:
-            props = driver.execute_script(JS_COLLECT)
-            out['props'] = props
-        except Exception as e:
-            out['props_error'] = str(e)
-        try:
-            cookies = driver.get_cookies()
-            out['cookies'] = cookies
-            with open(OUT / f'plain_cookies_{ts}.json', 'w') as f:
-                json.dump(cookies, f, indent=2)
-        except Exception as e:
-            out['cookies_error'] = str(e)
-        try:
-            ls = driver.execute_script(
-                'var r={}; '
-                'for(var i=0;i<localStorage.length;i++){'
-                'var k=localStorage.key(i); '
-                'r[k]=localStorage.getItem(k);'
-                '} '
-                'return r;'
-            )
-            out['localStorage'] = ls
-            with open(OUT / f'plain_localStorage_{ts}.json', 'w') as f:
-                json.dump(ls, f, indent=2)
-        except Exception as e:
-            out['localStorage_error'] = str(e)
+        with span('navigate', url=url):
+            out['readiness'] = navigate(driver, url, timeout=15)
+        with span('screenshot'):
+            driver.save_screenshot(str(screenshot))
+            out['screenshot'] = str(screenshot)
+        with span('captcha_iframe'):
+            try:
+                iframe = driver.find_element(By.CSS_SELECTOR, 'iframe[src*=captcha-delivery], iframe[src*=datadome]')
+                out['iframe_found'] = True
+                out['iframe_src'] = iframe.get_attribute('src')
+            except Exception:
+                out['iframe_found'] = False
+        with span('js_props'):
+            try:
+                props = driver.execute_script(JS_COLLECT)
+                out['props'] = props
+            except Exception as e:
+                out['props_error'] = str(e)
+        with span('cookies'):
+            try:
+                cookies = driver.get_cookies()
+                out['cookies'] = cookies
+                with open(OUT / f'plain_cookies_{ts}.json', 'w') as f:
+                    json.dump(cookies, f, indent=2)
+            except Exception as e:
+                out['cookies_error'] = str(e)
+        with span('local_storage'):
+            try:
+                ls = driver.execute_script(
+                    'var r={}; '
+                    'for(var i=0;i<localStorage.length;i++){'
+                    'var k=localStorage.key(i); '
+                    'r[k]=localStorage.getItem(k);'
+                    '} '
+                    'return r;'
+                )
+                out['localStorage'] = ls
+                with open(OUT / f'plain_localStorage_{ts}.json', 'w') as f:
+                    json.dump(ls, f, indent=2)
+            except Exception as e:
+                out['localStorage_error'] = str(e)
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        with span('quit'):
+            try:
+                driver.quit()
+            except Exception:
+                pass
     out['end_time'] = now()
     with open(OUT / f'plain_diag_{ts}.json', 'w') as f:
         json.dump(out, f, indent=2)
     print(json.dumps({'diag': str(OUT / f'plain_diag_{ts}.json'), 'screenshot': str(screenshot)}))
 
 
-if __name__ == '__main__':
+def main(argv=None):
     p = argparse.ArgumentParser()
-    p.add_argument('--chromedriver', required=True)
-    p.add_argument('--user-data-dir', required=True)
+    p.add_argument('--chromedriver', help='chromedriver executable (default: the one on PATH)')
+    p.add_argument('--user-data-dir', help='Chrome profile dir (required unless --attach)')
+    p.add_argument('--attach', metavar='HOST:PORT', help='use the Chrome already listening on this debugging address')
     p.add_argument('--url', default='https://www.vinted.fr/member/signup/select_type?ref_url=%2F')
-    args = p.parse_args()
-    run(args.chromedriver, args.user_data_dir, args.url)
+    p.add_argument('--trace', nargs='?', const='', default=None,
+                   help='write a Chrome trace-event JSON (default: tools/traces/trace_<ts>.json)')
+    args = p.parse_args(argv)
+    if not args.user_data_dir and not args.attach:
+        p.error('--user-data-dir or --attach is required')
+    try:
+        run(args.chromedriver, args.user_data_dir, args.url, attach=args.attach)
+    finally:
+        print_summary()
+        if args.trace is not None:
+            print('trace written to', write_trace(args.trace or None), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
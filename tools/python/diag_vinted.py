@@ -3,48 +3,39 @@
 Diagnostic de débogage pour Vinted/DataDome.
 Usage:
   python3 tools/python/diag_vinted.py --user-data-dir <path> [--url <url>]
+  python3 tools/python/diag_vinted.py --user-data-dir <path> --urls-file urls.txt [--parallel N]
+  python3 -m tools.python diag --attach 127.0.0.1:9222   (Chrome déjà lancé, voir drivers.py)
 
 Ce script ouvre la page (headful), prend des captures d'écran, collecte:
 - navigator.* et autres propriétés JS
 - canvas + webgl fingerprints
-- console logs
+- logs console (diffusés en direct dans tools/traces/console_<run>.jsonl, voir console_collector.py)
 - cookies et localStorage
 - détection d'iframe captcha (geo.captcha-delivery / datadome)
-- sauvegarde le tout dans tools/diag.json et images
+- sauvegarde le tout dans le store d'artefacts (tools/artifacts, voir artifact_store.py)
 
 Conçu pour exécuter avec `undetected_chromedriver`.
 """
 
 import json
-import os
 import sys
 import time
+import queue
+import shutil
 import argparse
+import threading
 from pathlib import Path
 
-try:
-    import undetected_chromedriver as uc
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-except Exception:
-    # Try to add user site-packages (pip --user) to sys.path (common in dev envs)
-    import site, sys
-    user_site = site.getusersitepackages()
-    if user_site and user_site not in sys.path:
-        sys.path.insert(0, user_site)
-    try:
-        import undetected_chromedriver as uc
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-    except Exception:
-        print("Missing dependencies: please run: python3 -m pip install --user undetected-chromedriver selenium")
-        raise
-
-ROOT = Path(__file__).resolve().parents[1]
-OUT = ROOT / 'tools'
-OUT.mkdir(parents=True, exist_ok=True)
+if __package__ in (None, ''):
+    # run as a script: make `tools.python` importable
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tools.python.artifact_store import ArtifactStore
+from tools.python.console_collector import ConsoleCollector
+from tools.python.drivers import env_chromedriver
+from tools.python.drivers import start_driver as _start_driver
+from tools.python.readiness import PageWaiter
+from tools.python.tracing import TRACE_DIR, span, traced, write_trace, print_summary
 
 def now():
     return time.strftime('%Y%m%d_%H%M%S')
@@ -109,40 +100,82 @@ JS_COLLECT = r"""
 """
 
 
-def run_diagnostic(user_data_dir, url):
-    opts = uc.ChromeOptions()
-    opts.add_argument("--no-first-run")
-    opts.add_argument("--no-default-browser-check")
-    opts.add_argument("--window-size=1366,768")
-    opts.add_argument(f"--user-data-dir={user_data_dir}")
+@traced('start_driver')
+def start_driver(user_data_dir, attach=None):
+    """undetected_chromedriver on user_data_dir, or a driver on the Chrome listening on attach (host:port)."""
     # avoid very intrusive flags
+    args = ['--no-first-run', '--no-default-browser-check', '--window-size=1366,768']
+    return _start_driver('uc', args=args, user_data_dir=user_data_dir, attach=attach,
+                         # allow overriding the chromedriver executable with an env var (set by our downloader)
+                         chromedriver=env_chromedriver(), page_load_timeout=60)
+
+
+class ArtifactWriter:
+    """Background thread that stores artifacts so collection never waits on disk."""
+
+    def __init__(self, store=None, maxsize=64):
+        self.store = store or ArtifactStore()
+        self._q = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name='diag-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, run_id, step, files, url=None):
+        self._q.put((run_id, step, files, url))
 
-    # Allow overriding the chromedriver executable with an env var (set by our downloader)
-    driver_path = os.environ.get('UC_CHROMEDRIVER_EXECUTABLE_PATH') or os.environ.get('CHROMEDRIVER_PATH')
-    if driver_path:
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
         try:
-            driver = uc.Chrome(options=opts, driver_executable_path=driver_path)
-        except TypeError:
-            # fallback name used by some uc versions
-            driver = uc.Chrome(options=opts, executable_path=driver_path)
-    else:
-        driver = uc.Chrome(options=opts)
-    driver.set_page_load_timeout(60)
-    out = {}
-    ts = now()
+            self.store.evict()
+        except Exception as e:
+            print('Artifact eviction failed:', e)
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            if job is None:
+                return
+            run_id, step, files, url = job
+            try:
+                with span('store_artifacts', step=step):
+                    self.store.save(run_id, step, files, url=url)
+            except Exception as e:
+                print('Failed to store artifacts for', run_id, step, e)
+
+
+def attach_console(driver, run_id, worker=None):
+    """Stream console/[VX] events to tools/traces/console_<run>[_w<n>].jsonl; None if CDP is unavailable."""
+    name = f'console_{run_id}' + (f'_w{worker}' if worker is not None else '') + '.jsonl'
     try:
-        out['start_url'] = url
-        out['start_time'] = ts
-        driver.get(url)
-        # wait a bit for dynamic scripts
-        time.sleep(4)
-
-        # screenshot
-        sfn = OUT / f'diag_full_{ts}.png'
-        driver.save_screenshot(str(sfn))
-        out['screenshot'] = str(sfn)
-
-        # try to find DataDome/captcha iframe
+        return ConsoleCollector.attach(driver, TRACE_DIR / name)
+    except Exception as e:
+        print('Live console collection unavailable, falling back to get_log:', e)
+        return None
+
+
+def collect(driver, url, writer, run_id, step='diag', ready_timeout=10, waiter=None, console=None):
+    """Load url in driver, collect diagnostics and queue artifacts on writer."""
+    from selenium.webdriver.common.by import By
+
+    out = {'start_url': url, 'start_time': now()}
+    files = {}
+    if console is not None:
+        started = console.mark('collect', url=url, step=step)
+    waiter = waiter or PageWaiter(driver, network_idle=False)
+    # wait for the page to settle (readyState + network idle) instead of a fixed delay
+    with span('navigate', url=url):
+        out['readiness'] = waiter.get(url, timeout=ready_timeout)
+
+    # screenshot
+    with span('screenshot'):
+        try:
+            files['screenshot.png'] = driver.get_screenshot_as_png()
+            out['screenshot'] = 'screenshot.png'
+        except Exception as e:
+            out['screenshot_error'] = str(e)
+
+    # try to find DataDome/captcha iframe
+    with span('captcha_iframe'):
         try:
             iframe = driver.find_element(By.CSS_SELECTOR, 'iframe[src*=captcha-delivery], iframe[src*=datadome]')
             out['iframe_found'] = True
@@ -151,74 +184,221 @@ def run_diagnostic(user_data_dir, url):
         except Exception:
             out['iframe_found'] = False
 
-        # collect JS properties
+    # collect JS properties
+    with span('js_props'):
         try:
             props = driver.execute_script(JS_COLLECT)
             out['props'] = props
         except Exception as e:
             out['props_error'] = str(e)
 
-        # console logs
+    # console logs
+    with span('console_logs'):
         try:
             logs = []
-            try:
-                bl = driver.get_log('browser')
-                logs = bl
-            except Exception:
-                # fallback to performance logs
+            if console is not None:
+                # streamed live to console_log_file; diag.json keeps this step's [VX] events and errors
+                out['console_log_file'] = str(console.path)
+                out['console_counts'] = dict(console.counts)
+                logs = [e for e in console.recent() if e['t'] >= started['t']
+                        and (e.get('vx') or e.get('level') in ('error', 'warning'))]
+            else:
                 try:
-                    pl = driver.get_log('performance')
-                    logs = pl[:200]
+                    logs = driver.get_log('browser')
                 except Exception:
-                    logs = ['no logs available']
+                    # fallback to performance logs
+                    try:
+                        pl = driver.get_log('performance')
+                        logs = pl[:200]
+                    except Exception:
+                        logs = ['no logs available']
             out['console_logs'] = logs
         except Exception as e:
             out['console_logs_error'] = str(e)
 
-        # cookies
+    # cookies
+    with span('cookies'):
         try:
             cookies = driver.get_cookies()
             out['cookies'] = cookies
             # save chrome-compatible cookies separately
-            with open(OUT / 'cookies_current.json', 'w') as f:
-                json.dump(cookies, f, indent=2)
+            files['cookies.json'] = cookies
         except Exception as e:
             out['cookies_error'] = str(e)
 
-        # localStorage
+    # localStorage
+    with span('local_storage'):
         try:
             ls = driver.execute_script('var r={}; for(var i=0;i<localStorage.length;i++){var k=localStorage.key(i); r[k]=localStorage.getItem(k);} return r;')
             out['localStorage'] = ls
-            with open(OUT / 'localStorage_current.json', 'w') as f:
-                json.dump(ls, f, indent=2)
+            files['localStorage.json'] = ls
         except Exception as e:
             out['localStorage_error'] = str(e)
 
-        # page source
+    # page source
+    with span('page_source'):
         try:
-            out['page_source_snippet'] = driver.page_source[:2000]
+            html = driver.page_source
+            out['page_source_snippet'] = html[:2000]
             # Save full HTML
-            with open(OUT / f'page_{ts}.html','w', encoding='utf-8') as f:
-                f.write(driver.page_source)
+            files['page.html'] = html
         except Exception as e:
             out['page_source_error'] = str(e)
 
+    out['end_time'] = now()
+    files['diag.json'] = out
+    writer.submit(run_id, step, files, url=url)
+    return {'url': url, 'run': run_id, 'step': step, 'ready_wait_s': out['readiness']['waited_s']}
+
+
+def run_diagnostic(user_data_dir, url, attach=None):
+    run_id = f'diag_{now()}'
+    writer = ArtifactWriter()
+    driver = start_driver(user_data_dir, attach)
+    waiter = PageWaiter(driver)
+    console = attach_console(driver, run_id)
+    try:
+        with span('collect', url=url):
+            res = collect(driver, url, writer, run_id, waiter=waiter, console=console)
     finally:
+        waiter.close()
+        if console is not None:
+            console.close()
+        with span('quit'):
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        with span('flush_artifacts'):
+            writer.close()
+    print(json.dumps({'run': res['run'], 'store': str(writer.store.root)}, ensure_ascii=False))
+
+
+def read_urls_file(path):
+    """One URL per line; blank lines and '#' comments are skipped. Local paths become file:// URLs."""
+    urls = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if '://' not in line:
+            line = Path(line).resolve().as_uri()
+        urls.append(line)
+    return urls
+
+
+def clone_profile(user_data_dir, n):
+    """Copy the profile to '<user_data_dir>-<n>' (cookies, DataDome state...), minus Chrome's lock files."""
+    dest = f'{user_data_dir}-{n}'
+    if not Path(user_data_dir).is_dir():
+        print(f'sweep: profile {user_data_dir} does not exist, worker {n} starts from an empty profile '
+              '(diagnostics not comparable with worker 0)', file=sys.stderr)
+        return dest
+    shutil.copytree(user_data_dir, dest, dirs_exist_ok=True, ignore=shutil.ignore_patterns('Singleton*'))
+    return dest
+
+
+def run_sweep(user_data_dir, urls, parallel=1, ready_timeout=10, attach=None):
+    """Diagnose many URLs reusing one browser per worker (N workers in parallel).
+
+    Chrome locks its profile, so worker i > 0 runs on a copy of it in
+    '<user_data_dir>-<i>', refreshed before any browser starts so every worker
+    has the same cookies. An attached Chrome has a single tab to drive, so
+    attach means one worker.
+    """
+    if attach and parallel > 1:
+        print('sweep: --attach drives one browser, running with --parallel 1', file=sys.stderr)
+        parallel = 1
+    count = max(1, min(parallel, len(urls)))
+    # copied while no browser holds the profile open
+    profiles = [user_data_dir] + [clone_profile(user_data_dir, n) for n in range(1, count)]
+    run_id = f'sweep_{now()}'
+    writer = ArtifactWriter()
+    jobs = queue.Queue()
+    for i, url in enumerate(urls):
+        jobs.put((i, url))
+    results = [None] * len(urls)
+
+    def worker(n):
         try:
-            driver.quit()
-        except Exception:
-            pass
+            driver = start_driver(profiles[n], attach)
+        except Exception as e:
+            print(f'worker {n}: driver start failed:', e)
+            return
+        waiter = PageWaiter(driver)
+        console = attach_console(driver, run_id, worker=n)
+        try:
+            while True:
+                try:
+                    i, url = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    with span('collect', url=url):
+                        results[i] = collect(driver, url, writer, run_id, step=f'url_{i:03d}', ready_timeout=ready_timeout,
+                                             waiter=waiter, console=console)
+                except Exception as e:
+                    results[i] = {'url': url, 'error': str(e)}
+                print(json.dumps(results[i], ensure_ascii=False))
+        finally:
+            waiter.close()
+            if console is not None:
+                console.close()
+            with span('quit'):
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
 
-    out['end_time'] = now()
-    # write diag
-    with open(OUT / f'diag_{ts}.json','w', encoding='utf-8') as f:
-        json.dump(out, f, indent=2, ensure_ascii=False)
-    print(json.dumps({'diag_file': str(OUT / f'diag_{ts}.json'),'screenshot': str(sfn)}, ensure_ascii=False))
+    workers = [threading.Thread(target=worker, args=(n,), name=f'diag-sweep-{n}') for n in range(count)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    summary = [r if r is not None else {'url': urls[i], 'error': 'not processed'} for i, r in enumerate(results)]
+    writer.submit(run_id, 'summary', {'sweep.json': summary})
+    with span('flush_artifacts'):
+        writer.close()
+    print(json.dumps({'run': run_id, 'store': str(writer.store.root), 'urls': len(urls)}, ensure_ascii=False))
+
+
+def build_parser(sweep=False):
+    p = argparse.ArgumentParser(description='Diagnose many URLs (one browser per worker)' if sweep else None)
+    p.add_argument('--user-data-dir', help='Chrome profile dir (required unless --attach)')
+    p.add_argument('--attach', metavar='HOST:PORT', help='use the Chrome already listening on this debugging address')
+    if sweep:
+        p.add_argument('urls_file', help='file with one URL or local HTML path per line')
+    else:
+        p.add_argument('--url', default='https://www.vinted.fr/member/signup/select_type?ref_url=%2F')
+        p.add_argument('--urls-file', help='sweep mode: file with one URL or local HTML path per line')
+    p.add_argument('--parallel', type=int, default=1, help='sweep mode: number of browsers running in parallel')
+    p.add_argument('--ready-timeout', type=float, default=10, help='max seconds to wait for page readiness')
+    p.add_argument('--trace', nargs='?', const='', default=None,
+                   help='write a Chrome trace-event JSON (default: tools/traces/trace_<ts>.json)')
+    return p
+
+
+def main(argv=None, sweep=False):
+    p = build_parser(sweep)
+    args = p.parse_args(argv)
+    if not args.user_data_dir and not args.attach:
+        p.error('--user-data-dir or --attach is required')
+    try:
+        if args.urls_file:
+            run_sweep(args.user_data_dir, read_urls_file(args.urls_file), args.parallel, args.ready_timeout,
+                      attach=args.attach)
+        else:
+            run_diagnostic(args.user_data_dir, args.url, attach=args.attach)
+    finally:
+        print_summary()
+        if args.trace is not None:
+            print('trace written to', write_trace(args.trace or None), file=sys.stderr)
+    return 0
+
+
+def sweep_main(argv=None):
+    return main(argv, sweep=True)
 
 
 if __name__ == '__main__':
-    p = argparse.ArgumentParser()
-    p.add_argument('--user-data-dir', required=True)
-    p.add_argument('--url', default='https://www.vinted.fr/member/signup/select_type?ref_url=%2F')
-    args = p.parse_args()
-    run_diagnostic(args.user_data_dir, args.url)
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Driver factory shared by the tools: fresh launch or attach to a running Chrome.
+
+selenium and undetected_chromedriver are only imported when a driver is
+actually created, so scripts (and ``python -m tools.python ... --help``)
+that never open a browser do not pay for them.
+
+Launching Chrome costs seconds per run. Start it once with remote debugging
+and attach every later run to it:
+
+    python -m tools.python chrome --port 9222 --user-data-dir /abs/profile
+    python -m tools.python diag --attach 127.0.0.1:9222
+
+An attached driver drives the browser's current tab; driver.quit() only
+ends the chromedriver session and leaves that Chrome running.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+import urllib.request
+
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+
+def _import_uc():
+    try:
+        import undetected_chromedriver as uc
+    except Exception:
+        # Try to add user site-packages (pip --user) to sys.path (common in dev envs)
+        import site
+        user_site = site.getusersitepackages()
+        if user_site and user_site not in sys.path:
+            sys.path.insert(0, user_site)
+        try:
+            import undetected_chromedriver as uc
+        except Exception:
+            print("Missing dependencies: please run: python3 -m pip install --user undetected-chromedriver selenium")
+            raise
+    return uc
+
+
+def env_chromedriver():
+    """chromedriver path set by our downloader, if any."""
+    return os.environ.get('UC_CHROMEDRIVER_EXECUTABLE_PATH') or os.environ.get('CHROMEDRIVER_PATH')
+
+
+def chrome_options(kind='selenium', args=(), user_data_dir=None, headless=False):
+    if kind == 'uc':
+        opts = _import_uc().ChromeOptions()
+    else:
+        from selenium import webdriver
+        opts = webdriver.ChromeOptions()
+    if headless:
+        # the new headless mode is the one that runs extensions
+        opts.add_argument('--headless=new')
+    if user_data_dir:
+        opts.add_argument(f'--user-data-dir={user_data_dir}')
+    for arg in args:
+        opts.add_argument(arg)
+    return opts
+
+
+def attach_driver(address, chromedriver=None):
+    """Selenium driver on a Chrome already listening on address (host:port)."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    opts = webdriver.ChromeOptions()
+    opts.debugger_address = address
+    if chromedriver:
+        return webdriver.Chrome(service=Service(chromedriver), options=opts)
+    return webdriver.Chrome(options=opts)
+
+
+def start_driver(kind='uc', options=None, args=(), user_data_dir=None, chromedriver=None, attach=None,
+                 headless=False, page_load_timeout=None):
+    """Attach to attach (host:port) when given, else launch Chrome.
+
+    kind is 'uc' (undetected_chromedriver) or 'selenium'; options, when given,
+    replace the ones built from args/user_data_dir/headless.
+    """
+    if attach:
+        driver = attach_driver(attach, chromedriver)
+    else:
+        opts = options if options is not None else chrome_options(kind, args, user_data_dir, headless)
+        if kind == 'uc':
+            uc = _import_uc()
+            if chromedriver:
+                try:
+                    driver = uc.Chrome(options=opts, driver_executable_path=chromedriver)
+                except TypeError:
+                    # fallback name used by some uc versions
+                    driver = uc.Chrome(options=opts, executable_path=chromedriver)
+            else:
+                driver = uc.Chrome(options=opts)
+        else:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            if chromedriver:
+                driver = webdriver.Chrome(service=Service(chromedriver), options=opts)
+            else:
+                driver = webdriver.Chrome(options=opts)
+    if page_load_timeout:
+        driver.set_page_load_timeout(page_load_timeout)
+    return driver
+
+
+def find_chrome():
+    path = os.environ.get('CHROME_PATH')
+    if path:
+        return path
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def wait_for_debugger(address, timeout=15):
+    """True once Chrome answers /json/version on address."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://{address}/json/version', timeout=1):
+                return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+def launch_chrome(port=9222, user_data_dir=None, args=(), binary=None, headless=False):
+    """Start a Chrome that later runs attach to; returns (process, 'host:port')."""
+    binary = binary or find_chrome()
+    if not binary:
+        raise RuntimeError('Chrome not found; set CHROME_PATH')
+    cmd = [binary, f'--remote-debugging-port={port}', '--no-first-run', '--no-default-browser-check',
+           '--window-size=1366,768']
+    if user_data_dir:
+        cmd.append(f'--user-data-dir={user_data_dir}')
+    if headless:
+        cmd.append('--headless=new')
+    cmd.extend(args)
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    address = f'127.0.0.1:{port}'
+    if not wait_for_debugger(address):
+        proc.terminate()
+        raise RuntimeError(f'Chrome did not open its debugging port {port}')
+    return proc, address
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Start a Chrome with remote debugging for later runs to attach to')
+    p.add_argument('--port', type=int, default=9222)
+    p.add_argument('--user-data-dir', required=True, help='Chrome profile dir (Chrome needs one for remote debugging)')
+    p.add_argument('--chrome', help='Chrome binary (default: $CHROME_PATH or the first one on PATH)')
+    p.add_argument('--headless', action='store_true')
+    p.add_argument('chrome_args', nargs='*', help='extra Chrome flags (after --)')
+    args = p.parse_args(argv)
+
+    proc, address = launch_chrome(args.port, args.user_data_dir, args.chrome_args, args.chrome, args.headless)
+    print(f'Chrome listening on {address}; attach with --attach {address}. Ctrl-C to stop.')
+    try:
+        proc.wait()
+    except KeyboardInterrupt:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Minimize captured pages into small test fixtures.
+
+Keeps, for every selector of the extension (scanned from src/lib and
+src/content, as selector_report.py does, or given with --selectors), each
+matching element with its whole subtree and its ancestors; everything else
+is dropped: tracking markup, unrelated sections. <script>, <noscript>,
+<iframe> and <link rel=preload> go even inside kept subtrees, unless a
+selector matches them directly (JSON-LD scripts also stay when the
+.expected.json check needs them). On the kept
+elements, event handler attributes are dropped, class lists are deduped and
+inline styles keep only the properties the code reads through
+getComputedStyle / element.style (display, visibility, opacity,
+pointer-events, background-image). <style> blocks keep only the rules that
+still match something, with the same properties; @-rules are dropped.
+
+The result is checked against the original: every selector must match the
+same number of elements with the same text, otherwise the kept region is
+widened to the parents of its matches and the check runs again. A page with
+a <name>.expected.json next to it must also give the same draft with
+offline_extractor.
+
+Usage:
+  python3 -m tools.python.fixture_minimizer <page.html|dir|glob>... [-o out_dir] [--selectors sels.txt] [--json report.json]
+
+Writes <name>.min.html (next to the page, or in out_dir) and prints the size,
+element count and parse time (lxml, plus jsdom when node and node_modules
+are there) before and after.
+"""
+import argparse
+import json
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from .offline_extractor import extract_draft, iter_inputs
+from .selector_report import REPO_ROOT, _compile, scan_selectors
+
+COMPUTED_PROPS = ('display', 'visibility', 'opacity', 'pointer-events', 'background-image')
+# never needed by the selectors' matches, even inside a kept subtree
+INERT_TAGS = ('script', 'noscript', 'iframe')
+MAX_WIDEN_ROUNDS = 4
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+
+
+def load_selectors(path=None, sources=None):
+    """Selectors from a file (one per line, '#' comments) or scanned from the TS sources."""
+    if path:
+        lines = Path(path).read_text(encoding='utf-8').splitlines()
+        sels = [ln.strip() for ln in lines if ln.strip() and not ln.lstrip().startswith('#')]
+    else:
+        kwargs = {'sources': sources} if sources else {}
+        sels = [e['selector'] for e in scan_selectors(**kwargs)]
+    return [s for s in dict.fromkeys(sels) if _compile(s) is not None]
+
+
+def _parse(html):
+    import lxml.html
+
+    return lxml.html.document_fromstring(html)
+
+
+def _read(path):
+    data = Path(path).read_bytes()
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data
+
+
+def _filter_decls(decls):
+    keep = []
+    for decl in decls.split(';'):
+        name, sep, value = decl.partition(':')
+        if sep and name.strip().lower() in COMPUTED_PROPS:
+            keep.append(f'{name.strip().lower()}: {value.strip()}')
+    return '; '.join(keep)
+
+
+def _split_rules(css):
+    """Top-level (selector, body) pairs; @-rules come back with their prelude as selector."""
+    css = CSS_COMMENT_RE.sub('', css)
+    rules, i, n = [], 0, len(css)
+    while i < n:
+        j = css.find('{', i)
+        if j < 0:
+            break
+        prelude = css[i:j].strip()
+        depth, k = 1, j + 1
+        while k < n and depth:
+            depth += {'{': 1, '}': -1}.get(css[k], 0)
+            k += 1
+        rules.append((prelude, css[j + 1:k - 1]))
+        i = k
+    return rules
+
+
+def minimize_css(css, doc):
+    """Rules of css whose selector still matches in doc, reduced to COMPUTED_PROPS."""
+    from lxml.cssselect import CSSSelector
+
+    out = []
+    for prelude, body in _split_rules(css):
+        if prelude.startswith('@'):
+            continue
+        decls = _filter_decls(body)
+        if not decls:
+            continue
+        alive = []
+        for sel in prelude.split(','):
+            sel = sel.strip()
+            try:
+                if CSSSelector(sel, translator='html')(doc):
+                    alive.append(sel)
+            except Exception:
+                # pseudo-classes cssselect cannot evaluate: keep, jsdom may
+                alive.append(sel)
+        if alive:
+            out.append(f"{', '.join(alive)} {{ {decls} }}")
+    return '\n'.join(out)
+
+
+def selector_fingerprint(doc, selectors):
+    """{selector: (count, texts of the first matches)} used to compare two versions of a page."""
+    out = {}
+    for sel in selectors:
+        matches = _compile(sel)(doc)
+        out[sel] = (len(matches), tuple(' '.join(m.text_content().split())[:200] for m in matches[:20]))
+    return out
+
+
+def _keep_indices(doc, selectors, widen):
+    """Element indices (document order) to keep; widen maps a selector to how many parents up to go."""
+    index = {el: i for i, el in enumerate(doc.iter())}
+    keep, subtree = set(), set()
+    for sel in selectors:
+        for el in _compile(sel)(doc):
+            for _ in range(widen.get(sel, 0)):
+                if el.getparent() is not None:
+                    el = el.getparent()
+            subtree.add(index[el])
+    for el in doc.iter():
+        if index[el] in subtree:
+            keep.update(index[d] for d in el.iter())
+            for anc in el.iterancestors():
+                keep.add(index[anc])
+    for el in (doc, doc.find('head'), doc.find('body')):
+        if el is not None:
+            keep.add(index[el])
+    # charset and title keep the page readable; <style> is filtered afterwards
+    for el in doc.iter('meta', 'title', 'style'):
+        if el.tag != 'meta' or el.get('charset'):
+            keep.add(index[el])
+    return keep, subtree
+
+
+def _clean_element(el):
+    for name in list(el.attrib):
+        if name.lower().startswith('on'):
+            del el.attrib[name]
+    cls = el.get('class')
+    if cls is not None:
+        tokens = list(dict.fromkeys(cls.split()))
+        if tokens:
+            el.set('class', ' '.join(tokens))
+        else:
+            del el.attrib['class']
+    style = el.get('style')
+    if style is not None:
+        decls = _filter_decls(style)
+        if decls:
+            el.set('style', decls)
+        else:
+            del el.attrib['style']
+
+
+def _remove(node):
+    """Remove node (element or comment) and its subtree, keeping its tail text in place."""
+    parent = node.getparent()
+    if node.tail:
+        prev = node.getprevious()
+        if prev is not None:
+            prev.tail = (prev.tail or '') + node.tail
+        else:
+            parent.text = (parent.text or '') + node.tail
+    parent.remove(node)
+
+
+def _is_inert(el, keep_json_ld=False):
+    if el.tag == 'link':
+        return 'preload' in (el.get('rel') or '').lower().split()
+    if el.tag == 'script' and keep_json_ld:
+        return (el.get('type') or '').strip().lower() != 'application/ld+json'
+    return el.tag in INERT_TAGS
+
+
+def minimize_html(html, selectors, widen=None, keep_json_ld=False):
+    """Return the minimized HTML of one page for selectors."""
+    import lxml.html
+
+    doc = _parse(html)
+    keep, subtree = _keep_indices(doc, selectors, widen or {})
+    elements = list(doc.iter())
+    inside = set()
+    for i in subtree:
+        inside.update(elements[i].iter())
+    targeted = {el for sel in selectors for el in _compile(sel)(doc)}
+    for i, el in reversed(list(enumerate(elements))):
+        if el.getparent() is None:
+            continue
+        if i not in keep or (_is_inert(el, keep_json_ld) and el not in targeted):
+            _remove(el)
+    for c in doc.xpath('//comment()'):
+        _remove(c)
+    for el in doc.iter():
+        _clean_element(el)
+        if el not in inside:
+            # whitespace between kept containers only
+            if el.text is not None and not el.text.strip():
+                el.text = '\n'
+            if el.tail is not None and not el.tail.strip():
+                el.tail = '\n'
+    for style in list(doc.iter('style')):
+        css = minimize_css(style.text or '', doc)
+        if css:
+            style.text = '\n' + css + '\n'
+        else:
+            _remove(style)
+    return '<!doctype html>\n' + lxml.html.tostring(doc, encoding='unicode') + '\n'
+
+
+def minimize_page(html, selectors, expected=None):
+    """Minimize html, widening until every selector (and the extraction, if expected) is unchanged."""
+    reference = selector_fingerprint(_parse(html), selectors)
+    widen = {}
+    for round_ in range(MAX_WIDEN_ROUNDS + 1):
+        out = minimize_html(html, selectors, widen)
+        got = selector_fingerprint(_parse(out), selectors)
+        broken = [s for s in selectors if got[s] != reference[s]]
+        draft_ok = expected is None or _same_draft(out, expected)
+        if not draft_ok:
+            # the extraction may read JSON-LD: keep those scripts and compare again
+            with_ld = minimize_html(html, selectors, widen, keep_json_ld=True)
+            if _same_draft(with_ld, expected):
+                out, draft_ok = with_ld, True
+                got = selector_fingerprint(_parse(out), selectors)
+                broken = [s for s in selectors if got[s] != reference[s]]
+        if not broken and draft_ok:
+            return out, {'widened': widen, 'broken': [], 'extractor_ok': None if expected is None else True}
+        if round_ == MAX_WIDEN_ROUNDS:
+            break
+        for s in broken or selectors:
+            widen[s] = widen.get(s, 0) + 1
+    return out, {'widened': widen, 'broken': broken, 'extractor_ok': None if expected is None else draft_ok}
+
+
+def _same_draft(html, expected):
+    try:
+        return extract_draft(html) == expected
+    except Exception:
+        return False
+
+
+def lxml_parse_ms(html, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _parse(html)
+        times.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(times), 3)
+
+
+JSDOM_SCRIPT = r"""
+const { JSDOM } = require('jsdom');
+const fs = require('fs');
+const [repeat, ...files] = process.argv.slice(1);
+const out = {};
+for (const f of files) {
+  const html = fs.readFileSync(f, 'utf8');
+  const times = [];
+  for (let i = 0; i < Number(repeat); i++) {
+    const t0 = performance.now();
+    new JSDOM(html).window.close();
+    times.push(performance.now() - t0);
+  }
+  times.sort((a, b) => a - b);
+  out[f] = Math.round(times[times.length >> 1] * 1000) / 1000;
+}
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def jsdom_parse_ms(paths, repeat=5):
+    """{path: median jsdom parse ms}, or None without node / node_modules/jsdom."""
+    node = shutil.which('node')
+    if not node or not (REPO_ROOT / 'node_modules' / 'jsdom').is_dir() or not paths:
+        return None
+    try:
+        res = subprocess.run([node, '--input-type=commonjs', '-e', JSDOM_SCRIPT, str(repeat)] + [str(p) for p in paths],
+                             cwd=REPO_ROOT, capture_output=True, text=True, timeout=300)
+        return json.loads(res.stdout) if res.returncode == 0 else None
+    except Exception:
+        return None
+
+
+def out_path(src, out_dir=None):
+    src = Path(src)
+    return (Path(out_dir) if out_dir else src.parent) / f'{src.stem}.min.html'
+
+
+def minimize_file(path, selectors, out_dir=None):
+    path = Path(path)
+    html = _read(path)
+    expected_path = path.with_name(path.stem + '.expected.json')
+    expected = json.loads(expected_path.read_text(encoding='utf-8')) if expected_path.exists() else None
+    out, check = minimize_page(html, selectors, expected)
+    dest = out_path(path, out_dir)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_text(out, encoding='utf-8')
+    before, after = _parse(html), _parse(out)
+    return dict({
+        'source': str(path),
+        'output': str(dest),
+        'bytes': [len(html.encode('utf-8') if isinstance(html, str) else html), len(out.encode('utf-8'))],
+        'elements': [sum(1 for _ in before.iter()), sum(1 for _ in after.iter())],
+        'lxml_parse_ms': [lxml_parse_ms(html), lxml_parse_ms(out)],
+    }, **check)
+
+
+def format_report(rows):
+    lines = [f"{'kB':>14}  {'elements':>13}  {'lxml ms':>15}  {'jsdom ms':>15}  page"]
+    for r in rows:
+        b, e, p = r['bytes'], r['elements'], r['lxml_parse_ms']
+        j = r.get('jsdom_parse_ms')
+        js = f'{j[0]:>7.2f}>{j[1]:<7.2f}' if j else f"{'-':>15}"
+        flag = ''
+        if r['broken']:
+            flag += f"  CHANGED: {' | '.join(r['broken'][:3])}"
+        if r['extractor_ok'] is False:
+            flag += '  EXTRACTION DIFFERS'
+        lines.append(f"{b[0] / 1024:>6.1f}>{b[1] / 1024:<7.1f}  {e[0]:>6}>{e[1]:<6}  {p[0]:>7.2f}>{p[1]:<7.2f}  {js}  "
+                     f"{Path(r['output']).name}{flag}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Minimize captured pages into small test fixtures')
+    p.add_argument('inputs', nargs='+', help='HTML files, directories (recursive) or globs')
+    p.add_argument('-o', '--out-dir', help='write the .min.html files here (default: next to each page)')
+    p.add_argument('--selectors', help='file with one selector per line (default: scanned from the TS sources)')
+    p.add_argument('--sources', nargs='*', help='TS sources to scan for selectors (selector_report defaults)')
+    p.add_argument('--json', help='write the report as JSON')
+    args = p.parse_args(argv)
+
+    selectors = load_selectors(args.selectors, args.sources)
+    paths = [f for f in iter_inputs(args.inputs) if not f.name.endswith('.min.html')]
+    rows = []
+    for path in paths:
+        try:
+            rows.append(minimize_file(path, selectors, args.out_dir))
+        except Exception as e:
+            print(f'{path}: {e}', file=sys.stderr)
+    timings = jsdom_parse_ms([q for r in rows for q in (r['source'], r['output'])])
+    if timings:
+        for r in rows:
+            r['jsdom_parse_ms'] = [timings.get(r['source']), timings.get(r['output'])]
+    print(format_report(rows))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'selectors': len(selectors), 'pages': rows}, f, ensure_ascii=False, indent=2)
+    return 1 if any(r['broken'] or r['extractor_ok'] is False for r in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""HAR export and per-host summary from live CDP Network events.
+
+    har = HarRecorder('run.har')
+    har.add_session(page_session, 'page')
+    har.watch_workers(address)        # extension service workers, re-attached on restart
+    ...
+    har.close()                       # writes run.har and run.har.summary.json
+
+Only requests in flight are kept in memory. Each finished request becomes a
+HAR 1.2 entry that is appended to a spool file and folded into the per-host
+summary right away. close() then streams the spool into the .har file. Entry
+timings come from the CDP ResourceTiming of the response: blocked, dns,
+connect (ssl included), send, wait (TTFB) and receive. Entries also carry
+"_target" (page or worker) and "_resourceType".
+
+The summary gives, per host: requests, failures, bytes, mean/p95/max time,
+mean TTFB, the peak and mean concurrency and a compact concurrency timeline
+([seconds since the first request, in flight] at every change), plus the
+slowest requests overall.
+
+Usage:
+  python3 -m tools.python.har_export --debugger-address 127.0.0.1:9222 -o run.har [--duration 60]
+  python3 -m tools.python.har_export --summarize run.har
+"""
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .cdp_utils import CDPSession, extension_worker_targets, list_targets
+
+TOP_SLOWEST = 15
+
+
+def _iso(wall):
+    return datetime.fromtimestamp(wall, tz=timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def _headers(h):
+    return [{'name': k, 'value': str(v)} for k, v in (h or {}).items()]
+
+
+def har_timings(timing, started, headers_at, finished):
+    """HAR timings (ms) from a CDP ResourceTiming; started/headers_at/finished are event timestamps (s)."""
+    if not timing:
+        wait = max(0.0, (headers_at - started) * 1000) if headers_at else 0.0
+        receive = max(0.0, (finished - (headers_at or started)) * 1000)
+        return {'blocked': -1, 'dns': -1, 'connect': -1, 'ssl': -1, 'send': 0, 'wait': round(wait, 3),
+                'receive': round(receive, 3)}
+
+    def span(a, b):
+        s, e = timing.get(a, -1), timing.get(b, -1)
+        return round(e - s, 3) if s is not None and s >= 0 and e is not None and e >= 0 else -1
+
+    firsts = [timing.get(k, -1) for k in ('dnsStart', 'connectStart', 'sendStart')]
+    first = next((v for v in firsts if v is not None and v >= 0), 0)
+    send_end = max(timing.get('sendEnd', 0), 0)
+    headers_end = max(timing.get('receiveHeadersEnd', 0), send_end)
+    total = (finished - timing['requestTime']) * 1000
+    return {
+        # the request's own start time (requestWillBeSent) comes before requestTime when it was queued
+        'blocked': round(max(0.0, first + (timing['requestTime'] - started) * 1000), 3),
+        'dns': span('dnsStart', 'dnsEnd'),
+        'connect': span('connectStart', 'connectEnd'),
+        'ssl': span('sslStart', 'sslEnd'),
+        'send': round(max(0.0, send_end - max(timing.get('sendStart', 0), 0)), 3),
+        'wait': round(max(0.0, headers_end - send_end), 3),
+        'receive': round(max(0.0, total - headers_end), 3),
+    }
+
+
+def _total(timings):
+    # ssl is already part of connect
+    return round(sum(v for k, v in timings.items() if k != 'ssl' and v > 0), 3)
+
+
+class HostStats:
+    """Running per-host aggregates; intervals are kept for the concurrency timeline."""
+
+    def __init__(self):
+        self.hosts = {}
+        self.slowest = []  # min-heap of (time, url, host)
+        self.t0 = None
+
+    def add(self, host, started, finished, time_ms, wait_ms, size, failed, url):
+        h = self.hosts.get(host)
+        if h is None:
+            h = self.hosts[host] = {'requests': 0, 'failed': 0, 'bytes': 0, 'times': [], 'waits': [], 'intervals': []}
+        h['requests'] += 1
+        h['failed'] += 1 if failed else 0
+        h['bytes'] += max(0, size or 0)
+        h['times'].append(time_ms)
+        if wait_ms is not None and wait_ms >= 0:
+            h['waits'].append(wait_ms)
+        h['intervals'].append((started, finished))
+        self.t0 = started if self.t0 is None else min(self.t0, started)
+        item = (time_ms, url, host)
+        if len(self.slowest) < TOP_SLOWEST:
+            heapq.heappush(self.slowest, item)
+        elif item > self.slowest[0]:
+            heapq.heapreplace(self.slowest, item)
+
+    @staticmethod
+    def timeline(intervals, t0):
+        points = sorted([(s, 1) for s, _ in intervals] + [(e, -1) for _, e in intervals], key=lambda p: (p[0], p[1]))
+        cur, out, busy, weighted, last = 0, [], 0.0, 0.0, None
+        for t, d in points:
+            if last is not None and cur > 0:
+                busy += t - last
+                weighted += cur * (t - last)
+            cur += d
+            last = t
+            if out and abs(out[-1][0] - (t - t0)) < 1e-4:
+                out[-1][1] = cur
+            else:
+                out.append([round(t - t0, 4), cur])
+        peak = max((c for _, c in out), default=0)
+        return out, peak, (weighted / busy if busy else 0.0)
+
+    def summary(self):
+        hosts = {}
+        for host, h in sorted(self.hosts.items(), key=lambda kv: -sum(kv[1]['times'])):
+            times = sorted(h['times'])
+            timeline, peak, mean_conc = self.timeline(h['intervals'], self.t0 or 0)
+            hosts[host] = {
+                'requests': h['requests'],
+                'failed': h['failed'],
+                'bytes': h['bytes'],
+                'mean_ms': round(sum(times) / len(times), 1) if times else None,
+                'p95_ms': times[min(len(times) - 1, int(0.95 * len(times)))] if times else None,
+                'max_ms': times[-1] if times else None,
+                'mean_ttfb_ms': round(sum(h['waits']) / len(h['waits']), 1) if h['waits'] else None,
+                'peak_concurrency': peak,
+                'mean_concurrency': round(mean_conc, 2),
+                'concurrency': timeline,
+            }
+        slowest = [{'time_ms': t, 'url': u, 'host': host} for t, u, host in sorted(self.slowest, reverse=True)]
+        return {'hosts': hosts, 'slowest': slowest}
+
+
+class HarRecorder:
+    """Folds Network events of one or more CDP sessions into HAR entries as requests finish."""
+
+    def __init__(self, path, keep_spool=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.spool_path = self.path.with_name(self.path.name + '.entries.jsonl')
+        self.keep_spool = keep_spool
+        self._spool = open(self.spool_path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._sessions = {}
+        self.stats = HostStats()
+        self.entries = 0
+        self._stop = threading.Event()
+        self._watcher = None
+
+    # --- sessions ---
+
+    def add_session(self, session, target, key=None):
+        key = key or f'{target}:{id(session)}'
+        handlers = {
+            'Network.requestWillBeSent': lambda p: self._on_request(target, key, p),
+            'Network.responseReceived': lambda p: self._on_response(key, p),
+            'Network.dataReceived': lambda p: self._on_data(key, p),
+            'Network.loadingFinished': lambda p: self._on_finished(key, p),
+            'Network.loadingFailed': lambda p: self._on_failed(key, p),
+        }
+        for method, cb in handlers.items():
+            session.on(method, cb)
+        session.send('Network.enable', {})
+        self._sessions[key] = session
+        return session
+
+    def attach_target(self, target_info, target):
+        sess = CDPSession(target_info['webSocketDebuggerUrl'])
+        return self.add_session(sess, target, key=target_info['id'])
+
+    def watch_workers(self, address, interval=2.0):
+        """Attach to extension service workers now and whenever a new one appears."""
+        def scan():
+            try:
+                workers = extension_worker_targets(address)
+            except Exception:
+                return
+            for t in workers:
+                sess = self._sessions.get(t['id'])
+                if sess is not None and not sess.closed:
+                    continue
+                try:
+                    self.attach_target(t, 'worker')
+                except Exception as e:
+                    print('har: cannot attach to service worker:', e, file=sys.stderr)
+
+        def loop():
+            while not self._stop.wait(interval):
+                scan()
+
+        scan()
+        self._watcher = threading.Thread(target=loop, name='har-workers', daemon=True)
+        self._watcher.start()
+
+    # --- events (reader threads) ---
+
+    def _on_request(self, target, key, p):
+        rid = (key, p.get('requestId'))
+        with self._lock:
+            prev = self._inflight.get(rid)
+            if prev is not None and p.get('redirectResponse'):
+                # a redirect reuses the requestId: close the previous hop with the redirect response
+                prev['response'] = p['redirectResponse']
+                prev['headers_at'] = p.get('timestamp')
+                self._finish(rid, p.get('timestamp'), p['redirectResponse'].get('encodedDataLength'), None)
+            req = p.get('request') or {}
+            self._inflight[rid] = {
+                'target': target, 'type': p.get('type'), 'request': req,
+                'started': p.get('timestamp'), 'wall': p.get('wallTime') or time.time(),
+                'response': None, 'headers_at': None, 'data': 0,
+            }
+
+    def _on_response(self, key, p):
+        with self._lock:
+            e = self._inflight.get((key, p.get('requestId')))
+            if e is not None:
+                e['response'] = p.get('response') or {}
+                e['headers_at'] = p.get('timestamp')
+                e['type'] = p.get('type') or e['type']
+
+    def _on_data(self, key, p):
+        with self._lock:
+            e = self._inflight.get((key, p.get('requestId')))
+            if e is not None:
+                e['data'] += p.get('dataLength') or 0
+
+    def _on_finished(self, key, p):
+        with self._lock:
+            self._finish((key, p.get('requestId')), p.get('timestamp'), p.get('encodedDataLength'), None)
+
+    def _on_failed(self, key, p):
+        with self._lock:
+            self._finish((key, p.get('requestId')), p.get('timestamp'), 0, p.get('errorText') or 'failed')
+
+    def _finish(self, rid, finished, encoded, error):
+        e = self._inflight.pop(rid, None)
+        if e is None:
+            return
+        finished = finished or e['headers_at'] or e['started']
+        entry = self._entry(e, finished, encoded, error)
+        self._spool.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.entries += 1
+        host = urlsplit(entry['request']['url']).hostname or '(none)'
+        self.stats.add(host, e['started'], finished, entry['time'], entry['timings']['wait'],
+                       entry['response']['_transferSize'], error is not None, entry['request']['url'])
+
+    def _entry(self, e, finished, encoded, error):
+        req, resp = e['request'], e['response'] or {}
+        timings = har_timings(resp.get('timing'), e['started'], e['headers_at'], finished)
+        url = req.get('url', '')
+        query = urlsplit(url).query
+        entry = {
+            'startedDateTime': _iso(e['wall']),
+            'time': _total(timings),
+            'request': {
+                'method': req.get('method', 'GET'),
+                'url': url,
+                'httpVersion': resp.get('protocol', ''),
+                'headers': _headers(req.get('headers')),
+                'queryString': [{'name': k, 'value': v} for k, _, v in (q.partition('=') for q in query.split('&') if q)],
+                'cookies': [],
+                'headersSize': -1,
+                'bodySize': len(req.get('postData') or ''),
+            },
+            'response': {
+                'status': resp.get('status', 0),
+                'statusText': resp.get('statusText', '') if error is None else error,
+                'httpVersion': resp.get('protocol', ''),
+                'headers': _headers(resp.get('headers')),
+                'cookies': [],
+                'content': {'size': e['data'], 'mimeType': resp.get('mimeType', '')},
+                'redirectURL': (resp.get('headers') or {}).get('location', ''),
+                'headersSize': -1,
+                'bodySize': -1,
+                '_transferSize': encoded or 0,
+            },
+            'cache': {},
+            'timings': timings,
+            'serverIPAddress': resp.get('remoteIPAddress', ''),
+            '_target': e['target'],
+            '_resourceType': e['type'],
+        }
+        if resp.get('fromDiskCache') or resp.get('fromServiceWorker'):
+            entry['_fromCache'] = 'disk' if resp.get('fromDiskCache') else 'serviceWorker'
+        if error is not None:
+            entry['_error'] = error
+        return entry
+
+    # --- output ---
+
+    def summary(self):
+        with self._lock:
+            s = self.stats.summary()
+            s['entries'] = self.entries
+            s['in_flight'] = len(self._inflight)
+        return s
+
+    def close(self):
+        """Stop listening, then write the .har (streamed from the spool) and the summary; returns the summary."""
+        self._stop.set()
+        for sess in list(self._sessions.values()):
+            try:
+                sess.close()
+            except Exception:
+                pass
+        with self._lock:
+            for rid in list(self._inflight):
+                e = self._inflight[rid]
+                self._finish(rid, e['headers_at'] or e['started'], 0, 'incomplete at end of run')
+            self._spool.close()
+        with open(self.path, 'w', encoding='utf-8') as out, open(self.spool_path, encoding='utf-8') as spool:
+            out.write('{"log":{"version":"1.2","creator":{"name":"vx-har_export","version":"1"},"pages":[],"entries":[\n')
+            for i, line in enumerate(spool):
+                out.write((',\n' if i else '') + line.rstrip('\n'))
+            out.write('\n]}}\n')
+        if not self.keep_spool:
+            os.unlink(self.spool_path)
+        summary = self.summary()
+        with open(self.path.with_name(self.path.name + '.summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def summarize_har(path):
+    """Per-host summary of an existing HAR file (any producer)."""
+    with open(path, encoding='utf-8') as f:
+        har = json.load(f)
+    stats = HostStats()
+    for e in har['log']['entries']:
+        started = datetime.fromisoformat(e['startedDateTime'].replace('Z', '+00:00')).timestamp()
+        t = e.get('time') or 0
+        resp = e.get('response') or {}
+        size = resp.get('_transferSize', resp.get('bodySize', 0))
+        stats.add(urlsplit(e['request']['url']).hostname or '(none)', started, started + t / 1000.0, t,
+                  (e.get('timings') or {}).get('wait'), size, bool(e.get('_error')) or resp.get('status') == 0,
+                  e['request']['url'])
+    s = stats.summary()
+    s['entries'] = len(har['log']['entries'])
+    return s
+
+
+def format_summary(summary, timeline_points=0):
+    lines = [f"{summary.get('entries', 0)} requests"]
+    lines.append(f"{'host':<32} {'req':>5} {'fail':>4} {'kB':>9} {'mean':>8} {'p95':>8} {'ttfb':>8} {'peak':>4} {'conc':>5}")
+    for host, h in summary['hosts'].items():
+        lines.append(f"{host[:32]:<32} {h['requests']:>5} {h['failed']:>4} {h['bytes'] / 1024:>9.0f} "
+                     f"{h['mean_ms'] or 0:>8.0f} {h['p95_ms'] or 0:>8.0f} {h['mean_ttfb_ms'] or 0:>8.0f} "
+                     f"{h['peak_concurrency']:>4} {h['mean_concurrency']:>5.2f}")
+        if timeline_points:
+            lines.append('    concurrency: ' + ' '.join(f'{t:.2f}s:{c}' for t, c in h['concurrency'][:timeline_points]))
+    lines.append('slowest:')
+    for s in summary['slowest']:
+        lines.append(f"  {s['time_ms']:>8.0f}ms  {s['url'][:120]}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Record a HAR + per-host summary from a running Chrome, or summarize a HAR')
+    p.add_argument('--debugger-address', help='host:port of a Chrome started with --remote-debugging-port')
+    p.add_argument('-o', '--output', default='run.har')
+    p.add_argument('--duration', type=float, default=None, help='seconds to record (default: until Ctrl-C)')
+    p.add_argument('--no-workers', action='store_true', help='page targets only')
+    p.add_argument('--summarize', help='summarize an existing HAR file instead of recording')
+    p.add_argument('--timeline', type=int, default=0, help='print the first N concurrency points per host')
+    args = p.parse_args(argv)
+
+    if args.summarize:
+        print(format_summary(summarize_har(args.summarize), args.timeline))
+        return 0
+    if not args.debugger_address:
+        p.error('--debugger-address or --summarize is required')
+    har = HarRecorder(args.output)
+    pages = [t for t in list_targets(args.debugger_address) if t.get('type') == 'page' and t.get('webSocketDebuggerUrl')]
+    for t in pages:
+        har.attach_target(t, 'page')
+    if not args.no_workers:
+        har.watch_workers(args.debugger_address)
+    print(f'har: recording {len(pages)} page target(s)' + ('' if args.no_workers else ' + extension workers'),
+          file=sys.stderr)
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    summary = har.close()
+    print(format_summary(summary, args.timeline))
+    print('HAR written to', har.path, file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
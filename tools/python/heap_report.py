@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Heap growth across repeated image upload cycles.
+
+Opens /items/new on the local stand-in with the dist/ extension, then runs N
+upload cycles in the same tab through window.__vx_invokeUpload (fresh image
+URLs every cycle, so nothing is served from cache). After each cycle it takes
+a HeapProfiler snapshot (after a forced GC) of the tab, whose isolate holds the
+content script, and of the extension service worker. It then computes the
+retained size per constructor.
+
+A constructor is flagged when its retained size or instance count keeps
+growing from cycle to cycle (warm-up cycle excluded). Blobs and Files, the base64
+strings of the image:download reply, canvases from rotation.ts and the
+transcoded files from images.ts all show up this way if something holds on to
+them.
+
+Usage:
+  npm run build
+  python3 -m tools.python.heap_report [-n 6] [--images 4] [--image-kb 400] [--rotate 90]
+      [--min-growth-kb 256] [--save-dir /tmp/heaps] [--json heap.json]
+
+Snapshots saved with --save-dir load in DevTools (Memory tab) for retainer paths.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from .bench_fill import DIST_DIR, ExtensionPage, build_driver
+from .cdp_utils import CDPSession, debugger_address, list_targets
+from .standin_server import StandinServer
+
+
+def take_heap_snapshot(session, gc=True, timeout=300):
+    """Return the parsed snapshot JSON of the session's target."""
+    chunks = []
+    cb = lambda params: chunks.append(params.get('chunk') or '')  # noqa: E731
+    session.on('HeapProfiler.addHeapSnapshotChunk', cb)
+    try:
+        session.send('HeapProfiler.enable', {})
+        if gc:
+            session.send('HeapProfiler.collectGarbage', {}, timeout=60)
+        # chunks arrive as events before the command reply
+        session.send('HeapProfiler.takeHeapSnapshot', {'reportProgress': False}, timeout=timeout)
+    finally:
+        session.off('HeapProfiler.addHeapSnapshotChunk', cb)
+    return json.loads(''.join(chunks))
+
+
+def _class_name(node_type, name):
+    if node_type in ('object', 'native'):
+        return name
+    return f'({node_type})'
+
+
+def class_stats(snap):
+    """{constructor: {'count', 'self_size', 'retained_size'}} from a heap snapshot.
+
+    Retained sizes come from the dominator tree (Cooper-Harvey-Kennedy, weak
+    edges ignored). As in the DevTools summary, an object's retained size is
+    only counted for its class when no dominator of the same class already
+    counts it.
+    """
+    meta = snap['snapshot']['meta']
+    node_fields, edge_fields = meta['node_fields'], meta['edge_fields']
+    node_types, edge_types = meta['node_types'][0], meta['edge_types'][0]
+    nf, ef = len(node_fields), len(edge_fields)
+    f_type, f_name = node_fields.index('type'), node_fields.index('name')
+    f_size, f_edges = node_fields.index('self_size'), node_fields.index('edge_count')
+    e_type, e_to = edge_fields.index('type'), edge_fields.index('to_node')
+    weak = edge_types.index('weak') if 'weak' in edge_types else -1
+    nodes, edges, strings = snap['nodes'], snap['edges'], snap['strings']
+    n = len(nodes) // nf
+
+    cls = [None] * n
+    size = [0] * n
+    succ = [None] * n
+    ei = 0
+    for i in range(n):
+        base = i * nf
+        cls[i] = _class_name(node_types[nodes[base + f_type]], strings[nodes[base + f_name]])
+        size[i] = nodes[base + f_size]
+        cnt = nodes[base + f_edges]
+        out = []
+        for k in range(ei, ei + cnt * ef, ef):
+            if edges[k + e_type] != weak:
+                out.append(edges[k + e_to] // nf)
+        succ[i] = out
+        ei += cnt * ef
+
+    # iterative DFS from the synthetic root (node 0) for a postorder
+    po = [-1] * n
+    order = []
+    seen = [False] * n
+    seen[0] = True
+    stack = [(0, 0)]
+    while stack:
+        v, j = stack[-1]
+        if j < len(succ[v]):
+            stack[-1] = (v, j + 1)
+            w = succ[v][j]
+            if not seen[w]:
+                seen[w] = True
+                stack.append((w, 0))
+        else:
+            stack.pop()
+            po[v] = len(order)
+            order.append(v)
+    preds = [[] for _ in range(n)]
+    for v in order:
+        for w in succ[v]:
+            preds[w].append(v)
+
+    idom = [-1] * n
+    idom[0] = 0
+    changed = True
+    while changed:
+        changed = False
+        for b in reversed(order):
+            if b == 0:
+                continue
+            new = -1
+            for p in preds[b]:
+                if idom[p] == -1:
+                    continue
+                if new == -1:
+                    new = p
+                    continue
+                a, c = p, new
+                while a != c:
+                    while po[a] < po[c]:
+                        a = idom[a]
+                    while po[c] < po[a]:
+                        c = idom[c]
+                new = a
+            if idom[b] != new:
+                idom[b] = new
+                changed = True
+
+    retained = list(size)
+    for v in order:  # postorder: dominated nodes come first
+        if v != 0 and idom[v] != -1:
+            retained[idom[v]] += retained[v]
+
+    children = [[] for _ in range(n)]
+    for v in order:
+        if v != 0 and idom[v] != -1:
+            children[idom[v]].append(v)
+    stats = {}
+    open_classes = {}
+    stack = [(0, False)]
+    while stack:
+        v, leaving = stack.pop()
+        c = cls[v]
+        if leaving:
+            open_classes[c] -= 1
+            continue
+        s = stats.get(c)
+        if s is None:
+            s = stats[c] = {'count': 0, 'self_size': 0, 'retained_size': 0}
+        s['count'] += 1
+        s['self_size'] += size[v]
+        if not open_classes.get(c):
+            s['retained_size'] += retained[v]
+        open_classes[c] = open_classes.get(c, 0) + 1
+        stack.append((v, True))
+        stack.extend((w, False) for w in children[v])
+    stats.pop(cls[0], None)
+    return stats
+
+
+def _slope(values):
+    k = len(values)
+    if k < 2:
+        return 0.0
+    mx = (k - 1) / 2.0
+    my = sum(values) / k
+    num = sum((i - mx) * (y - my) for i, y in enumerate(values))
+    den = sum((i - mx) ** 2 for i in range(k))
+    return num / den
+
+
+def find_growth(series, min_growth_bytes=256 * 1024, min_count_growth=None, rising_ratio=0.75):
+    """Flag constructors whose retained size (or count) rises across the snapshots.
+
+    series is a list of class_stats() results, one per cycle. A class is flagged
+    when it rose in at least rising_ratio of the steps and grew by at least
+    min_growth_bytes overall (or by min_count_growth instances, default one per
+    cycle).
+    """
+    if len(series) < 2:
+        return []
+    steps = len(series) - 1
+    if min_count_growth is None:
+        min_count_growth = steps
+    names = set().union(*[s.keys() for s in series])
+    flagged = []
+    for name in names:
+        ret = [(s.get(name) or {}).get('retained_size', 0) for s in series]
+        cnt = [(s.get(name) or {}).get('count', 0) for s in series]
+        up_ret = sum(1 for a, b in zip(ret, ret[1:]) if b > a)
+        up_cnt = sum(1 for a, b in zip(cnt, cnt[1:]) if b > a)
+        by_size = up_ret >= rising_ratio * steps and ret[-1] - ret[0] >= min_growth_bytes
+        by_count = up_cnt >= rising_ratio * steps and cnt[-1] - cnt[0] >= min_count_growth
+        if by_size or by_count:
+            flagged.append({
+                'constructor': name,
+                'retained': ret,
+                'count': cnt,
+                'bytes_per_cycle': round(_slope(ret)),
+                'count_per_cycle': round(_slope(cnt), 2),
+                'by': 'size' if by_size else 'count',
+            })
+    flagged.sort(key=lambda f: f['bytes_per_cycle'], reverse=True)
+    return flagged
+
+
+def _worker_session(driver, sessions):
+    """CDPSession on the extension service worker (re-attached if it restarted)."""
+    address = debugger_address(driver)
+    if not address:
+        return None, None
+    for t in list_targets(address):
+        if t.get('type') == 'service_worker' and str(t.get('url', '')).startswith('chrome-extension://'):
+            sess = sessions.get(t['id'])
+            if sess is None or sess.closed:
+                sess = sessions[t['id']] = CDPSession(t['webSocketDebuggerUrl'])
+            return t['id'], sess
+    return None, None
+
+
+def _save(snap, save_dir, label):
+    path = Path(save_dir) / f'{label}.heapsnapshot'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snap, f, separators=(',', ':'))
+
+
+def run_cycles(extension_dir, cycles=6, images=4, image_kb=400, rotate=None, save_dir=None, headless=True):
+    """Run the upload cycles; returns {'page': [stats...], 'worker': [stats...], 'worker_restarts': n}."""
+    out = {'page': [], 'worker': [], 'worker_restarts': 0, 'cycle_ms': []}
+    with StandinServer(port=0, profile='fast', image_kb=image_kb) as server:
+        driver = build_driver(extension_dir, server.chrome_args(), headless=headless)
+        page = None
+        workers = {}
+        worker_id = None
+        try:
+            page = ExtensionPage(driver)
+            driver.get(server.url('/items/new'))
+            if rotate is not None:
+                # localStorage is shared with the isolated world (same origin)
+                driver.execute_script("localStorage.setItem('vx:rotate:auto', arguments[0])", str(rotate))
+            cid = page.wait_for_hook('__vx_invokeUpload')
+            for c in range(cycles):
+                urls = [f'https://images1.vinted.net/t/heap-{c}-{i}.jpg' for i in range(images)]
+                t0 = time.monotonic()
+                page.evaluate(f'window.__vx_invokeUpload({json.dumps(urls)})', cid, timeout=300)
+                out['cycle_ms'].append(round((time.monotonic() - t0) * 1000))
+                # the stand-in grid keeps a tile per file; drop them so only extension memory remains
+                driver.execute_script(
+                    "var g=document.querySelector('[data-testid=\"media-select-grid\"]');if(g)g.innerHTML='';"
+                    "var i=document.querySelector('input[type=file]');if(i)i.value='';"
+                )
+                snap = take_heap_snapshot(page.session)
+                out['page'].append(class_stats(snap))
+                if save_dir:
+                    _save(snap, save_dir, f'page-{c}')
+                del snap
+                wid, wsess = _worker_session(driver, workers)
+                if wsess is not None:
+                    if worker_id is not None and wid != worker_id:
+                        # a restarted worker starts from an empty heap: start a new series
+                        out['worker_restarts'] += 1
+                        out['worker'] = []
+                    worker_id = wid
+                    snap = take_heap_snapshot(wsess)
+                    out['worker'].append(class_stats(snap))
+                    if save_dir:
+                        _save(snap, save_dir, f'worker-{c}')
+                    del snap
+                print(f'heap: cycle {c + 1}/{cycles} upload {out["cycle_ms"][-1]}ms', file=sys.stderr)
+        finally:
+            for sess in workers.values():
+                sess.close()
+            if page is not None:
+                page.close()
+            driver.quit()
+    return out
+
+
+def format_report(target, flagged, series):
+    lines = [f'== {target}: {len(series)} snapshots, {len(flagged)} growing constructors']
+    if series:
+        total = sum(s['self_size'] for s in series[-1].values())
+        lines.append(f'   heap {total / 1024:.0f} kB after the last cycle')
+    for f in flagged:
+        lines.append(f"   GROWTH {f['constructor']}: {f['bytes_per_cycle'] / 1024:+.1f} kB/cycle, "
+                     f"{f['count_per_cycle']:+} objects/cycle (retained {f['retained'][0] / 1024:.0f} -> "
+                     f"{f['retained'][-1] / 1024:.0f} kB, count {f['count'][0]} -> {f['count'][-1]})")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Detect heap growth across repeated image upload cycles')
+    p.add_argument('-n', '--cycles', type=int, default=6)
+    p.add_argument('--images', type=int, default=4, help='images per upload cycle')
+    p.add_argument('--image-kb', type=int, default=400)
+    p.add_argument('--rotate', type=int, default=None, help='rotation angle (exercises rotation.ts canvases)')
+    p.add_argument('--warmup', type=int, default=1, help='cycles left out of the growth check')
+    p.add_argument('--min-growth-kb', type=int, default=256)
+    p.add_argument('--extension', default=str(DIST_DIR))
+    p.add_argument('--save-dir', help='also write every snapshot as .heapsnapshot')
+    p.add_argument('--headful', action='store_true')
+    p.add_argument('--json', help='write per-cycle stats and flags as JSON')
+    args = p.parse_args(argv)
+
+    extension = Path(args.extension).resolve()
+    if not (extension / 'manifest.json').exists():
+        p.error(f'no manifest.json in {extension}; run `npm run build` first')
+    if args.cycles - args.warmup < 3:
+        p.error('need at least 3 cycles after warm-up to call a trend')
+    res = run_cycles(str(extension), args.cycles, args.images, args.image_kb, args.rotate,
+                     args.save_dir, headless=not args.headful)
+    report = {'cycles': args.cycles, 'cycle_ms': res['cycle_ms'], 'worker_restarts': res['worker_restarts']}
+    n_flagged = 0
+    for target in ('page', 'worker'):
+        series = res[target][args.warmup:] if target == 'page' or not res['worker_restarts'] else res[target]
+        flagged = find_growth(series, args.min_growth_kb * 1024)
+        n_flagged += len(flagged)
+        report[target] = {'flagged': flagged, 'snapshots': len(series)}
+        print(format_report(target, flagged, series))
+    if res['worker_restarts']:
+        print(f"note: the service worker restarted {res['worker_restarts']} time(s); its series restarts with it",
+              file=sys.stderr)
+    if args.json:
+        report['series'] = {'page': res['page'], 'worker': res['worker']}
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if n_flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
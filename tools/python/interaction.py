@@ -1,18 +1,176 @@
+import os
 import time
 import json
+import queue
+import base64
+import threading
+from concurrent.futures import Future
 from pathlib import Path
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
+from .artifact_store import ArtifactStore, new_run_id
+from .cdp_utils import attach_page_session
 from .humanize import simulate_human_mouse_move
 
 TOOLS_DIR = Path(__file__).resolve().parent.parent
+# artifacts captured by this process are grouped under one run in the artifact store
+RUN_ID = new_run_id('interaction')
+_store = None
+
+
+def _artifact_store():
+    global _store
+    if _store is None:
+        _store = ArtifactStore()
+    return _store
+
+
+class FailureCapture:
+    """Bounded background queue for click-failure artifacts.
+
+    Captures for the same selector are rate limited (min_interval seconds) and
+    dropped when the queue is full. The snapshot is taken at submit() time: the
+    URL and timestamp are read there, and the page HTML (Runtime.evaluate of
+    outerHTML) and screenshot (Page.captureScreenshot) are requested right away
+    on a dedicated CDPSession for the tab, so the browser answers for the page as
+    it was at the failure. Only waiting for those replies and the disk writes run
+    on the worker thread, which never touches the WebDriver. Without a DevTools
+    endpoint, page_source and the screenshot are taken synchronously instead.
+    Call flush() before driver.quit().
+    """
+
+    def __init__(self, maxsize=4, min_interval=30.0, html_only=False):
+        self.maxsize = maxsize
+        self.min_interval = min_interval
+        self.html_only = html_only
+        self._q = queue.Queue(maxsize=maxsize)
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._last = {}
+        self._thread = None
+        # window handle -> CDPSession (None when the driver exposes no DevTools endpoint)
+        self._sessions = {}
+
+    def _session(self, driver):
+        try:
+            handle = driver.current_window_handle
+        except Exception:
+            handle = None
+        cached = self._sessions.get(handle)
+        if cached is not None and cached.closed:
+            # tab closed or browser restarted: attach again
+            del self._sessions[handle]
+        if handle not in self._sessions:
+            try:
+                self._sessions[handle] = attach_page_session(driver)
+            except Exception as e:
+                print('robust_click: no CDP session for captures, falling back to WebDriver:', e)
+                self._sessions[handle] = None
+        return self._sessions[handle]
+
+    def _snapshot(self, driver, html_only):
+        """Start the capture on the caller's thread; returns {name: bytes | str | Future}."""
+        session = self._session(driver)
+        if session is not None:
+            files = {'page.html': session.send_nowait(
+                'Runtime.evaluate',
+                {'expression': 'document.documentElement.outerHTML', 'returnByValue': True},
+            )}
+            if not html_only:
+                files['screenshot.png'] = session.send_nowait('Page.captureScreenshot', {'format': 'png'})
+            return files
+        files = {'page.html': driver.page_source}
+        if not html_only:
+            files['screenshot.png'] = driver.get_screenshot_as_png()
+        return files
+
+    def submit(self, driver, sel):
+        now = time.monotonic()
+        with self._cond:
+            last = self._last.get(sel)
+            if last is not None and now - last < self.min_interval:
+                return False
+            if self._q.full():
+                print('robust_click: capture queue full, skipping artifacts for', sel)
+                return False
+            try:
+                url = driver.current_url
+            except Exception:
+                url = None
+            try:
+                files = self._snapshot(driver, self.html_only)
+            except Exception as e:
+                print('robust_click: artifact capture failed for', sel, e)
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='click-failure-capture', daemon=True)
+                self._thread.start()
+            self._q.put_nowait((sel, url, round(time.time(), 3), files))
+            self._last[sel] = now
+            self._pending += 1
+        return True
+
+    def flush(self, timeout=None):
+        """Wait for queued captures; returns False if some were still pending at timeout."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
 
+    @staticmethod
+    def _resolve(name, value):
+        if not isinstance(value, Future):
+            return value
+        result = value.result(30)
+        if name == 'screenshot.png':
+            return base64.b64decode(result.get('data') or '')
+        return (result.get('result') or {}).get('value')
+
+    def _run(self):
+        while True:
+            sel, url, failed_at, files = self._q.get()
+            try:
+                files = {name: self._resolve(name, value) for name, value in files.items()}
+                _artifact_store().save(RUN_ID, 'click-failure', files, url=url, selector=sel, failed_at=failed_at)
+                print('robust_click: saved debug artifacts for', sel, 'in run', RUN_ID)
+            except Exception as e:
+                print('robust_click: artifact capture failed for', sel, e)
+            finally:
+                with self._cond:
+                    self._pending -= 1
+                    self._cond.notify_all()
+
+
+_failure_capture = FailureCapture(html_only=os.environ.get('VX_CLICK_HTML_ONLY') == '1')
+
+
+def configure_failure_capture(maxsize=None, min_interval=None, html_only=None):
+    """Tune click-failure capture; maxsize only applies before the first capture."""
+    global _failure_capture
+    fc = _failure_capture
+    if maxsize is not None and fc._thread is None:
+        fc = _failure_capture = FailureCapture(maxsize, fc.min_interval, fc.html_only)
+    if min_interval is not None:
+        fc.min_interval = min_interval
+    if html_only is not None:
+        fc.html_only = html_only
+    return fc
+
+
+def flush_failure_artifacts(timeout=10):
+    """Wait for pending click-failure artifacts (call before quitting the driver)."""
+    return _failure_capture.flush(timeout)
+
+
+def robust_click(driver, by, sel, timeout=6, capture=True):
+    """Try multiple click strategies and queue debug artifacts on failure."""
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
 
-def robust_click(driver, by, sel, timeout=6):
-    """Try multiple click strategies and save debug artifacts on failure."""
     # Wait until element is present and clickable
     try:
         el = WebDriverWait(driver, timeout).until(
@@ -83,22 +241,36 @@ def robust_click(driver, by, sel, timeout=6):
     except Exception:
         pass
 
-    # final: save debug artifacts for investigation
-    try:
-        safe_name = sel.replace('/', '_').replace(' ', '_').replace(':', '_')
-        screenshot = TOOLS_DIR / f'click-failure-{safe_name}.png'
-        driver.save_screenshot(str(screenshot))
-        with open(TOOLS_DIR / f'click-failure-{safe_name}.html', 'w') as f:
-            f.write(driver.page_source)
-        print('robust_click: saved debug artifacts for', sel)
-    except Exception:
-        pass
+    # final: queue debug artifacts for investigation without blocking the caller
+    if capture:
+        _failure_capture.submit(driver, sel)
     return False
 
 
-def capture_post_response(driver, url_substrings=None, timeout=10):
+def capture_post_response(driver, url_substrings=None, timeout=10, recorder=None):
+    """Wait for the first response whose URL contains one of url_substrings.
+
+    Pass a NetworkRecorder attached before the request is sent to stream the
+    response. Without one the performance log is polled: it buffers the events
+    already received, so a response that arrived before this call is still seen
+    (a recorder attached now would miss it).
+    """
     if url_substrings is None:
         url_substrings = ['login', 'session', 'auth', 'signin']
+    if recorder is None:
+        return _poll_performance_log(driver, url_substrings, timeout)
+
+    def match(entry):
+        url = entry.get('url') or ''
+        return any(s in url for s in url_substrings)
+
+    entry = recorder.wait_for(match, timeout=timeout)
+    if entry is None:
+        return None
+    return {'requestId': entry['requestId'], 'url': entry['url'], 'body': entry['body']}
+
+
+def _poll_performance_log(driver, url_substrings, timeout):
     end = time.time() + timeout
     while time.time() < end:
         try:
@@ -127,6 +299,8 @@ def capture_post_response(driver, url_substrings=None, timeout=10):
 
 
 def detect_captcha(driver):
+    from selenium.webdriver.common.by import By
+
     try:
         iframes = driver.find_elements(By.TAG_NAME, 'iframe')
         for f in iframes:
@@ -13,34 +13,25 @@ import os
 import time
 import random
 import argparse
+import sys
 
 from pathlib import Path
-import undetected_chromedriver as uc
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-# WebDriverWait/EC used in helpers module; not needed directly here
-
-
-try:
-    from tools.python.humanize import human_type, simulate_human_mouse_move, pre_search_humanize
-    from tools.python.utils import save_cookies, save_storage, save_login_response
-    from tools.python.cdp_utils import set_accept_language, set_timezone, set_user_agent
-    from tools.python.stealth import apply_stealth_knobs
-    from tools.python.interaction import robust_click, capture_post_response, detect_captcha, wait_for_captcha_resolution
-except Exception:
-    import sys
-    ROOT = Path(__file__).resolve().parents[2]
-    if str(ROOT) not in sys.path:
-        sys.path.insert(0, str(ROOT))
-    from tools.python.humanize import human_type, simulate_human_mouse_move, pre_search_humanize
-    from tools.python.utils import save_cookies, save_storage, save_login_response
-    from tools.python.cdp_utils import set_accept_language, set_timezone, set_user_agent
-    from tools.python.stealth import apply_stealth_knobs
-    from tools.python.interaction import robust_click, capture_post_response, detect_captcha, wait_for_captcha_resolution
+
+if __package__ in (None, ''):
+    # run as a script: make `tools.python` importable
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+# selenium is only imported where a driver is used, so --help stays fast
+from tools.python.humanize import human_type, simulate_human_mouse_move, pre_search_humanize
+from tools.python.utils import save_login_response, save_session_snapshot, export_legacy_files
+from tools.python.cdp_utils import attach_page_session, set_accept_language, set_timezone, set_user_agent
+from tools.python.drivers import chrome_options, start_driver
+from tools.python.stealth import apply_stealth_knobs
+from tools.python.interaction import (
+    robust_click, capture_post_response, detect_captcha, wait_for_captcha_resolution, flush_failure_artifacts,
+)
+from tools.python.network_recorder import NetworkRecorder
+from tools.python.readiness import PageWaiter, navigate
 
 # paths
 TOOLS_DIR = Path(__file__).resolve().parent.parent
@@ -50,174 +41,117 @@ SESSION_FILE = TOOLS_DIR / 'session.json'
 TARGET = 'https://www.vinted.fr/member/signup/select_type?ref_url=%2F'
 
 
-def click_consent(driver, timeout=8):
-    """Robust consent click:
-    - try the common CSS selector first (if it exists)
-    - then search by visible text (case-insensitive) in the main document
-    - if not found, iterate accessible iframes and repeat
-    Returns True if clicked, False otherwise.
-    """
-    variants = ['tout accepter', "j'accepte", 'accepter', 'accept all']
+CONSENT_VARIANTS = ['tout accepter', "j'accepte", 'accepter', 'accept all']
+# known Google consent button (some profiles show it)
+CONSENT_CSS = 'div.QS5gu.sy4vM'
+
+# Scan the document and every same-origin frame in one call. Candidates are
+# ranked (0: known CSS, 1: button/role + text, 2: any element + text, smallest
+# text first), tagged with data-vx-consent and returned with the window.frames
+# index path needed to switch into their frame.
+JS_FIND_CONSENT = r"""
+const css = arguments[0];
+const variants = (arguments[1] || []).map(v => v.toLowerCase());
+const limit = arguments[2] || 10;
+const out = [];
+let seq = 0;
+function visible(el){
+  try{
+    if(!el.getClientRects().length) return false;
+    const cs = el.ownerDocument.defaultView.getComputedStyle(el);
+    return cs.visibility !== 'hidden' && cs.display !== 'none' && cs.opacity !== '0';
+  }catch(e){ return false; }
+}
+function norm(el){ return (el.textContent || '').replace(/\s+/g, ' ').trim().toLowerCase(); }
+function push(el, rank, path, text){
+  if(el.hasAttribute('data-vx-consent')) return;
+  const id = String(++seq);
+  el.setAttribute('data-vx-consent', id);
+  out.push({id: id, rank: rank, path: path, text: text.slice(0, 80), len: text.length});
+}
+function scan(win, path){
+  let doc;
+  try{ doc = win.document; if(!doc || !doc.body) return; }catch(e){ return; }
+  doc.querySelectorAll('[data-vx-consent]').forEach(el => el.removeAttribute('data-vx-consent'));
+  try{ doc.querySelectorAll(css).forEach(el => { if(visible(el)) push(el, 0, path, norm(el)); }); }catch(e){}
+  const all = doc.body.querySelectorAll('*');
+  for(const el of all){
+    const tag = el.tagName;
+    if(tag === 'SCRIPT' || tag === 'STYLE' || tag === 'NOSCRIPT' || tag === 'IFRAME') continue;
+    const text = norm(el);
+    if(!text || text.length > 200 || !variants.some(v => text.includes(v))) continue;
+    if(!visible(el)) continue;
+    const role = el.getAttribute('role');
+    const rank = (tag === 'BUTTON' || role === 'button' || role === 'none') ? 1 : 2;
+    push(el, rank, path, text);
+  }
+  const frames = doc.querySelectorAll('iframe, frame');
+  for(const f of frames){
+    let w;
+    try{ w = f.contentWindow; void w.document.body; }catch(e){ continue; }
+    let idx = -1;
+    for(let k = 0; k < win.frames.length; k++){ if(win.frames[k] === w){ idx = k; break; } }
+    if(idx >= 0) scan(w, path.concat([idx]));
+  }
+}
+scan(window, []);
+out.sort((a, b) => a.rank - b.rank || a.len - b.len);
+return out.slice(0, limit);
+"""
 
-    def xpath_ci(text):
-        # case-insensitive contains on normalized text
-        return (
-            "contains(translate(normalize-space(.), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',"
-            "'abcdefghijklmnopqrstuvwxyz'), '%s')" % text.lower()
-        )
 
-    # 0) quick try: known Google consent CSS (some profiles show it)
+def find_consent_candidates(driver, variants=None, limit=10):
+    """Return ranked visible consent candidates from a single in-page scan."""
     try:
-        elems = driver.find_elements(By.CSS_SELECTOR, 'div.QS5gu.sy4vM')
-        for el in elems:
-            try:
-                if el.is_displayed():
-                    try:
-                        print('Found consent element by CSS selector')
-                        try:
-                            driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", el)
-                        except Exception:
-                            pass
-                        try:
-                            simulate_human_mouse_move(driver, el)
-                        except Exception:
-                            pass
-                        ActionChains(driver).move_to_element(el).click(el).perform()
-                    except Exception:
-                        driver.execute_script('arguments[0].click();', el)
-                    time.sleep(0.5)
-                    return True
-            except Exception:
-                continue
-    except Exception:
-        pass
+        return driver.execute_script(JS_FIND_CONSENT, CONSENT_CSS, variants or CONSENT_VARIANTS, limit) or []
+    except Exception as e:
+        print('Consent scan failed:', e)
+        return []
 
-    # 1) search by text+role in main document
-    try:
-        for v in variants:
-            xp = f"//*[(@role='none' or @role='button' or self::button) and {xpath_ci(v)}]"
-            els = driver.find_elements(By.XPATH, xp)
-            for el in els:
-                try:
-                    if el.is_displayed():
-                        try:
-                            print('Found consent candidate by role/text in main doc')
-                            try:
-                                driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", el)
-                            except Exception:
-                                pass
-                            try:
-                                simulate_human_mouse_move(driver, el)
-                            except Exception:
-                                pass
-                            ActionChains(driver).move_to_element(el).click(el).perform()
-                        except Exception:
-                            driver.execute_script('arguments[0].click();', el)
-                        time.sleep(0.5)
-                        return True
-                except Exception:
-                    continue
-    except Exception:
-        pass
 
-    # 2) looser text-only search in main document
-    try:
-        for v in variants:
-            xp = f"//*[ {xpath_ci(v)} ]"
-            els = driver.find_elements(By.XPATH, xp)
-            for el in els:
-                try:
-                    if el.is_displayed():
-                        try:
-                            print('Found consent candidate by loose text in main doc')
-                            try:
-                                driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", el)
-                            except Exception:
-                                pass
-                            try:
-                                simulate_human_mouse_move(driver, el)
-                            except Exception:
-                                pass
-                            ActionChains(driver).move_to_element(el).click(el).perform()
-                        except Exception:
-                            driver.execute_script('arguments[0].click();', el)
-                        time.sleep(0.5)
-                        return True
-                except Exception:
-                    continue
-    except Exception:
-        pass
+def _click_consent_candidate(driver, cand):
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.by import By
 
-    # 3) iterate accessible iframes and repeat
-    frames = driver.find_elements(By.TAG_NAME, 'iframe')
-    for f in frames:
+    try:
+        for idx in cand.get('path') or []:
+            driver.switch_to.frame(idx)
+        el = driver.find_element(By.CSS_SELECTOR, f"[data-vx-consent='{cand['id']}']")
         try:
-            driver.switch_to.frame(f)
-            # first try role+text in iframe
-            for v in variants:
-                try:
-                    xp = f"//*[(@role='none' or @role='button' or self::button) and {xpath_ci(v)}]"
-                    els = driver.find_elements(By.XPATH, xp)
-                    for el in els:
-                        try:
-                            if el.is_displayed():
-                                try:
-                                    print('Found consent candidate in iframe (role/text)')
-                                    try:
-                                        driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", el)
-                                    except Exception:
-                                        pass
-                                    try:
-                                        simulate_human_mouse_move(driver, el)
-                                    except Exception:
-                                        pass
-                                    ActionChains(driver).move_to_element(el).click(el).perform()
-                                except Exception:
-                                    driver.execute_script('arguments[0].click();', el)
-                                driver.switch_to.default_content()
-                                time.sleep(0.5)
-                                return True
-                        except Exception:
-                            continue
-                except Exception:
-                    continue
-            # then looser text-only in iframe
-            for v in variants:
-                try:
-                    xp = f"//*[ {xpath_ci(v)} ]"
-                    els = driver.find_elements(By.XPATH, xp)
-                    for el in els:
-                        try:
-                            if el.is_displayed():
-                                try:
-                                    print('Found consent candidate in iframe (loose text)')
-                                    try:
-                                        driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", el)
-                                    except Exception:
-                                        pass
-                                    try:
-                                        simulate_human_mouse_move(driver, el)
-                                    except Exception:
-                                        pass
-                                    ActionChains(driver).move_to_element(el).click(el).perform()
-                                except Exception:
-                                    driver.execute_script('arguments[0].click();', el)
-                                driver.switch_to.default_content()
-                                time.sleep(0.5)
-                                return True
-                        except Exception:
-                            continue
-                except Exception:
-                    continue
-        except Exception:
-            # cross-origin iframe or other access error
-            pass
-        finally:
             try:
-                driver.switch_to.default_content()
+                driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'center'});", el)
             except Exception:
                 pass
+            try:
+                simulate_human_mouse_move(driver, el)
+            except Exception:
+                pass
+            ActionChains(driver).move_to_element(el).click(el).perform()
+        except Exception:
+            driver.execute_script('arguments[0].click();', el)
+        return True
+    except Exception:
+        return False
+    finally:
+        try:
+            driver.switch_to.default_content()
+        except Exception:
+            pass
 
+
+def click_consent(driver, timeout=8, variants=None):
+    """Robust consent click:
+    - one script scans the main document and same-origin iframes for the known
+      CSS selector, then role/button elements and loose text matching a variant
+    - candidates are tried in rank order, one click attempt each
+    Returns True if clicked, False otherwise.
+    """
+    for cand in find_consent_candidates(driver, variants):
+        where = 'iframe' if cand.get('path') else 'main doc'
+        print(f"Found consent candidate (rank {cand.get('rank')}) in {where}: {cand.get('text')!r}")
+        if _click_consent_candidate(driver, cand):
+            time.sleep(0.5)
+            return True
     return False
 
 
@@ -247,13 +181,55 @@ def harden_driver(driver):
         pass
 
 
-def main():
+class SessionSaver:
+    """Incremental session snapshots for one driver.
+
+    Snapshots go through a CDPSession on the tab, so cookies and storages are read
+    in one round-trip; without DevTools they fall back to WebDriver. The legacy
+    tools/session.json and tools/storage.json are exported once, by close(), from
+    the last snapshot instead of being rewritten on every save.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.session = None
+        self.last = None
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            try:
+                self.session = attach_page_session(self.driver)
+            except Exception as e:
+                print('CDP session unavailable for snapshots, using WebDriver:', e)
+                self.session = None
+        return self.session
+
+    def save(self):
+        try:
+            self.last = save_session_snapshot(self.driver, session=self._session())
+        except Exception as e:
+            print('Failed to save session snapshot:', e)
+
+    def close(self):
+        if self.last is not None:
+            try:
+                export_legacy_files(self.last)
+            except Exception as e:
+                print('Failed to export session.json/storage.json:', e)
+        if self.session is not None:
+            self.session.close()
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('--user-data-dir', help='Chrome profile dir', default=str(TOOLS_DIR / '.chrome_profile_uc'))
     parser.add_argument('--chromedriver', help='Path to chromedriver executable', default=None)
+    parser.add_argument('--attach', metavar='HOST:PORT', help='use the Chrome already listening on this debugging address')
     parser.add_argument('--no-login', action='store_true', help='Do not perform credential submission')
     parser.add_argument('--keep-open', action='store_true', help="Don't quit the browser at the end; wait for Enter")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
 
     user = os.environ.get('VINTED_USER')
     pwd = os.environ.get('VINTED_PASS')
@@ -261,28 +237,19 @@ def main():
         print('Set VINTED_USER and VINTED_PASS or run with --no-login')
         return
 
-    options = Options()
-    options.add_argument(f"--user-data-dir={args.user_data_dir}")
-    options.add_argument('--no-first-run')
-    options.add_argument('--no-default-browser-check')
-    options.add_argument('--window-size=1200,800')
-    # anti-automation flags
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option('excludeSwitches', ['enable-automation'])
-    options.add_experimental_option('useAutomationExtension', False)
-    options.add_argument('--lang=fr-FR')
-
-    chromedriver_path = args.chromedriver
-
-    def start_driver():
-        if chromedriver_path:
-            svc = Service(chromedriver_path)
-            return webdriver.Chrome(service=svc, options=options)
-        if uc is not None:
-            return uc.Chrome(options=options)
-        return webdriver.Chrome(options=options)
-
-    driver = start_driver()
+    options = None
+    if not args.attach:
+        options = chrome_options('selenium', ['--no-first-run', '--no-default-browser-check', '--window-size=1200,800'],
+                                 user_data_dir=args.user_data_dir)
+        # anti-automation flags
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        options.add_experimental_option('useAutomationExtension', False)
+        options.add_argument('--lang=fr-FR')
+
+    # an explicit chromedriver means plain selenium, otherwise undetected_chromedriver
+    driver = start_driver('selenium' if args.chromedriver else 'uc', options=options,
+                          chromedriver=args.chromedriver, attach=args.attach)
     try:
         harden_driver(driver)
     except Exception:
@@ -297,17 +264,18 @@ def main():
     except Exception:
         pass
     # WebDriverWait available via explicit calls if needed
+    # readiness waits (readyState + network idle) replace fixed sleeps after plain navigations
+    waiter = PageWaiter(driver)
+    snapshots = SessionSaver(driver)
 
     try:
         # 1) Wikipedia
         print('Visiting Wikipedia...')
-        driver.get('https://fr.wikipedia.org/wiki/Accueil')
-        time.sleep(1.5)
+        navigate(driver, 'https://fr.wikipedia.org/wiki/Accueil', waiter=waiter, timeout=10)
 
         # 2) Google FR
         print('Visiting Google.fr...')
-        driver.get('https://www.google.fr')
-        time.sleep(1.2)
+        navigate(driver, 'https://www.google.fr', waiter=waiter, timeout=10)
 
         # accept consent if present
         try:
@@ -390,8 +358,7 @@ def main():
 
         # 5) go to vinted login page explicitly (best-effort)
         try:
-            driver.get("https://www.vinted.fr/member/signup/select_type?ref_url=%2F")
-            time.sleep(1.0)
+            navigate(driver, "https://www.vinted.fr/member/signup/select_type?ref_url=%2F", waiter=waiter, timeout=10)
         except Exception:
             pass
 
@@ -403,16 +370,21 @@ def main():
 
         # capture_post_response is provided by tools.python.interaction.capture_post_response
 
-        # save_storage is provided by tools.python.utils.save_storage
+        # save_session_snapshot is provided by tools.python.utils.save_session_snapshot
 
         def do_vinted_login_flow(driver, user, pwd):
             try:
                 # ensure on target page
                 try:
-                    driver.get('https://www.vinted.fr/member/signup/select_type?ref_url=%2F')
+                    navigate(
+                        driver,
+                        'https://www.vinted.fr/member/signup/select_type?ref_url=%2F',
+                        waiter=waiter,
+                        timeout=15,
+                        selector="[data-testid='auth-select-type--register-switch']",
+                    )
                 except Exception:
                     pass
-                time.sleep(3)
                 try:
                     # small mouse move
                     pre_search_humanize(driver)
@@ -468,11 +440,13 @@ def main():
                     if not ok:
                         print('Captcha not resolved within timeout')
                         return None
-                # prepare performance capture
+                # start recording network before submitting so the login response cannot be missed
                 try:
-                    driver.execute_cdp_cmd('Network.enable', {})
-                except Exception:
-                    pass
+                    recorder = NetworkRecorder.attach(driver)
+                except Exception as e:
+                    # capture_post_response then reads the buffered performance log
+                    print('Network recorder unavailable, falling back to the performance log:', e)
+                    recorder = None
                 # submit
                 try:
                     submit = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
@@ -491,25 +465,21 @@ def main():
                     except Exception:
                         print('No submit button found')
                 # capture network response for POST
-                resp = capture_post_response(driver, timeout=12)
+                try:
+                    resp = capture_post_response(driver, timeout=12, recorder=recorder)
+                finally:
+                    if recorder is not None:
+                        recorder.close()
                 if resp:
                     try:
                         save_login_response(resp)
                     except Exception as e:
                         print('Failed to save login response:', e)
-                # 14) save cookies + storage
-                try:
-                    save_cookies(driver)
-                except Exception:
-                    pass
-                try:
-                    save_storage(driver)
-                except Exception:
-                    pass
+                # 14) save cookies + storage (one snapshot; session.json/storage.json are exported at exit)
+                snapshots.save()
                 # 15) navigate to /items/new and save html + screenshot
                 try:
-                    driver.get('https://www.vinted.fr/items/new')
-                    time.sleep(2)
+                    navigate(driver, 'https://www.vinted.fr/items/new', waiter=waiter, timeout=15)
                     html = driver.page_source
                     with open(TOOLS_DIR / 'last-capture-items-new.html', 'w') as f:
                         f.write(html)
@@ -549,11 +519,8 @@ def main():
         except Exception as e:
             print('Captcha check failed:', e)
 
-        # save cookies
-        try:
-            save_cookies(driver)
-        except Exception:
-            pass
+        # save cookies + storage (incremental: only a diff is written if something changed)
+        snapshots.save()
 
     finally:
         # optionally keep the browser open for inspection
@@ -567,6 +534,17 @@ def main():
                     pass
         except Exception:
             pass
+        try:
+            waiter.close()
+        except Exception:
+            pass
+        # legacy session.json/storage.json, once, from the last snapshot
+        snapshots.close()
+        # click-failure artifacts are captured in the background from this driver
+        try:
+            flush_failure_artifacts(timeout=10)
+        except Exception:
+            pass
         try:
             driver.quit()
         except Exception:
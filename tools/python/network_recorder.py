@@ -0,0 +1,213 @@
+"""Streaming network recorder on top of a CDPSession.
+
+Network events are decoded once by the session reader thread and folded into
+an index keyed by requestId. Response bodies are fetched eagerly when the
+request finishes, but only for requests matching a body filter (or a pending
+wait_for predicate), on a small bounded worker pool.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .cdp_utils import attach_page_session
+
+
+class NetworkRecorder:
+    def __init__(self, session, body_filter=None, max_body_workers=2, max_body_bytes=5 * 1024 * 1024, max_entries=5000):
+        self.session = session
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self._cond = threading.Condition()
+        self._body_filters = [body_filter] if body_filter else []
+        self._pool = ThreadPoolExecutor(max_workers=max_body_workers, thread_name_prefix='cdp-body')
+        self._handlers = {
+            'Network.requestWillBeSent': self._on_request,
+            'Network.responseReceived': self._on_response,
+            'Network.loadingFinished': self._on_finished,
+            'Network.loadingFailed': self._on_failed,
+        }
+        for method, cb in self._handlers.items():
+            session.on(method, cb)
+
+    @classmethod
+    def attach(cls, driver, **kwargs):
+        """Attach to the driver's current tab and enable the Network domain."""
+        rec = cls(attach_page_session(driver), **kwargs)
+        rec.start()
+        return rec
+
+    def start(self):
+        self.session.send('Network.enable', {})
+        return self
+
+    def close(self, owns_session=True):
+        for method, cb in self._handlers.items():
+            self.session.off(method, cb)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if owns_session:
+            self.session.close()
+        with self._cond:
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def in_flight(self):
+        with self._cond:
+            return sum(1 for e in self.entries.values() if e['state'] in ('pending', 'response'))
+
+    # --- event handlers (reader thread) ---
+
+    def _entry(self, rid):
+        e = self.entries.get(rid)
+        if e is None:
+            e = {'requestId': rid, 'url': '', 'method': None, 'state': 'pending', 'status': None,
+                 'mimeType': None, 'headers': None, 'timing': None, 'encodedDataLength': None,
+                 'startedAt': time.monotonic(), 'finishedAt': None, 'body': None, 'bodyError': None}
+            self.entries[rid] = e
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return e
+
+    def _on_request(self, params):
+        rid = params.get('requestId')
+        if not rid:
+            return
+        req = params.get('request') or {}
+        with self._cond:
+            e = self._entry(rid)
+            e['url'] = req.get('url', e['url'])
+            e['method'] = req.get('method')
+            e['type'] = params.get('type')
+            self._cond.notify_all()
+
+    def _on_response(self, params):
+        rid = params.get('requestId')
+        if not rid:
+            return
+        resp = params.get('response') or {}
+        with self._cond:
+            e = self._entry(rid)
+            e['url'] = resp.get('url') or e['url']
+            e['state'] = 'response'
+            e['status'] = resp.get('status')
+            e['mimeType'] = resp.get('mimeType')
+            e['headers'] = resp.get('headers')
+            e['timing'] = resp.get('timing')
+            self._cond.notify_all()
+
+    def _on_finished(self, params):
+        rid = params.get('requestId')
+        with self._cond:
+            e = self.entries.get(rid)
+            if e is None:
+                return
+            e['state'] = 'finished'
+            e['finishedAt'] = time.monotonic()
+            e['encodedDataLength'] = params.get('encodedDataLength')
+            fetch = self._wants_body(e)
+            if fetch:
+                e['bodyState'] = 'queued'
+            self._cond.notify_all()
+        if fetch:
+            self._queue_body(rid)
+
+    def _on_failed(self, params):
+        rid = params.get('requestId')
+        with self._cond:
+            e = self.entries.get(rid)
+            if e is None:
+                return
+            e['state'] = 'failed'
+            e['finishedAt'] = time.monotonic()
+            e['bodyError'] = params.get('errorText') or 'failed'
+            self._cond.notify_all()
+
+    # --- bodies ---
+
+    def _wants_body(self, e):
+        if e.get('bodyState') or e['state'] != 'finished':
+            return False
+        size = e.get('encodedDataLength') or 0
+        if size > self.max_body_bytes:
+            e['bodyError'] = f'body too large ({size} bytes)'
+            return False
+        for f in self._body_filters:
+            try:
+                if f(e):
+                    return True
+            except Exception:
+                continue
+        return False
+
+    def _queue_body(self, rid):
+        try:
+            self._pool.submit(self._fetch_body, rid)
+        except RuntimeError:
+            pass
+
+    def _fetch_body(self, rid):
+        try:
+            body = self.session.send('Network.getResponseBody', {'requestId': rid})
+            err = None
+        except Exception as ex:
+            body, err = None, str(ex) or 'getResponseBody failed'
+        with self._cond:
+            e = self.entries.get(rid)
+            if e is not None:
+                e['body'] = body
+                e['bodyError'] = err
+                e['bodyState'] = 'done'
+            self._cond.notify_all()
+
+    # --- waiting ---
+
+    def wait_for(self, predicate, timeout=10, with_body=True):
+        """Return the first entry with a response matching predicate, or None on timeout.
+
+        With with_body, the predicate also drives eager body fetching and entries
+        whose body could not be retrieved are skipped.
+        """
+        def matches(e):
+            if e['state'] == 'pending':
+                return False
+            try:
+                return bool(predicate(e))
+            except Exception:
+                return False
+
+        end = time.monotonic() + timeout
+        late = []
+        if with_body:
+            with self._cond:
+                self._body_filters.append(predicate)
+                for e in self.entries.values():
+                    if self._wants_body(e):
+                        e['bodyState'] = 'queued'
+                        late.append(e['requestId'])
+        for rid in late:
+            self._queue_body(rid)
+        try:
+            with self._cond:
+                while True:
+                    for e in self.entries.values():
+                        if not matches(e):
+                            continue
+                        if not with_body:
+                            return dict(e)
+                        if e.get('bodyState') == 'done' and e.get('body') is not None:
+                            return dict(e)
+                    remaining = end - time.monotonic()
+                    if remaining <= 0 or self.session.closed:
+                        return None
+                    self._cond.wait(remaining)
+        finally:
+            if with_body:
+                with self._cond:
+                    if predicate in self._body_filters:
+                        self._body_filters.remove(predicate)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Offline bulk extraction of RepublishDraft objects from saved item pages.
+
+Python port of src/lib/extractor.ts::extractDraftFromDocument (same selectors,
+parsePrice, splitColors, breadcrumb compaction and image dedupe) on top of
+lxml, for corpora of diag_vinted page dumps or tests/fixtures pages.
+
+Usage:
+  python3 -m tools.python.offline_extractor <dir|file|glob>... [-o drafts.jsonl] [--workers N]
+  python3 -m tools.python.offline_extractor --check [tests/fixtures]
+
+Each output line is a RepublishDraft (undefined fields omitted, as JSON.stringify
+does) plus "_source" (and "_error" when the page could not be parsed).
+
+--check compares the extraction of every <name>.html that has a
+<name>.expected.json next to it; tests/extractor.parity.test.ts checks the TS
+extractor against the same files, which keeps both implementations in step.
+"""
+import argparse
+import copy
+import glob
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urljoin
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+FIXTURES_DIR = REPO_ROOT / 'tests' / 'fixtures'
+
+# selectors, verbatim from extractor.ts
+SEL_TITLE = '[data-testid="item-title"], .box--item-details h1, h1'
+SEL_DESCRIPTION = ('[itemprop="description"]', '[data-testid="item-description"]', '.Item__description')
+SEL_PRICE = '[data-testid="item-price"], [data-testid="item-price"] p, .details-list--pricing'
+SEL_CONDITION = ('[data-testid="item-attributes-status"] [itemprop="status"], '
+                 '[data-testid="item-attributes-status"] .details-list__item-value:last-child')
+SEL_SIZE = ('[data-testid="item-attributes-size"] [itemprop="size"], '
+            '[data-testid="item-attributes-size"] .details-list__item-value:last-child')
+SEL_MATERIAL = ('[data-testid="item-attributes-material"] [itemprop="material"], '
+                '[data-testid="item-attributes-material"] .details-list__item-value:last-child')
+SEL_COLOR = ('[data-testid="item-attributes-color"] [itemprop="color"], '
+             '[data-testid="item-attributes-color"] .details-list__item-value:last-child')
+SEL_IMAGES = '[data-testid^="item-photo-"] img, .item-photos img'
+SEL_BREADCRUMBS = '.breadcrumbs li [itemprop="title"], .breadcrumbs li span, .breadcrumbs__item span'
+
+# JS regexes are ASCII-only for \b and \s classes used here, hence re.ASCII where it matters
+PRICE_RE = re.compile(
+    r'(?:\b|^)(?:\s*)(€|eur|euro|euros|usd|£|gbp|chf)?\s*([0-9]+(?:[.,][0-9]{1,2})?)\s*(€|eur|euro|euros|usd|£|gbp|chf)?',
+    re.IGNORECASE | re.ASCII,
+)
+COLOR_SPLIT_RE = re.compile(r',|/|·|•|\u2022|\u00B7|\s+/\s+|\s*\+\s*')
+UNISEX_RE = re.compile(r'\bunisexe\b|\bunisex\b', re.ASCII)
+WS_RE = re.compile(r'\s+')
+
+_selectors = {}
+
+
+def _css(sel):
+    s = _selectors.get(sel)
+    if s is None:
+        from lxml.cssselect import CSSSelector
+
+        s = _selectors[sel] = CSSSelector(sel, translator='html')
+    return s
+
+
+def _first(root, sel):
+    # XPath unions come back in document order, like querySelector on a selector list
+    found = _css(sel)(root)
+    return found[0] if found else None
+
+
+def _text(el):
+    return el.text_content() if el is not None else ''
+
+
+def _squash(text):
+    return WS_RE.sub(' ', text or '').strip()
+
+
+def _num(v):
+    return int(v) if v.is_integer() else v
+
+
+def parse_price(text):
+    if not text:
+        return {}
+    raw = WS_RE.sub(' ', text).strip()
+    m = PRICE_RE.search(raw)
+    if not m:
+        return {}
+    leading, numeric, trailing = m.groups()
+    try:
+        value = float((numeric or '').replace(',', '.', 1))
+    except ValueError:
+        value = None
+    cur = trailing or leading
+    cur = cur.upper() if cur else None
+    if cur == '€':
+        cur = 'EUR'
+    out = {}
+    if value is not None:
+        out['value'] = _num(value)
+    if cur is not None:
+        out['currency'] = cur
+    return out
+
+
+def split_colors(text):
+    if not text:
+        return None
+    parts = [p.strip() for p in COLOR_SPLIT_RE.split(text)]
+    parts = [p for p in parts if p]
+    return parts or None
+
+
+def compact_category_path(path):
+    normalized = [label.strip() for label in path if label.strip()]
+    if len(normalized) <= 1:
+        return normalized
+    collapsed = [label for i, label in enumerate(normalized) if i == 0 or label != normalized[i - 1]]
+    for block_size in range(1, len(collapsed) // 2 + 1):
+        if len(collapsed) % block_size:
+            continue
+        block = collapsed[:block_size]
+        if all(collapsed[i] == block[i % block_size] for i in range(len(collapsed))):
+            return block
+    return collapsed
+
+
+def dedupe_images(urls):
+    seen = set()
+    out = []
+    for url in urls:
+        if url and url not in seen:
+            seen.add(url)
+            out.append(url)
+    return out
+
+
+def extract_draft(html, base_url=None):
+    """Extract a RepublishDraft dict from page HTML (str or bytes)."""
+    import lxml.html
+
+    doc = lxml.html.document_fromstring(html)
+
+    title = _squash(_text(_first(doc, SEL_TITLE)))
+
+    description = ''
+    desc = None
+    for sel in SEL_DESCRIPTION:
+        desc = _first(doc, sel)
+        if desc is not None:
+            break
+    if desc is not None:
+        # offline there is no "... plus" button to click; only drop button labels
+        clone = copy.deepcopy(desc)
+        for b in clone.xpath('.//button'):
+            b.drop_tree()
+        description = _squash(clone.text_content())
+
+    price = parse_price(_text(_first(doc, SEL_PRICE)).strip())
+    condition = _squash(_text(_first(doc, SEL_CONDITION)))
+    size = _squash(_text(_first(doc, SEL_SIZE)))
+    material = _squash(_text(_first(doc, SEL_MATERIAL)))
+    color = split_colors(_squash(_text(_first(doc, SEL_COLOR))))
+
+    images = []
+    for img in _css(SEL_IMAGES)(doc):
+        src = img.get('src') or ''
+        if src and base_url:
+            src = urljoin(base_url, src)
+        if src:
+            images.append(src)
+
+    raw_path = []
+    for el in _css(SEL_BREADCRUMBS)(doc):
+        t = (el.text_content() or '').strip()
+        if t and t.lower() not in ('accueil', 'home'):
+            raw_path.append(t)
+    category_path = compact_category_path(raw_path)
+
+    unisex = None
+    h1 = _first(doc, 'h1')
+    header = h1.getparent() if h1 is not None and h1.getparent() is not None else doc.find('body')
+    if header is None:
+        header = doc
+    if UNISEX_RE.search(header.text_content().lower()):
+        unisex = True
+
+    draft = {
+        'title': title,
+        'description': description,
+        'images': dedupe_images(images),
+        'priceValue': price.get('value'),
+        'currency': price.get('currency'),
+        'condition': condition or None,
+        'size': size or None,
+        'material': material or None,
+        'color': color,
+        'categoryPath': category_path or None,
+        'unisex': unisex,
+    }
+    return {k: v for k, v in draft.items() if v is not None}
+
+
+def extract_file(path, base_url=None):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            # saved pages are UTF-8 (diag dumps, fixtures); lxml would guess latin-1 without a meta charset
+            data = data.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+        draft = extract_draft(data, base_url=base_url)
+    except Exception as e:
+        return {'title': '', 'description': '', 'images': [], '_source': str(path), '_error': str(e)}
+    draft['_source'] = str(path)
+    return draft
+
+
+def iter_inputs(inputs):
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            for f in sorted(p.rglob('*.htm*')):
+                if f.suffix.lower() in ('.html', '.htm'):
+                    yield f
+        elif p.exists():
+            yield p
+        else:
+            for f in sorted(glob.glob(item, recursive=True)):
+                yield Path(f)
+
+
+def run_corpus(inputs, out, workers=None, base_url=None, chunksize=16):
+    """Stream one JSONL draft per page to out (file object) using a process pool."""
+    paths = list(iter_inputs(inputs))
+    n = errors = 0
+    if workers == 1 or len(paths) < 2:
+        results = (extract_file(p, base_url) for p in paths)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(extract_file, paths, [base_url] * len(paths), chunksize=chunksize)
+    try:
+        for draft in results:
+            n += 1
+            errors += 1 if '_error' in draft else 0
+            out.write(json.dumps(draft, ensure_ascii=False, separators=(',', ':')) + '\n')
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    out.flush()
+    return n, errors
+
+
+def check_parity(fixtures_dir=FIXTURES_DIR, base_url=None):
+    """Compare extraction with every <name>.expected.json; returns the list of mismatches."""
+    mismatches = []
+    for expected_path in sorted(Path(fixtures_dir).glob('*.expected.json')):
+        html_path = expected_path.with_name(expected_path.name[:-len('.expected.json')] + '.html')
+        with open(expected_path, encoding='utf-8') as f:
+            expected = json.load(f)
+        got = extract_file(html_path, base_url)
+        got.pop('_source', None)
+        if got != expected:
+            keys = sorted(set(got) | set(expected))
+            diff = {k: {'python': got.get(k), 'expected': expected.get(k)} for k in keys if got.get(k) != expected.get(k)}
+            mismatches.append({'fixture': str(html_path), 'diff': diff})
+        print(('OK   ' if got == expected else 'FAIL ') + str(html_path), file=sys.stderr)
+    return mismatches
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Extract RepublishDraft JSONL from saved Vinted item pages')
+    p.add_argument('inputs', nargs='*', help='HTML files, directories (recursive) or globs')
+    p.add_argument('-o', '--output', help='JSONL output file (default: stdout)')
+    p.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    p.add_argument('--base-url', default=None, help='resolve relative image URLs against this URL')
+    p.add_argument('--check', nargs='?', const=str(FIXTURES_DIR), default=None,
+                   help='parity check against <name>.expected.json files (default: tests/fixtures)')
+    args = p.parse_args(argv)
+
+    if args.check is not None:
+        mismatches = check_parity(args.check, args.base_url)
+        for m in mismatches:
+            print(json.dumps(m, ensure_ascii=False, indent=2))
+        return 1 if mismatches else 0
+    if not args.inputs:
+        p.error('no inputs given')
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        n, errors = run_corpus(args.inputs, out, workers=args.workers or os.cpu_count(), base_url=args.base_url)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f'{n} pages extracted, {errors} errors', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Condition-based page readiness waits.
+
+A page is ready when document.readyState is 'complete', the optional selector
+is present and, if network idle detection is available, no more than
+max_inflight requests have been in flight for quiet_window seconds. Every wait
+returns how long each condition took so slow phases show up in the logs.
+"""
+import threading
+import time
+
+from .cdp_utils import attach_page_session
+
+# long-lived requests that never "finish" and would block idle detection
+IGNORED_TYPES = ('EventSource', 'WebSocket')
+
+
+class NetworkIdleTracker:
+    """Counts in-flight requests of one tab from CDP Network events."""
+
+    def __init__(self, session):
+        self.session = session
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self.last_activity = time.monotonic()
+        session.on('Network.requestWillBeSent', self._on_start)
+        session.on('Network.loadingFinished', self._on_done)
+        session.on('Network.loadingFailed', self._on_done)
+        session.send('Network.enable', {})
+
+    @classmethod
+    def attach(cls, driver):
+        return cls(attach_page_session(driver))
+
+    def _on_start(self, params):
+        if params.get('type') in IGNORED_TYPES:
+            return
+        with self._lock:
+            self._inflight.add(params.get('requestId'))
+            self.last_activity = time.monotonic()
+
+    def _on_done(self, params):
+        with self._lock:
+            self._inflight.discard(params.get('requestId'))
+            self.last_activity = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._inflight.clear()
+            self.last_activity = time.monotonic()
+
+    def inflight(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def close(self):
+        self.session.close()
+
+
+class PageWaiter:
+    """Readiness waiter bound to one driver; reuse it across navigations of the same tab."""
+
+    def __init__(self, driver, network_idle=True, verbose=True):
+        self.driver = driver
+        self.verbose = verbose
+        self.tracker = None
+        if network_idle:
+            try:
+                self.tracker = NetworkIdleTracker.attach(driver)
+            except Exception as e:
+                print('readiness: network idle detection unavailable:', e)
+
+    def close(self):
+        if self.tracker is not None:
+            self.tracker.close()
+            self.tracker = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, url, **kwargs):
+        """driver.get(url) then wait(); the load itself is reported as load_s."""
+        if self.tracker is not None:
+            self.tracker.reset()
+        t0 = time.monotonic()
+        self.driver.get(url)
+        load_s = time.monotonic() - t0
+        res = self.wait(label=url, **kwargs)
+        res['load_s'] = round(load_s, 3)
+        return res
+
+    def wait(self, timeout=15, selector=None, max_inflight=0, quiet_window=0.5, poll=0.1, label=None):
+        """Block until the page is ready or timeout; returns a timing report."""
+        t0 = time.monotonic()
+        end = t0 + timeout
+        res = {'ready': False, 'dom_s': None, 'selector_s': None, 'idle_s': None}
+        while True:
+            now = time.monotonic()
+            if res['dom_s'] is None:
+                try:
+                    if self.driver.execute_script('return document.readyState') == 'complete':
+                        res['dom_s'] = round(now - t0, 3)
+                except Exception:
+                    pass
+            if selector and res['selector_s'] is None:
+                try:
+                    found = self.driver.execute_script('return !!document.querySelector(arguments[0])', selector)
+                    if found:
+                        res['selector_s'] = round(now - t0, 3)
+                except Exception:
+                    pass
+            if self.tracker is not None and res['idle_s'] is None:
+                if self.tracker.inflight() <= max_inflight and now - self.tracker.last_activity >= quiet_window:
+                    res['idle_s'] = round(now - t0, 3)
+            done = res['dom_s'] is not None
+            done = done and (not selector or res['selector_s'] is not None)
+            done = done and (self.tracker is None or res['idle_s'] is not None)
+            if done or now >= end:
+                res['ready'] = done
+                break
+            time.sleep(poll)
+        res['waited_s'] = round(time.monotonic() - t0, 3)
+        if self.tracker is not None:
+            res['inflight'] = self.tracker.inflight()
+        if self.verbose:
+            state = 'ready' if res['ready'] else 'NOT ready'
+            print(f"readiness: {label or 'page'} {state} after {res['waited_s']}s "
+                  f"(dom {res['dom_s']}, selector {res['selector_s']}, idle {res['idle_s']})")
+        return res
+
+
+def navigate(driver, url, waiter=None, network_idle=True, **kwargs):
+    """Load url and wait for readiness; pass a PageWaiter to reuse its CDP connection."""
+    if waiter is not None:
+        return waiter.get(url, **kwargs)
+    with PageWaiter(driver, network_idle=network_idle) as w:
+        return w.get(url, **kwargs)
+
+
+def wait_until_ready(driver, network_idle=True, **kwargs):
+    """Wait for the current page; idle detection only sees requests from now on."""
+    with PageWaiter(driver, network_idle=network_idle) as w:
+        return w.wait(**kwargs)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Selector hit-rate report across a corpus of saved pages.
+
+The selector inventory is scanned from the extension sources (every string
+literal in src/lib and src/content that looks like a CSS selector), so it
+follows the code without a hand-kept list. Selector lists ("a, b, c") are also
+split into their alternatives, since a dead alternative still costs a full
+document query on every poll of a wait loop.
+
+Usage:
+  python3 -m tools.python.selector_report <dir|file|glob>... [--json report.json] [--compare old.json]
+
+For each selector the report gives the share of pages where it matches, the
+mean match count, the median first-match cost on a page and, with --compare,
+the hit-rate drift against a previous report (e.g. the corpus captured before
+a Vinted markup change). The first-match cost times the selector's XPath
+wrapped in (...)[1], the querySelector() of the wait loops, not the count
+query; a selector that never matches pays a full document scan. It is an lxml
+figure, relative between selectors, not browser time.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .offline_extractor import iter_inputs
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_SOURCES = ('src/lib', 'src/content')
+
+LITERAL_RE = re.compile(r"'((?:[^'\\\n]|\\.)*)'|\"((?:[^\"\\\n]|\\.)*)\"|`([^`$\\]*)`")
+
+
+def _split_alternatives(sel):
+    """Split a selector list on top-level commas (not inside [] or ())."""
+    parts, depth, cur, quote = [], 0, '', None
+    for ch in sel:
+        if quote:
+            cur += ch
+            if ch == quote:
+                quote = None
+            continue
+        if ch in '"\'':
+            quote = ch
+        elif ch in '[(':
+            depth += 1
+        elif ch in '])':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(cur.strip())
+            cur = ''
+            continue
+        cur += ch
+    if cur.strip():
+        parts.append(cur.strip())
+    return parts
+
+
+# lowercase attribute names only: '[VX]' and '[object Object]' are log text
+ATTR_RE = re.compile(r'\[\s*[a-z_-][\w.-]*\s*(?:[~|^$*]?=|\])')
+# '.png', '.de': file extensions and TLDs; '#fff': colours
+NOT_SELECTOR_RE = re.compile(r'^(?:\.[a-z]{2,4}|#[0-9a-fA-F]{3,8})$')
+
+
+def _looks_like_selector(text):
+    if not text or len(text) > 600 or '\n' in text or '://' in text:
+        return False
+    if ATTR_RE.search(text):
+        return True
+    return re.match(r'^[.#][A-Za-z_-]', text) is not None and not NOT_SELECTOR_RE.match(text)
+
+
+def scan_selectors(sources=DEFAULT_SOURCES, root=REPO_ROOT):
+    """Return [{'selector', 'where': [file:line...], 'parent'}] for every selector literal."""
+    found = {}
+    for src in sources:
+        base = Path(root) / src
+        files = [base] if base.is_file() else sorted(base.rglob('*.ts'))
+        for f in files:
+            text = f.read_text(encoding='utf-8', errors='replace')
+            for m in LITERAL_RE.finditer(text):
+                lit = next(g for g in m.groups() if g is not None)
+                if not _looks_like_selector(lit):
+                    continue
+                line = text.count('\n', 0, m.start()) + 1
+                where = f'{f.relative_to(root)}:{line}'
+                alts = _split_alternatives(lit)
+                entries = [(lit, None)]
+                if len(alts) > 1:
+                    entries += [(a, lit) for a in alts]
+                for sel, parent in entries:
+                    e = found.setdefault(sel, {'selector': sel, 'where': [], 'parent': parent})
+                    if where not in e['where']:
+                        e['where'].append(where)
+    return list(found.values())
+
+
+_compiled = {}
+
+
+def _compile(sel):
+    if sel not in _compiled:
+        try:
+            from lxml.cssselect import CSSSelector
+
+            _compiled[sel] = CSSSelector(sel, translator='html')
+        except Exception:
+            _compiled[sel] = None
+    return _compiled[sel]
+
+
+_first = {}
+
+
+def _compile_first(sel):
+    """XPath returning only the first match in document order, like querySelector()."""
+    if sel not in _first:
+        fn = _compile(sel)
+        try:
+            from lxml import etree
+
+            _first[sel] = etree.XPath(f'({fn.path})[1]') if fn is not None else None
+        except Exception:
+            _first[sel] = None
+    return _first[sel]
+
+
+def evaluate_page(args):
+    """Worker: run every selector on one page; returns {selector: [count, first_match_us]} or an error."""
+    path, selectors = args
+    import lxml.html
+
+    try:
+        data = Path(path).read_bytes()
+        try:
+            data = data.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+        doc = lxml.html.document_fromstring(data)
+    except Exception as e:
+        return str(path), None, str(e)
+    out = {}
+    for sel in selectors:
+        fn, first = _compile(sel), _compile_first(sel)
+        if fn is None or first is None:
+            continue
+        t0 = time.perf_counter()
+        first(doc)
+        cost = round((time.perf_counter() - t0) * 1e6, 1)
+        out[sel] = [len(fn(doc)), cost]
+    return str(path), out, None
+
+
+def build_report(inputs, sources=DEFAULT_SOURCES, workers=None):
+    inventory = scan_selectors(sources)
+    selectors = [e['selector'] for e in inventory]
+    unsupported = [s for s in selectors if _compile(s) is None or _compile_first(s) is None]
+    paths = [str(p) for p in iter_inputs(inputs)]
+    stats = {s: {'hits': 0, 'matches': 0, 'costs': []} for s in selectors}
+    errors = {}
+    pages = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, res, err in pool.map(evaluate_page, [(p, selectors) for p in paths], chunksize=4):
+            if err:
+                errors[path] = err
+                continue
+            pages += 1
+            for sel, (n, cost) in res.items():
+                st = stats[sel]
+                st['hits'] += 1 if n else 0
+                st['matches'] += n
+                st['costs'].append(cost)
+    rows = []
+    for e in inventory:
+        sel = e['selector']
+        st = stats[sel]
+        row = dict(e)
+        if sel in unsupported:
+            row.update({'supported': False})
+        else:
+            row.update({
+                'supported': True,
+                'hit_rate': round(st['hits'] / pages, 4) if pages else 0.0,
+                'mean_matches': round(st['matches'] / pages, 2) if pages else 0.0,
+                'median_first_match_us': statistics.median(st['costs']) if st['costs'] else None,
+            })
+        rows.append(row)
+    return {'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'pages': pages, 'errors': errors, 'selectors': rows}
+
+
+def add_drift(report, previous):
+    before = {r['selector']: r for r in previous.get('selectors') or []}
+    for r in report['selectors']:
+        old = before.get(r['selector'])
+        if old is None or not r.get('supported') or old.get('hit_rate') is None:
+            r['drift'] = None
+            continue
+        r['drift'] = round(r['hit_rate'] - old['hit_rate'], 4)
+    return report
+
+
+def format_report(report):
+    lines = [f"{report['pages']} pages, {len(report['errors'])} unreadable"]
+    rows = [r for r in report['selectors'] if r.get('supported')]
+    rows.sort(key=lambda r: (r['hit_rate'], -(r['median_first_match_us'] or 0)))
+    lines.append(f"{'hit%':>6}  {'mean':>6}  {'first_us':>8}  {'drift':>6}  selector  (where)")
+    for r in rows:
+        drift = r.get('drift')
+        drift_s = f'{drift * 100:+.0f}' if drift else ''
+        cost = r['median_first_match_us']
+        lines.append(
+            f"{r['hit_rate'] * 100:>6.1f}  {r['mean_matches']:>6.2f}  {cost if cost is not None else '-':>8}  {drift_s:>6}  "
+            f"{'  ' if r['parent'] else ''}{r['selector']}  ({', '.join(r['where'][:2])})"
+        )
+    dead = [r for r in rows if r['hit_rate'] == 0]
+    lines.append(f'{len(dead)} selectors never match this corpus')
+    unsupported = [r['selector'] for r in report['selectors'] if not r.get('supported')]
+    if unsupported:
+        lines.append(f'{len(unsupported)} selectors not evaluable offline: ' + ' | '.join(unsupported))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Report hit rates of the extension selectors over saved pages')
+    p.add_argument('inputs', nargs='+', help='HTML files, directories (recursive) or globs')
+    p.add_argument('--sources', nargs='*', default=list(DEFAULT_SOURCES), help='TS sources to scan for selectors')
+    p.add_argument('--workers', type=int, default=None)
+    p.add_argument('--json', help='write the full report as JSON')
+    p.add_argument('--compare', help='previous JSON report to compute hit-rate drift against')
+    args = p.parse_args(argv)
+
+    report = build_report(args.inputs, args.sources, args.workers or os.cpu_count())
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            add_drift(report, json.load(f))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
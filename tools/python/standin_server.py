@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""Local Vinted stand-in for offline runs of the republish flow.
+
+Serves an item page and an /items/new form built from tests/fixtures, plus a
+fake image CDN, with per-route latency and bandwidth so runs of the built
+dist/ extension are reproducible.
+
+Usage:
+  python3 -m tools.python.standin_server [--port 8443] [--profile vinted] [--log requests.jsonl]
+      [--latency image=300] [--bandwidth image=200] [--no-tls]
+
+The extension only injects on https://*.vinted.fr, so Chrome is pointed at the
+stand-in with host resolver rules (see chrome_args()): www.vinted.fr and
+images1.vinted.net both land here over TLS with a throwaway self-signed
+certificate, and the fixture URLs work unchanged. Routes:
+
+  /items/<id>[-slug]   item page (alien-ring-item.html)
+  /items/new           listing form (vinted_items_new_snapshot.html + title,
+                       description, price and photo uploader)
+  /t/<name>            image CDN: a deterministic PNG of --image-kb kB
+  /__standin/log       request log as JSON (/__standin/reset clears it)
+"""
+import argparse
+import json
+import random
+import re
+import shutil
+import ssl
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+FIXTURES_DIR = REPO_ROOT / 'tests' / 'fixtures'
+ITEM_FIXTURE = FIXTURES_DIR / 'alien-ring-item.html'
+FORM_FIXTURE = FIXTURES_DIR / 'vinted_items_new_snapshot.html'
+
+# hosts routed to the stand-in by chrome_args()
+STANDIN_HOSTS = ('*.vinted.fr', 'vinted.fr', '*.vinted.net')
+
+# per-route {latency_ms, kbps}; kbps None means unthrottled
+PROFILES = {
+    'fast': {},
+    'vinted': {
+        'item': {'latency_ms': 250, 'kbps': 2000},
+        'form': {'latency_ms': 300, 'kbps': 2000},
+        'image': {'latency_ms': 80, 'kbps': 1500},
+    },
+    'slow': {
+        'item': {'latency_ms': 1200, 'kbps': 200},
+        'form': {'latency_ms': 1500, 'kbps': 200},
+        'image': {'latency_ms': 400, 'kbps': 100},
+        'other': {'latency_ms': 400, 'kbps': 200},
+    },
+}
+
+ROUTES = ('item', 'form', 'image', 'other')
+
+# appended to the form when the fixture lacks them (selectors from filler.ts and upload.ts)
+FORM_EXTRAS = """
+      <div class="field"><label for="title">Titre</label>
+        <input id="title" name="title" data-testid="title--input" /></div>
+      <div class="field"><label for="description">Description</label>
+        <textarea id="description" name="description" data-testid="description--input"></textarea></div>
+      <div class="field"><label for="price">Prix</label>
+        <input id="price" name="price" inputmode="decimal" data-testid="price-input--input" /></div>
+      <div data-testid="photo-uploader">
+        <div data-testid="dropzone">
+          <input type="file" multiple accept="image/*" />
+          <div role="status" aria-live="assertive"></div>
+        </div>
+        <div data-testid="media-select-grid"></div>
+      </div>
+"""
+
+# the real form lists picked/dropped photos in the grid; the uploader waits for that
+FORM_SCRIPT = """
+    <script>
+      (function () {
+        var zone = document.querySelector('[data-testid="dropzone"]');
+        var grid = document.querySelector('[data-testid="media-select-grid"]');
+        var live = zone && zone.querySelector('[aria-live]');
+        if (!zone || !grid) return;
+        function add(files) {
+          for (var i = 0; i < files.length; i++) {
+            var tile = document.createElement('div');
+            tile.setAttribute('data-testid', 'media-select-grid-item');
+            tile.textContent = files[i].name + ' (' + files[i].size + ' B)';
+            grid.appendChild(tile);
+          }
+          if (live) live.textContent = files.length + ' photo(s)';
+        }
+        zone.addEventListener('change', function (e) { if (e.target.files) add(e.target.files); });
+        zone.addEventListener('dragover', function (e) { e.preventDefault(); });
+        zone.addEventListener('drop', function (e) {
+          e.preventDefault();
+          if (e.dataTransfer && e.dataTransfer.files) add(e.dataTransfer.files);
+        });
+      })();
+    </script>
+"""
+
+
+def chrome_args(port, hosts=STANDIN_HOSTS):
+    """Chrome flags that send the Vinted hosts to a stand-in on 127.0.0.1:port."""
+    rules = ', '.join(f'MAP {h} 127.0.0.1:{port}' for h in hosts)
+    return [f'--host-resolver-rules={rules}', '--ignore-certificate-errors']
+
+
+def make_png(seed, target_bytes):
+    """Deterministic noise PNG of roughly target_bytes (noise does not compress)."""
+    side = max(1, int((target_bytes / 3) ** 0.5))
+    rnd = random.Random(seed)
+    raw = b''.join(b'\x00' + rnd.randbytes(side * 3) for _ in range(side))
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF)
+
+    ihdr = struct.pack('>IIBBBBB', side, side, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', zlib.compress(raw, 1)) + chunk(b'IEND', b'')
+
+
+def self_signed_cert(directory):
+    """Create cert.pem/key.pem for the stand-in hosts with the openssl CLI."""
+    if shutil.which('openssl') is None:
+        raise RuntimeError('openssl not found; pass --cert/--key or use --no-tls')
+    cert, key = Path(directory) / 'cert.pem', Path(directory) / 'key.pem'
+    san = ','.join(f'DNS:{h}' for h in STANDIN_HOSTS + ('localhost',)) + ',IP:127.0.0.1'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '7',
+         '-subj', '/CN=vinted-standin', '-addext', f'subjectAltName={san}',
+         '-keyout', str(key), '-out', str(cert)],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def _classify(path):
+    if path == '/items/new' or path.startswith('/items/new/'):
+        return 'form'
+    if re.match(r'^/items/\d+', path):
+        return 'item'
+    if path.startswith('/t/'):
+        return 'image'
+    return 'other'
+
+
+class StandinServer:
+    """Threaded HTTP(S) server for the stand-in pages; start() returns immediately."""
+
+    def __init__(self, host='127.0.0.1', port=8443, profile='vinted', overrides=None,
+                 tls=True, cert=None, key=None, image_kb=120, rotate_auto='0', log_path=None):
+        self.profile = {r: dict(PROFILES[profile].get(r) or {}) for r in ROUTES}
+        for route, values in (overrides or {}).items():
+            self.profile.setdefault(route, {}).update(values)
+        self.image_kb = image_kb
+        self.rotate_auto = rotate_auto
+        self.log_path = Path(log_path) if log_path else None
+        self._log = []
+        self._lock = threading.Lock()
+        self._images = {}
+        self._tmp = None
+        self._thread = None
+
+        handler = type('Handler', (_Handler,), {'standin': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.tls = tls
+        if tls:
+            if cert is None:
+                self._tmp = tempfile.TemporaryDirectory(prefix='vx-standin-')
+                cert, key = self_signed_cert(self._tmp.name)
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(str(cert), str(key))
+            self.httpd.socket = ctx.wrap_socket(self.httpd.socket, server_side=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def url(self, path='/'):
+        """URL of path as Chrome should open it (via chrome_args when TLS is on)."""
+        if self.tls:
+            return f'https://www.vinted.fr{path}'
+        return f'http://127.0.0.1:{self.port}{path}'
+
+    def chrome_args(self):
+        return chrome_args(self.port) if self.tls else []
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='standin-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread = None
+        self.httpd.server_close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def requests(self):
+        with self._lock:
+            return list(self._log)
+
+    def reset_log(self):
+        with self._lock:
+            self._log.clear()
+
+    def _record(self, entry):
+        with self._lock:
+            self._log.append(entry)
+            if self.log_path is not None:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def item_page(self, origin):
+        html = ITEM_FIXTURE.read_text(encoding='utf-8')
+        if not re.search(r'<html', html, re.I):
+            html = (
+                '<!doctype html>\n<html lang="fr">\n'
+                '<head><meta charset="utf-8"><title>Alien ring</title></head>\n'
+                f'<body>\n{html}\n</body>\n</html>\n'
+            )
+        if not self.tls:
+            # without the host mapping the CDN URLs would go to the real Vinted
+            html = html.replace('https://images1.vinted.net', origin)
+        return html
+
+    def form_page(self):
+        html = FORM_FIXTURE.read_text(encoding='utf-8')
+        if 'name="title"' not in html:
+            html = html.replace('</form>', FORM_EXTRAS + '    </form>', 1)
+        html = html.replace('</body>', FORM_SCRIPT + '  </body>', 1)
+        if self.rotate_auto is not None:
+            # skip the rotation prompt of image-uploader.ts
+            script = f"<script>localStorage.setItem('vx:rotate:auto', {json.dumps(self.rotate_auto)});</script>"
+            html = html.replace('<head>', f'<head>\n    {script}', 1)
+        return html
+
+    def image(self, path):
+        data = self._images.get(path)
+        if data is None:
+            data = self._images[path] = make_png(path, self.image_kb * 1024)
+        return data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    standin = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve()
+
+    def _serve(self, head=False):
+        s = self.standin
+        t0 = time.monotonic()
+        path = urlsplit(self.path).path
+        route = _classify(path)
+        host = self.headers.get('Host') or ''
+        origin = f"{'https' if s.tls else 'http'}://{host}"
+        status, ctype, body = 200, 'text/html; charset=utf-8', None
+
+        if path == '/__standin/log':
+            ctype, body = 'application/json', json.dumps(s.requests()).encode()
+        elif path == '/__standin/reset':
+            s.reset_log()
+            ctype, body = 'application/json', b'{"ok":true}'
+        elif route == 'form':
+            body = s.form_page().encode('utf-8')
+        elif route == 'item':
+            body = s.item_page(origin).encode('utf-8')
+        elif route == 'image':
+            ctype, body = 'image/png', s.image(path)
+        elif path == '/':
+            body = b'<!doctype html><html lang="fr"><body><a href="/items/1234567-alien-ring">item</a></body></html>'
+        else:
+            status, ctype, body = 404, 'text/plain', b'not found'
+
+        prof = s.profile.get(route) or {}
+        latency = (prof.get('latency_ms') or 0) / 1000.0
+        if latency:
+            time.sleep(latency)
+        self.send_response(status)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        if route == 'image':
+            self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        sent = 0
+        if not head:
+            sent = self._write_throttled(body, prof.get('kbps'))
+        s._record({
+            'ts': round(time.time(), 3),
+            'method': self.command,
+            'host': host,
+            'path': self.path,
+            'route': route,
+            'status': status,
+            'bytes': sent,
+            'latency_ms': round(latency * 1000),
+            'duration_ms': round((time.monotonic() - t0) * 1000, 1),
+        })
+
+    def _write_throttled(self, body, kbps):
+        try:
+            if not kbps:
+                self.wfile.write(body)
+                return len(body)
+            # 50 ms slices at the configured rate
+            step = max(1, int(kbps * 1024 / 20))
+            sent = 0
+            for i in range(0, len(body), step):
+                part = body[i:i + step]
+                self.wfile.write(part)
+                self.wfile.flush()
+                sent += len(part)
+                time.sleep(len(part) / (kbps * 1024))
+            return sent
+        except (BrokenPipeError, ConnectionResetError):
+            return 0
+
+
+def _parse_overrides(pairs, key, overrides):
+    for pair in pairs or []:
+        route, _, value = pair.partition('=')
+        if route not in ROUTES or not value:
+            raise SystemExit(f'expected <{"|".join(ROUTES)}>=<number>, got {pair!r}')
+        overrides.setdefault(route, {})[key] = float(value)
+    return overrides
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Serve a local Vinted stand-in built from tests/fixtures')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8443)
+    p.add_argument('--profile', choices=sorted(PROFILES), default='vinted')
+    p.add_argument('--latency', nargs='*', metavar='ROUTE=MS', help='per-route latency override, e.g. image=300')
+    p.add_argument('--bandwidth', nargs='*', metavar='ROUTE=KBPS', help='per-route bandwidth override in kB/s')
+    p.add_argument('--image-kb', type=int, default=120, help='size of the generated CDN images')
+    p.add_argument('--log', help='append every request to this JSONL file')
+    p.add_argument('--no-tls', action='store_true', help='plain HTTP on 127.0.0.1 (no host mapping, no content scripts)')
+    p.add_argument('--cert')
+    p.add_argument('--key')
+    args = p.parse_args(argv)
+
+    overrides = _parse_overrides(args.latency, 'latency_ms', {})
+    overrides = _parse_overrides(args.bandwidth, 'kbps', overrides)
+    server = StandinServer(args.host, args.port, args.profile, overrides, tls=not args.no_tls,
+                           cert=args.cert, key=args.key, image_kb=args.image_kb, log_path=args.log)
+    print(f'Stand-in on port {server.port}, profile {args.profile}: {json.dumps(server.profile)}', file=sys.stderr)
+    if server.tls:
+        print('Chrome flags: ' + ' '.join(f'"{a}"' for a in server.chrome_args()), file=sys.stderr)
+    print('Item page:', server.url('/items/1234567-alien-ring'), file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
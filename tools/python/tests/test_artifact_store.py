@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+import tools.python.artifact_store as artifact_store
+from tools.python.artifact_store import ArtifactStore
+
+pytestmark = pytest.mark.skipif(artifact_store.fcntl is None, reason='needs fcntl.flock')
+
+
+def test_evict_keeps_entries_recorded_meanwhile_by_another_store(tmp_path):
+    a = ArtifactStore(tmp_path)
+    b = ArtifactStore(tmp_path)  # own threading lock: only the file lock orders them
+    for run in ('run_1', 'run_2', 'run_3'):
+        a.record(run, 'step', {})
+    writers = []
+    snapshot = a.entries
+
+    def entries_then_concurrent_record(*args):
+        out = snapshot(*args)
+        t = threading.Thread(target=b.record, args=('run_new', 'step', {}))
+        t.start()
+        t.join(0.2)
+        writers.append(t)
+        return out
+
+    a.entries = entries_then_concurrent_record
+    assert a.evict(max_runs=1, grace_seconds=0) == (2, 0)
+    writers[0].join(5)
+    del a.entries
+    assert [e['run'] for e in a.entries()] == ['run_3', 'run_new']
+
+
+def test_record_waits_for_the_index_lock(tmp_path):
+    a = ArtifactStore(tmp_path)
+    b = ArtifactStore(tmp_path)
+    with a._index_lock():
+        t = threading.Thread(target=b.record, args=('run_1', 'step', {}))
+        t.start()
+        t.join(0.2)
+        assert t.is_alive()
+        assert a.entries() == []
+    t.join(5)
+    assert [e['run'] for e in a.entries()] == ['run_1']
@@ -0,0 +1,32 @@
+from tools.python.fixture_minimizer import minimize_html, minimize_page
+
+PAGE = """<!doctype html><html><head><title>t</title>
+<link rel="preload" href="/a.js" as="script"><script>boot()</script></head>
+<body><div id="noise">ads</div>
+<form id="f"><script>track()</script><noscript><img src="/pixel.gif"></noscript>
+<iframe src="https://tracker.test/"></iframe><input name="title" value="Ring"></form>
+<script type="application/ld+json">{"name": "Ring"}</script>
+</body></html>"""
+
+
+def test_drops_scripts_inside_kept_subtree():
+    out = minimize_html(PAGE, ['form#f'])
+    assert 'name="title"' in out
+    for gone in ('track()', 'boot()', 'pixel.gif', 'tracker.test', 'preload', 'ld+json', 'ads'):
+        assert gone not in out
+
+
+def test_keeps_inert_elements_a_selector_targets():
+    out = minimize_html(PAGE, ['form#f', 'form#f iframe'])
+    assert 'tracker.test' in out
+    assert 'track()' not in out
+
+
+def test_keeps_json_ld_when_the_extraction_needs_it(monkeypatch):
+    import tools.python.fixture_minimizer as fm
+
+    monkeypatch.setattr(fm, '_same_draft', lambda html, expected: 'ld+json' in html)
+    out, check = minimize_page(PAGE, ['form#f'], expected={'title': 'Ring'})
+    assert check['extractor_ok'] is True
+    assert '"name": "Ring"' in out
+    assert 'track()' not in out
@@ -0,0 +1,27 @@
+import json
+
+from tools.python.interaction import capture_post_response
+
+
+class BufferedLogDriver:
+    """Driver whose performance log already holds the login response."""
+
+    def __init__(self):
+        event = {'method': 'Network.responseReceived',
+                 'params': {'requestId': '7', 'response': {'url': 'https://www.vinted.fr/oauth/token/login'}}}
+        self.logs = [{'message': json.dumps({'message': event})}]
+
+    def get_log(self, kind):
+        assert kind == 'performance'
+        logs, self.logs = self.logs, []
+        return logs
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert (cmd, params) == ('Network.getResponseBody', {'requestId': '7'})
+        return {'body': '{"ok":true}', 'base64Encoded': False}
+
+
+def test_reads_a_response_received_before_the_call_without_a_recorder():
+    resp = capture_post_response(BufferedLogDriver(), timeout=1)
+    assert resp['requestId'] == '7'
+    assert resp['body']['body'] == '{"ok":true}'
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Fill and upload under CPU and network throttling: which waits time out or dominate.
+
+Replays the bench_fill flow (dist/ extension, /items/new on the local
+stand-in) once per throttling profile, with Emulation.setCPUThrottlingRate on
+the tab and Network.emulateNetworkConditions on the tab and the extension
+service worker (the images are downloaded there; every worker start is
+auto-attached and throttled before it runs). After every iteration the
+content script's wait records (metrics.recordWait: waitForElement, dropdown
+title changes, drop host, media feedback) are read back, so the report shows,
+per profile, the waits that hit their budget and the ones that take most of
+the fill time.
+
+Usage:
+  npm run build
+  python3 -m tools.python.throttle_report [--profiles none laptop tethering slow-3g] [-n 3] [--json out.json]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .bench_fill import DEFAULT_DRAFT, DIST_DIR, ExtensionPage, build_driver, run_iteration, summarize
+from .cdp_utils import browser_session, debugger_address
+from .standin_server import StandinServer
+
+# cpu: slowdown factor; network: latency ms, throughput kbit/s (DevTools presets for 3G)
+THROTTLE_PROFILES = {
+    'none': {'cpu': 1, 'network': None},
+    'laptop': {'cpu': 4, 'network': {'latency': 40, 'down_kbps': 10000, 'up_kbps': 5000}},
+    'tethering': {'cpu': 4, 'network': {'latency': 562.5, 'down_kbps': 1440, 'up_kbps': 675}},
+    'slow-3g': {'cpu': 6, 'network': {'latency': 2000, 'down_kbps': 400, 'up_kbps': 400}},
+}
+
+
+def network_conditions(net):
+    if not net:
+        return {'offline': False, 'latency': 0, 'downloadThroughput': -1, 'uploadThroughput': -1}
+    return {
+        'offline': False,
+        'latency': net['latency'],
+        'downloadThroughput': net['down_kbps'] * 1000 / 8,
+        'uploadThroughput': net['up_kbps'] * 1000 / 8,
+    }
+
+
+def apply_page_throttling(session, profile):
+    session.send('Emulation.setCPUThrottlingRate', {'rate': profile['cpu']})
+    session.send('Network.enable', {})
+    session.send('Network.emulateNetworkConditions', network_conditions(profile['network']))
+
+
+class WorkerThrottle:
+    """Network conditions for the extension service workers.
+
+    An MV3 worker is stopped when idle and comes back as a new target, possibly
+    in the middle of an iteration when image:download wakes it. A browser-level
+    session auto-attaches to every service worker with waitForDebuggerOnStart, so
+    a (re)started worker gets Network.emulateNetworkConditions before it runs any
+    code, then is resumed. starts() counts the worker targets attached so far.
+    """
+
+    def __init__(self, driver):
+        self.conditions = network_conditions(None)
+        self._lock = threading.Lock()
+        # child sessionId -> target id of attached extension workers
+        self._workers = {}
+        self._starts = 0
+        self.browser = None
+        address = debugger_address(driver)
+        if not address:
+            print('throttle: no DevTools address, service workers run unthrottled', file=sys.stderr)
+            return
+        try:
+            self.browser = browser_session(address)
+        except Exception as e:
+            print('throttle: cannot open a browser session, service workers run unthrottled:', e, file=sys.stderr)
+            return
+        self.browser.on('Target.attachedToTarget', self._on_attached)
+        self.browser.on('Target.detachedFromTarget', self._on_detached)
+        self.browser.send('Target.setAutoAttach', {
+            'autoAttach': True,
+            'waitForDebuggerOnStart': True,
+            'flatten': True,
+            'filter': [{'type': 'service_worker'}],
+        })
+
+    def _on_attached(self, params):
+        # reader thread: only send_nowait here, the commands go out in order
+        sid = params.get('sessionId')
+        info = params.get('targetInfo') or {}
+        if str(info.get('url', '')).startswith('chrome-extension://'):
+            with self._lock:
+                self._workers[sid] = info.get('targetId')
+                self._starts += 1
+                conditions = self.conditions
+            self.browser.send_nowait('Network.enable', {}, session_id=sid)
+            fut = self.browser.send_nowait('Network.emulateNetworkConditions', conditions, session_id=sid)
+            fut.add_done_callback(self._report_failure)
+        if params.get('waitingForDebugger'):
+            self.browser.send_nowait('Runtime.runIfWaitingForDebugger', {}, session_id=sid)
+
+    def _on_detached(self, params):
+        with self._lock:
+            self._workers.pop(params.get('sessionId'), None)
+
+    @staticmethod
+    def _report_failure(fut):
+        if fut.exception() is not None:
+            print('throttle: service worker throttling failed:', fut.exception(), file=sys.stderr)
+
+    def apply(self, profile):
+        """Set the conditions for attached workers and the ones started later; returns the attached count."""
+        with self._lock:
+            self.conditions = network_conditions(profile['network'])
+            sessions = list(self._workers)
+        if self.browser is None:
+            return 0
+        n = 0
+        for sid in sessions:
+            try:
+                self.browser.send('Network.emulateNetworkConditions', self.conditions, session_id=sid)
+                n += 1
+            except Exception as e:
+                print('throttle: service worker throttling failed:', e, file=sys.stderr)
+        return n
+
+    def starts(self):
+        with self._lock:
+            return self._starts
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+
+
+def summarize_waits(records, fill_ms_total):
+    """Aggregate wait records by (name, target), slowest total first."""
+    rows = {}
+    for r in records:
+        key = (r.get('name'), r.get('target'))
+        row = rows.setdefault(key, {'name': key[0], 'target': key[1], 'count': 0, 'timeouts': 0,
+                                    'total_ms': 0, 'max_ms': 0, 'budget_ms': r.get('budgetMs')})
+        row['count'] += 1
+        row['timeouts'] += 1 if r.get('timedOut') else 0
+        row['total_ms'] += r.get('ms') or 0
+        row['max_ms'] = max(row['max_ms'], r.get('ms') or 0)
+    out = sorted(rows.values(), key=lambda r: r['total_ms'], reverse=True)
+    for r in out:
+        r['share'] = round(r['total_ms'] / fill_ms_total, 3) if fill_ms_total else None
+    return out
+
+
+def run_profile(driver, page, workers, url, draft, name, iterations=3, upload=True):
+    profile = THROTTLE_PROFILES[name]
+    apply_page_throttling(page.session, profile)
+    samples, records = [], []
+    for i in range(iterations):
+        workers.apply(profile)
+        starts = workers.starts()
+        sample = run_iteration(driver, page, url, draft, upload=upload, timeout=600)
+        # restarted mid-iteration: throttled anyway (auto-attach), but worth knowing
+        sample['worker_starts'] = workers.starts() - starts
+        cid = page.wait_for_hook('__vx_takeWaitRecords')
+        records.extend(page.evaluate('window.__vx_takeWaitRecords()', cid) or [])
+        samples.append(sample)
+        print(f"throttle: {name} {i + 1}/{iterations} total {sample['total_ms']:.0f}ms", file=sys.stderr)
+    busy = sum((s.get('fill_ms') or 0) + (s.get('upload_ms') or 0) for s in samples)
+    return {'profile': name, 'settings': profile, 'stats': summarize(samples), 'waits': summarize_waits(records, busy)}
+
+
+def format_report(results, top=8):
+    lines = []
+    for res in results:
+        st = res['stats']
+        total = st.get('total_ms', {})
+        lines.append(f"== {res['profile']} (cpu x{res['settings']['cpu']}, network {res['settings']['network'] or 'none'})")
+        lines.append(f"   total p50 {total.get('p50', 0):.0f}ms p95 {total.get('p95', 0):.0f}ms; "
+                     f"fill p50 {st.get('fill_ms', {}).get('p50', 0):.0f}ms; "
+                     f"upload p50 {st.get('upload_ms', {}).get('p50', 0):.0f}ms")
+        timeouts = [w for w in res['waits'] if w['timeouts']]
+        for w in timeouts:
+            lines.append(f"   TIMEOUT {w['name']} {w['target'] or ''} x{w['timeouts']}/{w['count']} (budget {w['budget_ms']}ms)")
+        for w in res['waits'][:top]:
+            share = f"{w['share'] * 100:.0f}%" if w['share'] is not None else '-'
+            lines.append(f"   {share:>5}  {w['total_ms']:>7}ms  max {w['max_ms']:>6}ms  {w['name']} {w['target'] or ''}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Replay fill + upload under CPU/network throttling profiles')
+    p.add_argument('--profiles', nargs='*', default=list(THROTTLE_PROFILES), choices=sorted(THROTTLE_PROFILES))
+    p.add_argument('-n', '--iterations', type=int, default=3)
+    p.add_argument('--draft', default=str(DEFAULT_DRAFT))
+    p.add_argument('--extension', default=str(DIST_DIR))
+    p.add_argument('--no-upload', action='store_true')
+    p.add_argument('--headful', action='store_true')
+    p.add_argument('--json', help='write the full report as JSON')
+    args = p.parse_args(argv)
+
+    extension = Path(args.extension).resolve()
+    if not (extension / 'manifest.json').exists():
+        p.error(f'no manifest.json in {extension}; run `npm run build` first')
+    with open(args.draft, encoding='utf-8') as f:
+        draft = json.load(f)
+    results = []
+    # no stand-in latency: all the slowdown comes from Chrome's throttling
+    with StandinServer(port=0, profile='fast') as server:
+        driver = build_driver(str(extension), server.chrome_args(), headless=not args.headful)
+        page = workers = None
+        try:
+            page = ExtensionPage(driver)
+            workers = WorkerThrottle(driver)
+            url = server.url('/items/new')
+            # one unthrottled load so the first profile does not pay for cold caches
+            run_iteration(driver, page, url, draft, upload=False)
+            page.evaluate('window.__vx_takeWaitRecords()', page.wait_for_hook('__vx_takeWaitRecords'))
+            for name in args.profiles:
+                results.append(run_profile(driver, page, workers, url, draft, name,
+                                           args.iterations, upload=not args.no_upload))
+        finally:
+            if workers is not None:
+                workers.close()
+            if page is not None:
+                page.close()
+            driver.quit()
+    print(format_report(results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
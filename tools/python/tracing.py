@@ -0,0 +1,153 @@
+"""Lightweight span tracer for the tools/python scripts.
+
+    with span('navigate', url=url):
+        ...
+
+    @traced('save_cookies')
+    def save_cookies(driver): ...
+
+Spans nest per thread and are kept in memory as Chrome trace events
+("ph": "X"); write_trace() emits JSON that loads in chrome://tracing or
+https://ui.perfetto.dev, and format_summary() gives total time per span name.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+TRACE_DIR = TOOLS_DIR / 'traces'
+
+_lock = threading.Lock()
+_events = []
+_local = threading.local()
+_t0 = time.perf_counter()
+
+
+def _stack():
+    st = getattr(_local, 'stack', None)
+    if st is None:
+        st = _local.stack = []
+    return st
+
+
+@contextmanager
+def span(name, **args):
+    """Time the enclosed block; nested spans become children in the trace view."""
+    stack = _stack()
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        ev = {
+            'name': name,
+            'cat': 'vx',
+            'ph': 'X',
+            'ts': round((start - _t0) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': dict(args, depth=len(stack)),
+        }
+        with _lock:
+            _events.append(ev)
+
+
+def now_us():
+    """Current time on the trace clock (µs), to line other event streams up with the spans."""
+    return round((time.perf_counter() - _t0) * 1e6, 1)
+
+
+def instant(name, **args):
+    """Record a point-in-time event (e.g. a [VX] perf mark) on the trace timeline."""
+    ev = {
+        'name': name,
+        'cat': 'vx',
+        'ph': 'i',
+        's': 'g',
+        'ts': now_us(),
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'args': args,
+    }
+    with _lock:
+        _events.append(ev)
+
+
+def traced(name=None):
+    """Decorator form of span(); defaults to the function name."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with span(label):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+
+def events():
+    with _lock:
+        return list(_events)
+
+
+def reset():
+    with _lock:
+        _events.clear()
+
+
+def write_trace(path=None):
+    """Write collected spans as Chrome trace-event JSON and return the path."""
+    if path is None:
+        path = TRACE_DIR / f"trace_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    evs = events()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    meta = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': names.get(tid, str(tid))}}
+        for tid in sorted({e['tid'] for e in evs})
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': meta + evs, 'displayTimeUnit': 'ms'}, f, separators=(',', ':'))
+    return path
+
+
+def summary():
+    """Rows of {name, count, total_ms, mean_ms, max_ms}, slowest total first."""
+    rows = {}
+    for e in events():
+        if e['ph'] != 'X':
+            continue
+        r = rows.setdefault(e['name'], {'name': e['name'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        ms = e['dur'] / 1000.0
+        r['count'] += 1
+        r['total_ms'] += ms
+        r['max_ms'] = max(r['max_ms'], ms)
+    out = sorted(rows.values(), key=lambda r: r['total_ms'], reverse=True)
+    for r in out:
+        r['mean_ms'] = r['total_ms'] / r['count']
+    return out
+
+
+def format_summary():
+    rows = summary()
+    if not rows:
+        return 'no spans recorded'
+    width = max(len('span'), *(len(r['name']) for r in rows))
+    lines = [f"{'span':<{width}}  {'count':>5}  {'total ms':>10}  {'mean ms':>9}  {'max ms':>9}"]
+    for r in rows:
+        lines.append(f"{r['name']:<{width}}  {r['count']:>5}  {r['total_ms']:>10.1f}  {r['mean_ms']:>9.1f}  {r['max_ms']:>9.1f}")
+    return '\n'.join(lines)
+
+
+def print_summary(file=None):
+    print(format_summary(), file=file or sys.stderr)
@@ -1,56 +1,300 @@
+import argparse
 import json
+import os
+import sys
+import tempfile
+import time
 from pathlib import Path
 
+from .tracing import traced
+
 TOOLS_DIR = Path(__file__).resolve().parent.parent
 SESSION_FILE = TOOLS_DIR / 'session.json'
+STORAGE_FILE = TOOLS_DIR / 'storage.json'
+
+# Versioned session snapshot: a compact base file plus a JSONL journal of
+# diffs against the previous snapshot, compacted back into the base after
+# SNAPSHOT_COMPACT_AFTER diffs.
+SNAPSHOT_FILE = TOOLS_DIR / 'session_snapshot.json'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COMPACT_AFTER = 50
+
+# localStorage + sessionStorage + url in one execute_script call
+JS_STORAGE = (
+    "function dump(s){var r={};"
+    "try{for(var i=0;i<s.length;i++){var k=s.key(i);r[k]=s.getItem(k);}}catch(e){}"
+    "return r;}"
+    "return {url: location.href, localStorage: dump(window.localStorage), sessionStorage: dump(window.sessionStorage)};"
+)
+
+
+def atomic_write_json(path, obj, indent=None):
+    """Write JSON to a temp file in the same directory, then rename over path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    separators = None if indent else (',', ':')
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=indent, separators=separators, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _cdp_cookie(c):
+    # Network.getCookies -> WebDriver cookie shape (what get_cookies() returns)
+    out = {k: c[k] for k in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly') if k in c}
+    if c.get('sameSite'):
+        out['sameSite'] = c['sameSite']
+    if not c.get('session') and (c.get('expires') or 0) > 0:
+        out['expiry'] = int(c['expires'])
+    return out
+
+
+@traced('take_snapshot')
+def take_snapshot(driver, session=None):
+    """Collect cookies, localStorage and sessionStorage.
+
+    With a CDPSession (cdp_utils) both commands are pipelined on the socket, so
+    the snapshot costs one round-trip. Otherwise HttpOnly cookies still need
+    get_cookies(), next to a single execute_script for both storages.
+    """
+    if session is not None:
+        ev = session.send_nowait('Runtime.evaluate', {'expression': f'(function(){{{JS_STORAGE}}})()', 'returnByValue': True})
+        ck = session.send_nowait('Network.getCookies', {})
+        storage = (ev.result(10).get('result') or {}).get('value') or {}
+        cookies = [_cdp_cookie(c) for c in ck.result(10).get('cookies') or []]
+    else:
+        storage = driver.execute_script(JS_STORAGE) or {}
+        cookies = driver.get_cookies()
+    return {
+        'v': SNAPSHOT_VERSION,
+        'ts': round(time.time(), 3),
+        'url': storage.get('url'),
+        'cookies': cookies,
+        'localStorage': storage.get('localStorage') or {},
+        'sessionStorage': storage.get('sessionStorage') or {},
+    }
+
+
+def _cookie_key(c):
+    return f"{c.get('name')}|{c.get('domain')}|{c.get('path')}"
+
+
+def _map_diff(old, new):
+    changed = {k: v for k, v in new.items() if old.get(k) != v}
+    removed = [k for k in old if k not in new]
+    if not changed and not removed:
+        return None
+    return {'set': changed, 'del': removed}
+
+
+def diff_snapshots(old, new):
+    """Return the diff turning old into new, or None if nothing changed."""
+    diff = {}
+    cookies = _map_diff({_cookie_key(c): c for c in old.get('cookies') or []},
+                        {_cookie_key(c): c for c in new.get('cookies') or []})
+    if cookies:
+        diff['cookies'] = cookies
+    for area in ('localStorage', 'sessionStorage'):
+        d = _map_diff(old.get(area) or {}, new.get(area) or {})
+        if d:
+            diff[area] = d
+    if not diff:
+        return None
+    diff.update({'v': SNAPSHOT_VERSION, 'ts': new.get('ts'), 'url': new.get('url')})
+    return diff
+
 
+def apply_diff(snap, diff):
+    snap = dict(snap)
+    cookies = {_cookie_key(c): c for c in snap.get('cookies') or []}
+    d = diff.get('cookies')
+    if d:
+        for k in d.get('del') or []:
+            cookies.pop(k, None)
+        cookies.update(d.get('set') or {})
+    snap['cookies'] = list(cookies.values())
+    for area in ('localStorage', 'sessionStorage'):
+        d = diff.get(area)
+        if d:
+            m = dict(snap.get(area) or {})
+            for k in d.get('del') or []:
+                m.pop(k, None)
+            m.update(d.get('set') or {})
+            snap[area] = m
+    snap['ts'] = diff.get('ts', snap.get('ts'))
+    snap['url'] = diff.get('url', snap.get('url'))
+    return snap
 
+
+def _journal_path(path):
+    path = Path(path)
+    return path.with_name(path.stem + '.journal.jsonl')
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    """Return the latest snapshot (base + journal replay) and the journal length."""
+    path = Path(path)
+    if not path.exists():
+        return None, 0
+    with open(path, encoding='utf-8') as f:
+        snap = json.load(f)
+    if snap.get('v') != SNAPSHOT_VERSION:
+        raise ValueError(f'unsupported snapshot version {snap.get("v")!r} in {path}')
+    n = 0
+    base_ts = snap.get('ts')
+    journal = _journal_path(path)
+    if journal.exists():
+        with open(journal, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    diff = json.loads(line)
+                except Exception:
+                    # torn last line from an interrupted append
+                    break
+                n += 1
+                # diffs older than the base are left over from an interrupted compaction
+                if (diff.get('ts') or 0) <= (base_ts or 0):
+                    continue
+                snap = apply_diff(snap, diff)
+    return snap, n
+
+
+@traced('save_session_snapshot')
+def save_session_snapshot(driver, path=SNAPSHOT_FILE, incremental=True, session=None):
+    """Take a snapshot and persist it; returns the snapshot.
+
+    The base file is only ever replaced atomically. With incremental, an unchanged
+    session writes nothing and a changed one appends a diff to the journal.
+    """
+    path = Path(path)
+    snap = take_snapshot(driver, session=session)
+    prev, n = (None, 0)
+    if incremental:
+        try:
+            prev, n = load_snapshot(path)
+        except Exception as e:
+            print('Previous snapshot unreadable, rewriting:', e)
+    if prev is not None and n < SNAPSHOT_COMPACT_AFTER:
+        diff = diff_snapshots(prev, snap)
+        if diff is None:
+            print('Session unchanged since last snapshot', path)
+            return snap
+        with open(_journal_path(path), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(diff, ensure_ascii=False, separators=(',', ':')) + '\n')
+        print('Saved session diff to', _journal_path(path))
+        return snap
+    atomic_write_json(path, snap)
+    try:
+        _journal_path(path).unlink()
+    except FileNotFoundError:
+        pass
+    print('Saved session snapshot to', path)
+    return snap
+
+
+def compact_snapshot(path=SNAPSHOT_FILE):
+    """Fold the journal into the base file; returns the number of diffs folded."""
+    path = Path(path)
+    snap, n = load_snapshot(path)
+    if snap is None:
+        return 0
+    atomic_write_json(path, snap)
+    try:
+        _journal_path(path).unlink()
+    except FileNotFoundError:
+        pass
+    return n
+
+
+def export_legacy_files(snap):
+    """Write tools/session.json (cookies) and tools/storage.json from a snapshot."""
+    atomic_write_json(SESSION_FILE, snap.get('cookies') or [], indent=2)
+    atomic_write_json(STORAGE_FILE, {'localStorage': snap.get('localStorage') or {},
+                                     'sessionStorage': snap.get('sessionStorage') or {}}, indent=2)
+
+
+@traced('save_cookies')
 def save_cookies(driver):
     try:
-        with open(SESSION_FILE, 'w') as f:
-            json.dump(driver.get_cookies(), f, indent=2)
+        atomic_write_json(SESSION_FILE, driver.get_cookies(), indent=2)
         print('Saved cookies to', SESSION_FILE)
     except Exception as e:
         print('Failed to save cookies:', e)
 
 
+@traced('save_storage')
 def save_storage(driver):
     try:
-        script_ls = (
-            "var r={};"
-            "for(var i=0;i<localStorage.length;i++){"
-            "var k=localStorage.key(i);"
-            "r[k]=localStorage.getItem(k);}"
-            "return r;"
-        )
-        ls = driver.execute_script(script_ls)
+        st = driver.execute_script(JS_STORAGE) or {}
     except Exception:
-        ls = {}
+        st = {}
     try:
-        script_ss = (
-            "var r={};"
-            "for(var i=0;i<sessionStorage.length;i++){"
-            "var k=sessionStorage.key(i);"
-            "r[k]=sessionStorage.getItem(k);}"
-            "return r;"
-        )
-        ss = driver.execute_script(script_ss)
-    except Exception:
-        ss = {}
-    try:
-        with open(SESSION_FILE.parent / 'storage.json', 'w') as f:
-            json.dump({'localStorage': ls, 'sessionStorage': ss}, f, indent=2)
-        print('Saved storage to', SESSION_FILE.parent / 'storage.json')
+        atomic_write_json(STORAGE_FILE, {'localStorage': st.get('localStorage') or {},
+                                         'sessionStorage': st.get('sessionStorage') or {}}, indent=2)
+        print('Saved storage to', STORAGE_FILE)
     except Exception as e:
         print('Failed to save storage:', e)
 
 
+@traced('save_login_response')
 def save_login_response(resp):
     try:
         if resp is None:
             return
-        with open(SESSION_FILE.parent / 'login-response.json', 'w') as f:
-            json.dump(resp, f, indent=2)
+        atomic_write_json(SESSION_FILE.parent / 'login-response.json', resp, indent=2)
         print('Saved login response to', SESSION_FILE.parent / 'login-response.json')
     except Exception as e:
         print('Failed to save login response:', e)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Inspect, compact, export or take the versioned session snapshot')
+    p.add_argument('--path', default=str(SNAPSHOT_FILE))
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('show', help='summary of the latest snapshot (base + journal)')
+    sub.add_parser('compact', help='fold the journal into the base file')
+    sub.add_parser('export', help='write tools/session.json and tools/storage.json from the snapshot')
+    s = sub.add_parser('save', help='snapshot the session of a running Chrome')
+    s.add_argument('--attach', metavar='HOST:PORT', required=True, help='debugging address of the Chrome to read')
+    s.add_argument('--full', action='store_true', help='rewrite the base file instead of appending a diff')
+    args = p.parse_args(argv)
+
+    if args.cmd == 'save':
+        from .drivers import start_driver
+        driver = start_driver(attach=args.attach)
+        try:
+            save_session_snapshot(driver, args.path, incremental=not args.full)
+        finally:
+            # attached: ends the chromedriver session, Chrome keeps running
+            driver.quit()
+        return 0
+    if args.cmd == 'compact':
+        print(f'folded {compact_snapshot(args.path)} diffs into', args.path)
+        return 0
+    snap, n = load_snapshot(args.path)
+    if snap is None:
+        print('no snapshot at', args.path, file=sys.stderr)
+        return 1
+    if args.cmd == 'export':
+        export_legacy_files(snap)
+        print('exported', SESSION_FILE, 'and', STORAGE_FILE)
+        return 0
+    print(json.dumps({
+        'path': args.path,
+        'ts': snap.get('ts'),
+        'url': snap.get('url'),
+        'cookies': len(snap.get('cookies') or []),
+        'localStorage': len(snap.get('localStorage') or {}),
+        'sessionStorage': len(snap.get('sessionStorage') or {}),
+        'journal_diffs': n,
+    }, indent=2, ensure_ascii=False))
+    return 0
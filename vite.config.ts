@@ -5,6 +5,8 @@ export default defineConfig({
   plugins: [
     webExtension({
       manifest: 'public/manifest.json',
+      // page du relais d'images, chargée en iframe (web_accessible_resources)
+      additionalInputs: ['src/relay/index.html'],
     }),
   ],
   build: {
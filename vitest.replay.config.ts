@@ -0,0 +1,13 @@
+import { defineConfig } from 'vitest/config';
+
+// Rejeu de corpus (tests/replay/*.replay.ts), lancé par scripts/replay-corpus.mjs:
+// un processus vitest par part du corpus, sans couverture.
+export default defineConfig({
+  test: {
+    environment: 'jsdom',
+    include: ['tests/replay/**/*.replay.ts'],
+    coverage: { enabled: false },
+    testTimeout: 120000,
+    reporters: ['dot'],
+  },
+});